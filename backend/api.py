@@ -1,12 +1,25 @@
-from flask import Flask, jsonify, request, session
+from flask import Flask, jsonify, request, session, g, stream_with_context
 from flask_cors import CORS
 import pandas as pd
 import os
-import json
 from datetime import datetime
-from pick_player_props import load_props, find_player_props  # adjust import
+from pick_player_props import find_player_props  # adjust import
+from props_store import PropsStore
+from serialization import dumps, dumps_frame, stream_ndjson, stream_json_array
+from props_query import StaleCursorError, filter_positions, paginate, parse_fields, parse_list
+from response_cache import CachedBody, ResponseCache, etag_matches, make_etag
+from payouts import MAX_PICKS, payout_multiplier, payout_tables_json
+from simulator import DEFAULT_TRIALS, evaluate_slip
+from slip_builder import MIN_LEGS, optimize_slips, split_board_legs
+from rng_service import coin_flip, generator, new_seed, seed_from
+from bankroll import STARTING_BALANCE, simulate_bankroll
+from correlation import simulate_correlated_slip, slip_contexts
+from line_history import LineHistory, history_path
+from underdog_scraper import ScrapeScheduler, UnderdogScraper
+from pick_batch import MAX_BATCH_SLIPS, SETTLE_MODES, grade_batch, history_records, slip_results
 import user_db  # Import the user database module
 import secrets
+from functools import wraps
 
 app = Flask(__name__)
 # Set a secret key for session management
@@ -14,24 +27,155 @@ app.secret_key = secrets.token_hex(16)
 # Enable CORS with credentials support
 CORS(app, supports_credentials=True)
 
-# Helper class for handling NaN values in JSON
-class NaNHandler(json.JSONEncoder):
-    def default(self, obj):
-        if pd.isna(obj):
-            return None
-        return super().default(obj)
+def json_response(data, status=200):
+    """JSON response through the serialization layer (NaN/NA -> null, numpy types)."""
+    return app.response_class(response=dumps(data), status=status, mimetype="application/json")
 
-# Load props once (or reload each request if CSV updates often)
+# Props are held in a snapshot that is reloaded in the background whenever
+# the scraper rewrites the CSV
+PROPS_POLL_SECONDS = 2.0
+# Categoricals and downcast numerics for the board held in memory. Set
+# PROPS_KEEP_COLUMNS to a list of columns to drop the rest, but note that
+# /api/props then only returns those columns.
+PROPS_COMPACT = True
+PROPS_KEEP_COLUMNS = None
+props_store = PropsStore(poll_interval=PROPS_POLL_SECONDS, compact=PROPS_COMPACT,
+                         keep_columns=PROPS_KEEP_COLUMNS)
 try:
-    df = load_props()
-    print("Props loaded successfully")
-    if df is not None:
-        print(f"Found {len(df)} props")
+    props_store.reload()
+    props_store.reload_partitions()
+    if props_store.current.df is not None:
+        print(f"Props loaded successfully, found {props_store.current.row_count} props")
     else:
-        print("Props file was found but DataFrame is None")
+        print("Props file not loaded, waiting for the scraper")
 except Exception as e:
     print(f"Error loading props: {str(e)}")
-    df = None
+props_store.start()
+
+# With "scrape_in_api" set in config.json the scraper runs on a background
+# thread of this process and publishes each new board straight into
+# props_store; otherwise it runs on its own and props_store picks its files up
+props_scraper = UnderdogScraper(props_store.csv_path, store=props_store)
+SCRAPE_IN_API = props_scraper.config.get("scrape_in_api", False)
+scrape_scheduler = ScrapeScheduler.from_config(props_scraper) if SCRAPE_IN_API else None
+if scrape_scheduler is not None:
+    scrape_scheduler.start()
+
+# Line movements recorded by the scraper next to the board
+line_history = LineHistory(history_path(props_store.csv_path))
+MAX_MOVERS = 100
+
+# Process pool size for /api/slips/optimal. Searched inline: a pool per
+# request costs more to start than the search, and concurrent requests
+# would each start one
+SLIP_SEARCH_WORKERS = 1
+MAX_TOP_SLIPS = 50
+# Process pool size for Monte Carlo chunks in /api/simulate and
+# /api/bankroll
+SIMULATION_WORKERS = 1
+# Largest paths x bets one /api/bankroll request may simulate (the default
+# 10,000 x 1,000 takes well under a second); bankroll.py allows far more
+# from the command line
+MAX_BANKROLL_PATH_BETS = 10_000_000
+
+# Serialized props responses per (endpoint, params, snapshot version)
+response_cache = ResponseCache()
+
+def current_props():
+    """Pin the current props snapshot for the rest of this request.
+
+    A request for one ?sport= is served from that sport's partition when
+    the scraper writes them, which is reloaded on its own and so is never
+    behind the whole board.
+    """
+    snapshot = g.get("props_snapshot")
+    if snapshot is None:
+        sports = parse_list(request.args.get("sport"))
+        snapshot = props_store.partition(sports[0]) if sports and len(sports) == 1 else None
+        snapshot = g.props_snapshot = snapshot or props_store.current
+        g.props_version = snapshot.version
+    return snapshot
+
+def accept_stream():
+    """"ndjson" when the Accept header asks for NDJSON, else None."""
+    return "ndjson" if "application/x-ndjson" in request.headers.get("Accept", "") else None
+
+def not_modified(etag):
+    response_cache.record_not_modified()
+    response = app.response_class(status=304)
+    response.headers["ETag"] = etag
+    response.headers["Vary"] = "Accept, Accept-Encoding"
+    return response
+
+def cached_props_response(view):
+    """Serve a props endpoint through the ETag check and the response cache.
+
+    Only complete 200 bodies are cached; streamed and error responses pass
+    straight through. The media type negotiated from Accept is part of the
+    key, so an NDJSON request never gets the JSON body or its ETag.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        snapshot = current_props()
+        key = (request.path, tuple(sorted(request.args.items(multi=True))), accept_stream(),
+               snapshot.version)
+        etag = make_etag(key)
+        if_none_match = request.headers.get("If-None-Match")
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        entry = response_cache.get(key)
+        if entry is None:
+            response = view(*args, **kwargs)
+            if isinstance(response, tuple) or response.status_code != 200 or response.is_streamed:
+                if not isinstance(response, tuple):
+                    response.headers["Vary"] = "Accept, Accept-Encoding"
+                return response
+            headers = {"X-Next-Cursor": g.next_cursor} if g.get("next_cursor") else {}
+            entry = CachedBody(response.get_data(), response.mimetype, etag, headers)
+            response_cache.put(key, entry)
+        # A 200 exists for this request now, so "*" matches too
+        if etag_matches(if_none_match, etag, exists=True):
+            return not_modified(etag)
+
+        g.next_cursor = entry.headers.get("X-Next-Cursor")
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            response = app.response_class(entry.gzipped, status=200, mimetype=entry.mimetype)
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = app.response_class(entry.body, status=200, mimetype=entry.mimetype)
+        response.headers["ETag"] = entry.etag
+        response.headers["Vary"] = "Accept, Accept-Encoding"
+        return response
+    return wrapper
+
+@app.after_request
+def add_props_version(response):
+    version = g.get("props_version")
+    if version is not None:
+        response.headers["X-Props-Version"] = version
+    next_cursor = g.get("next_cursor")
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+def select_props(snapshot, table):
+    """Apply the filter, projection and pagination parameters of this request.
+
+    Returns (row positions, fields or None); positions is None when the
+    request asks for the whole table. Raises ValueError for bad parameters.
+    """
+    frame = snapshot.df if table == "props" else snapshot.formatted_frame
+    fields = parse_fields(request.args, frame.columns)
+    if not any(k in request.args for k in ("sport", "stat", "player", "page_size", "cursor")):
+        return None, fields
+    positions = filter_positions(frame, request.args, table, snapshot.player_index)
+    positions, g.next_cursor = paginate(positions, request.args, snapshot.version)
+    return positions, fields
+
+def query_error(e):
+    status = 409 if isinstance(e, StaleCursorError) else 400
+    return jsonify({"error": str(e)}), status
 
 # Load past picks from files
 def load_past_picks():
@@ -47,6 +191,11 @@ def load_past_picks():
             try:
                 filepath = os.path.join(data_dir, filename)
                 picks_df = pd.read_csv(filepath)
+                # The CLI appends a bet/payout summary below the picks; only
+                # rows with a stat and a pick are legs of the slip
+                leg_columns = [c for c in ("stat", "pick") if c in picks_df.columns]
+                if leg_columns:
+                    picks_df = picks_df.dropna(subset=leg_columns)
                 
                 # Get date from filename (e.g., my_picks_2023-08-22_1244.csv)
                 date_str = filename.split("_")[2].split(".")[0]
@@ -62,15 +211,12 @@ def load_past_picks():
                     mode = picks_df["mode"].iloc[0]
                 
                 # For example purposes, randomly determine if won
-                import random
-                won = random.choice([True, False])
+                seed = new_seed()
+                won = coin_flip(generator(seed))
                 payout = 0
                 if won:
                     # Calculate based on mode and # picks
-                    if mode == "PowerPlay":
-                        payout = bet_amount * 10  # Simple example
-                    else:
-                        payout = bet_amount * 5
+                    payout = bet_amount * payout_multiplier(mode, len(picks_df))
                         
                 picks_list = []
                 for _, row in picks_df.iterrows():
@@ -87,7 +233,8 @@ def load_past_picks():
                     "bet": bet_amount,
                     "mode": mode,
                     "won": won,
-                    "payout": payout if won else 0
+                    "payout": payout if won else 0,
+                    "seed": seed
                 })
             except Exception as e:
                 print(f"Error loading {filename}: {e}")
@@ -95,55 +242,81 @@ def load_past_picks():
     return past_picks
 
 @app.route("/api/props", methods=["GET"])
+@cached_props_response
 def get_all_props():
     try:
+        snapshot = current_props()
+        df = snapshot.df
         if df is None:
             return jsonify({"error": "Props data not available. Try running the scraper first."}), 404
-        
-        # Handle NaN values
-        return app.response_class(
-            response=json.dumps(df.replace({pd.NA: None}).to_dict(orient="records"), cls=NaNHandler),
-            status=200,
-            mimetype="application/json"
-        )
+
+        try:
+            positions, fields = select_props(snapshot, "props")
+        except ValueError as e:
+            return query_error(e)
+        if positions is not None:
+            df = df.iloc[positions]
+        if fields is not None:
+            df = df[fields]
+
+        # Opt-in streaming: ?stream=ndjson (or Accept: application/x-ndjson)
+        # and ?stream=json for a chunked JSON array
+        stream = request.args.get("stream")
+        if stream is None:
+            stream = accept_stream()
+        if stream == "ndjson":
+            return app.response_class(stream_with_context(stream_ndjson(df)),
+                                      status=200, mimetype="application/x-ndjson")
+        if stream == "json":
+            return app.response_class(stream_with_context(stream_json_array(df)),
+                                      status=200, mimetype="application/json")
+        if stream is not None:
+            return jsonify({"error": "stream must be 'ndjson' or 'json'"}), 400
+
+        return app.response_class(response=dumps_frame(df), status=200, mimetype="application/json")
     except Exception as e:
         return jsonify({"error": f"Failed to get props: {str(e)}"}), 500
 
 @app.route("/api/props/player/<player_name>", methods=["GET"])
+@cached_props_response
 def get_player_props(player_name):
     try:
+        snapshot = current_props()
+        df = snapshot.df
         if df is None:
             return jsonify({"error": "Props data not available. Try running the scraper first."}), 404
         if not player_name or len(player_name) < 2:
             return jsonify({"error": "Player name must be at least 2 characters"}), 400
             
-        matches = find_player_props(df, player_name)
+        matches = find_player_props(df, player_name, snapshot.player_index)
         
         if matches.empty:
             return jsonify({"error": f"No props found for player: {player_name}", "matches": []}), 404
             
-        # Handle NaN values
-        return app.response_class(
-            response=json.dumps(matches.replace({pd.NA: None}).to_dict(orient="records"), cls=NaNHandler),
-            status=200,
-            mimetype="application/json"
-        )
+        return app.response_class(response=dumps_frame(matches), status=200, mimetype="application/json")
     except Exception as e:
         return jsonify({"error": f"Failed to get player props: {str(e)}"}), 500
 
+@app.route("/api/props/players/autocomplete", methods=["GET"])
+def autocomplete_players():
+    snapshot = current_props()
+    if snapshot.df is None:
+        return jsonify({"error": "Props data not available. Try running the scraper first."}), 404
+    query = request.args.get("q", "")
+    try:
+        limit = min(int(request.args.get("limit", 10)), 50)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify(snapshot.player_index.autocomplete(query, limit)), 200
+
 @app.route("/api/props/formatted", methods=["GET"])
+@cached_props_response
 def get_props_for_frontend():
     try:
-        if df is None:
+        snapshot = current_props()
+        if snapshot.df is None:
             return jsonify({"error": "Props data not available. Try running the scraper first."}), 404
             
-        # Ensure keys: player, stat, value, sport
-        props = []
-        processed = set()  # To avoid duplicates
-        
-        # For debugging
-        print(f"DataFrame columns: {df.columns.tolist()}")
-        
         # Check if limit parameter is provided in the request
         limit_param = request.args.get("limit")
         if limit_param is not None:
@@ -153,64 +326,24 @@ def get_props_for_frontend():
                 limit = None  # No limit if parameter is invalid
         else:
             limit = None  # No limit by default
-            
-        counter = 0
-        
-        for _, row in df.iterrows():
-            # Get the key fields, with fallbacks for different column names
-            player_value = row.get("full_name")
-            player = player_value if pd.notna(player_value) else "Unknown Player"
-            
-            # Try different possible column names for the stat
-            stat = None
-            for stat_col in ["stat_name", "type_over_under", "selection_subheader"]:
-                if stat_col in row and pd.notna(row[stat_col]):
-                    stat = row[stat_col]
-                    break
-            
-            if stat is None or pd.isna(stat):
-                stat = "Unknown Stat"
-                
-            # Try different possible column names for the value
-            value = None
-            for val_col in ["stat_value", "line", "value", "non_discounted_stat_value"]:
-                if val_col in row and pd.notna(row[val_col]):
-                    value = row[val_col]
-                    break
-                    
-            if value is None or pd.isna(value):
-                value = "0"
-            
-            # Try different possible column names for the sport
-            sport = "Unknown Sport"
-            for sport_col in ["sport_id", "sport", "sport_name", "league", "league_id"]:
-                if sport_col in row and pd.notna(row[sport_col]):
-                    sport = row[sport_col]
-                    break
-                    
-            # Make sure sport is not NaN
-            if pd.isna(sport):
-                sport = "Unknown Sport"
-            
-            # Create a unique key to avoid duplicate props
-            key = f"{player}|{stat}|{value}"
-            if key in processed:
-                continue
-                
-            processed.add(key)
-            
-            props.append({
-                "player": player,
-                "stat": stat,
-                "value": value,
-                "sport": sport  # Add sport to each prop
-            })
-            
-            counter += 1
-            if limit is not None and counter >= limit:
-                break
-            
-        if not props:
+
+        try:
+            positions, fields = select_props(snapshot, "formatted")
+        except ValueError as e:
+            return query_error(e)
+        if positions is None:
+            props = snapshot.formatted_props
+        else:
+            props = [snapshot.formatted_props[i] for i in positions]
+
+        if limit is not None and limit > 0:
+            props = props[:limit]
+        else:
+            props = list(props)
+        if fields is not None:
+            props = [{field: prop[field] for field in fields} for prop in props]
+
+        if not snapshot.formatted_props:
             # Create some sample data if no props found
             print("No valid props found, adding sample data")
             sample_players = [
@@ -221,14 +354,8 @@ def get_props_for_frontend():
                 {"player": "Joel Embiid", "stat": "pts", "value": "29.5", "sport": "NBA"}
             ]
             props.extend(sample_players)
-            
-        print(f"Returning {len(props)} props")
-        # Convert to JSON with NaN handling, then return
-        return app.response_class(
-            response=json.dumps(props, cls=NaNHandler),
-            status=200,
-            mimetype="application/json"
-        )
+
+        return json_response(props)
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
@@ -246,6 +373,180 @@ def get_props_for_frontend():
             "sample_data": sample_players
         }), 500
     
+@app.route("/api/props/implied", methods=["GET"])
+@cached_props_response
+def get_implied_props():
+    """Implied over/under probabilities and fair line per prop, optionally
+    for one ?player= and/or ?stat=."""
+    frame = current_props().implied.frame
+    for param, column in (("player", "player"), ("stat", "stat")):
+        if request.args.get(param):
+            frame = frame[frame[column].astype(object) == request.args[param]]
+    return app.response_class(response=dumps_frame(frame), mimetype="application/json")
+
+def time_window():
+    """(since, until) epoch seconds from ?since=/?until= or ?hours= back from now."""
+    until = float(request.args["until"]) if request.args.get("until") else None
+    if request.args.get("since"):
+        return float(request.args["since"]), until
+    hours = float(request.args.get("hours", 24))
+    return (until if until is not None else datetime.now().timestamp()) - hours * 3600, until
+
+@app.route("/api/props/history", methods=["GET"])
+def get_line_history():
+    """Line changes of one ?player=, optionally for one ?stat=, oldest first."""
+    player = request.args.get("player")
+    if not player:
+        return jsonify({"error": "player is required"}), 400
+    try:
+        since = float(request.args["since"]) if request.args.get("since") else None
+        until = float(request.args["until"]) if request.args.get("until") else None
+    except ValueError:
+        return jsonify({"error": "since and until must be epoch seconds"}), 400
+    events = line_history.line_history(player, request.args.get("stat"), since, until)
+    return app.response_class(response=dumps_frame(events), mimetype="application/json")
+
+@app.route("/api/props/movers", methods=["GET"])
+def get_line_movers():
+    """Props whose line moved the most over the last ?hours= (default 24) or
+    between ?since= and ?until=, optionally for one ?sport=."""
+    try:
+        since, until = time_window()
+        limit = min(int(request.args.get("limit", 20)), MAX_MOVERS)
+    except ValueError:
+        return jsonify({"error": "since, until, hours and limit must be numbers"}), 400
+    movers = line_history.movers(since, until, limit, request.args.get("sport"))
+    return app.response_class(response=dumps_frame(movers), mimetype="application/json")
+
+@app.route("/api/props/status", methods=["GET"])
+def get_props_status():
+    current_props()
+    stats = props_store.stats()
+    stats["response_cache"] = response_cache.stats()
+    if scrape_scheduler is not None:
+        stats["scraper"] = scrape_scheduler.stats()
+    return jsonify(stats), 200
+
+@app.route("/api/props/memory", methods=["GET"])
+def get_props_memory():
+    snapshot = current_props()
+    if snapshot.memory_report is None:
+        return jsonify({"error": "Props are not loaded in compact mode", "columns": []}), 404
+    return json_response({"version": snapshot.version, "columns": snapshot.memory_report})
+
+@app.route("/api/payouts", methods=["GET"])
+def get_payout_tables():
+    return json_response(payout_tables_json())
+
+def slip_probabilities(data):
+    """Leg hit probabilities from a request body: "probabilities": [...] or
+    "legs": [{"probability": ...}, ...]. Legs without a probability take the
+    implied probability of their prop ({player, stat, line, pick}) on the
+    current board."""
+    if "probabilities" in data:
+        return [float(p) for p in data["probabilities"]]
+    legs = data.get("legs") or []
+    probabilities = []
+    for leg in legs:
+        if leg.get("probability") is not None:
+            probabilities.append(float(leg["probability"]))
+            continue
+        implied = current_props().implied.probability(
+            leg.get("player"), leg.get("stat"), leg.get("line", leg.get("value")), leg.get("pick", "over"))
+        if implied is None:
+            raise ValueError(f"No probability for {leg.get('player')} {leg.get('stat')} and it is not on the board")
+        probabilities.append(implied)
+    return probabilities
+
+@app.route("/api/simulate", methods=["POST"])
+def simulate():
+    data = request.get_json(silent=True) or {}
+    try:
+        probabilities = slip_probabilities(data)
+        trials = int(data.get("trials", DEFAULT_TRIALS))
+        stake = float(data.get("stake", data.get("bet_amount", 1.0)))
+        seed = seed_from(data["seed"]) if data.get("seed") is not None else new_seed()
+        # Independent legs have an exact distribution; simulate only on request
+        method = data.get("method", "exact")
+        if method == "correlated":
+            # Legs are grouped by game from the board, which needs player/stat/line/pick
+            legs = data.get("legs") or []
+            snapshot = current_props()
+            contexts, missing = slip_contexts(snapshot.df, legs, snapshot.player_index)
+            result = simulate_correlated_slip(probabilities, contexts,
+                                              [leg.get("pick", "over") for leg in legs],
+                                              data.get("mode", "PowerPlay"), trials, stake, seed,
+                                              SIMULATION_WORKERS, data.get("correlations"))
+            result["unmatched_legs"] = missing
+        else:
+            result = evaluate_slip(probabilities, data.get("mode", "PowerPlay"), stake, method,
+                                   trials, seed=seed, workers=SIMULATION_WORKERS)
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    result["success"] = True
+    return json_response(result)
+
+@app.route("/api/bankroll", methods=["POST"])
+def bankroll():
+    """Bankroll paths betting one slip repeatedly under a sizing strategy."""
+    data = request.get_json(silent=True) or {}
+    try:
+        n_paths, n_bets = int(data.get("paths", 10_000)), int(data.get("bets", 1000))
+        if n_paths * n_bets > MAX_BANKROLL_PATH_BETS:
+            raise ValueError(f"paths x bets must be at most {MAX_BANKROLL_PATH_BETS:,}")
+        probabilities = slip_probabilities(data)
+        seed = seed_from(data["seed"]) if data.get("seed") is not None else new_seed()
+        result = simulate_bankroll(
+            probabilities, data.get("mode", "PowerPlay"), data.get("strategy", "fixed"),
+            n_paths=n_paths,
+            n_bets=n_bets,
+            stake=float(data.get("stake", data.get("bet_amount", 10.0))),
+            fraction=float(data.get("fraction", 0.01)),
+            kelly_multiplier=float(data.get("kelly_multiplier", 1.0)),
+            starting_balance=float(data.get("starting_balance", STARTING_BALANCE)),
+            seed=seed, workers=SIMULATION_WORKERS)
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    result["success"] = True
+    return json_response(result)
+
+@app.route("/api/slips/optimal", methods=["POST"])
+def optimal_slips():
+    """Best slips from candidate legs ({player, stat, line, pick, probability})
+    that are on the current board. Without legs, or a leg's probability, the
+    board's implied probabilities are used."""
+    data = request.get_json(silent=True) or {}
+    legs = data.get("legs") or []
+    if not isinstance(legs, list) or not all(isinstance(leg, dict) for leg in legs):
+        return jsonify({"success": False, "error": "legs must be a list of objects"}), 400
+    snapshot = current_props()
+    if not legs:
+        # Both sides of every prop at its implied probability
+        legs = snapshot.implied.candidate_legs().to_dict(orient="records")
+    for leg in legs:
+        if leg.get("probability") is None:
+            leg["probability"] = snapshot.implied.probability(
+                leg.get("player"), leg.get("stat"), leg.get("line"), leg.get("pick", "over"))
+    known, unknown = split_board_legs(snapshot.board_keys, legs)
+    if not known:
+        return jsonify({"success": False, "error": "No candidate legs are on the current board",
+                        "unknown_legs": unknown}), 400
+    try:
+        modes = data.get("modes") or [data.get("mode", "PowerPlay")]
+        max_variance = data.get("max_variance")
+        result = optimize_slips(
+            known, modes,
+            min_legs=int(data.get("min_legs", MIN_LEGS)),
+            max_legs=int(data.get("max_legs", MAX_PICKS)),
+            top_k=min(int(data.get("top_k", 5)), MAX_TOP_SLIPS),
+            stake=float(data.get("stake", data.get("bet_amount", 1.0))),
+            max_variance=float(max_variance) if max_variance is not None else None,
+            workers=SLIP_SEARCH_WORKERS)
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    result.update({"success": True, "unknown_legs": unknown, "version": snapshot.version})
+    return json_response(result)
+
 # Keep backward compatibility for now with a redirect
 @app.route("/props", methods=["GET"])
 def redirect_props():
@@ -260,7 +561,7 @@ def get_past_picks():
                 "message": "No past picks found",
                 "picks": []
             }), 404
-        return jsonify(past_picks)
+        return json_response(past_picks)
     except Exception as e:
         return jsonify({
             "error": f"Failed to get past picks: {str(e)}",
@@ -334,36 +635,21 @@ def save_picks():
     
     if not username:
         # For non-authenticated users, respond with simulated result
-        import random
-        is_win = random.choice([True, False])
+        seed = new_seed()
+        is_win = coin_flip(generator(seed))
         
         # Calculate payout based on number of picks and mode
-        n_picks = len(picks)
-        multiplier = 0
-        
-        if mode == "PowerPlay":
-            # PowerPlay multiplier increases with each pick
-            if n_picks == 1: multiplier = 2
-            elif n_picks == 2: multiplier = 3
-            elif n_picks == 3: multiplier = 5
-            elif n_picks == 4: multiplier = 10
-            elif n_picks == 5: multiplier = 20
-            else: multiplier = 20 + (n_picks - 5) * 10
-        else:
-            # Flex mode
-            if n_picks == 3: multiplier = 2
-            elif n_picks == 4: multiplier = 3
-            elif n_picks == 5: multiplier = 5
-            else: multiplier = 5 + (n_picks - 5)
+        multiplier = payout_multiplier(mode, len(picks))
         
         payout = bet_amount * multiplier if is_win else 0
         
-        return jsonify({
+        return json_response({
             "success": True,
             "guest": True,
             "result": "win" if is_win else "loss",
             "payout": payout,
             "picks": picks,  # Return the picks data for the frontend to display
+            "seed": seed,
         }), 200
     
     # Get user data
@@ -376,28 +662,34 @@ def save_picks():
     if balance < bet_amount:
         return jsonify({"success": False, "error": "Insufficient balance"}), 400
     
-    # Process the picks (simulate a win/loss result)
-    import random
-    is_win = random.choice([True, False])
+    if data.get("settle") == "results":
+        # Left open until settlement.py grades it against actual results;
+        # the stake is taken now and the payout credited then
+        new_balance = balance - bet_amount
+        user_db.update_user_balance(username, new_balance)
+        user_db.add_pick_to_history(username, {
+            "created_at": int(datetime.now().timestamp()),
+            "picks": picks,
+            "bet_amount": bet_amount,
+            "mode": mode,
+            "result": "pending",
+            "payout": None,
+            "is_completed": False
+        })
+        return json_response({
+            "success": True,
+            "result": "pending",
+            "new_balance": new_balance,
+            "picks": picks
+        }), 200
+
+    # Process the picks (simulate a win/loss result), from a stream whose
+    # seed is kept with the pick so the result can be replayed
+    seed = new_seed()
+    is_win = coin_flip(generator(seed))
     
     # Calculate payout based on number of picks and mode
-    n_picks = len(picks)
-    multiplier = 0
-    
-    if mode == "PowerPlay":
-        # PowerPlay multiplier increases with each pick
-        if n_picks == 1: multiplier = 2
-        elif n_picks == 2: multiplier = 3
-        elif n_picks == 3: multiplier = 5
-        elif n_picks == 4: multiplier = 10
-        elif n_picks == 5: multiplier = 20
-        else: multiplier = 20 + (n_picks - 5) * 10
-    else:
-        # Flex mode
-        if n_picks == 3: multiplier = 2
-        elif n_picks == 4: multiplier = 3
-        elif n_picks == 5: multiplier = 5
-        else: multiplier = 5 + (n_picks - 5)
+    multiplier = payout_multiplier(mode, len(picks))
     
     payout = bet_amount * multiplier if is_win else 0
     
@@ -413,26 +705,76 @@ def save_picks():
         "mode": mode,
         "result": "win" if is_win else "loss",
         "payout": payout,
-        "is_completed": True
+        "is_completed": True,
+        "seed": seed
     }
     
     user_db.add_pick_to_history(username, pick_record)
     
-    return jsonify({
+    return json_response({
         "success": True,
         "result": "win" if is_win else "loss",
         "payout": payout,
         "new_balance": new_balance,
-        "picks": picks  # Return the picks data for the frontend to display
+        "picks": picks,  # Return the picks data for the frontend to display
+        "seed": seed
     }), 200
 
+@app.route("/api/picks/batch", methods=["POST"])
+def save_picks_batch():
+    """Place many slips at once: {"slips": [{picks, bet_amount, mode}, ...],
+    "settle": "simulate" | "results"}.
+
+    Slips are checked against the current board and graded together; for a
+    logged-in user every accepted slip and the new balance are saved in one
+    transaction.
+    """
+    username = session.get("username")
+    data = request.get_json(silent=True) or {}
+    slips = data.get("slips")
+    settle_mode = data.get("settle", "simulate")
+    if not isinstance(slips, list) or not slips:
+        return jsonify({"success": False, "error": "slips must be a non-empty list"}), 400
+    if len(slips) > MAX_BATCH_SLIPS:
+        return jsonify({"success": False, "error": f"At most {MAX_BATCH_SLIPS} slips per batch"}), 400
+    if settle_mode not in SETTLE_MODES:
+        return jsonify({"success": False, "error": f"settle must be one of {', '.join(SETTLE_MODES)}"}), 400
+    snapshot = current_props()
+    seed = new_seed()
+
+    if not username:
+        if settle_mode == "results":
+            return jsonify({"success": False, "error": "Log in to place slips for settlement"}), 401
+        graded = grade_batch(slips, snapshot.board_keys, seed)
+        return json_response({"success": True, "guest": True, "seed": seed,
+                              "results": slip_results(slips, graded)})
+
+    # Checked before the transaction, which always writes the database back
+    if user_db.find_user_key(user_db.load_db(), username) is None:
+        return jsonify({"success": False, "error": "User not found"}), 404
+    with user_db.transaction() as db_data:
+        user = db_data["users"][user_db.find_user_key(db_data, username)]
+        balance = user.get("balance", STARTING_BALANCE)
+        graded = grade_batch(slips, snapshot.board_keys, seed, settle_mode, balance)
+        new_balance = balance - float(graded["stake"].sum()) + float(graded["payout"].sum())
+        user["balance"] = new_balance
+        user.setdefault("picks_history", []).extend(history_records(slips, graded, seed, settle_mode))
+
+    return json_response({
+        "success": True,
+        "accepted": int(graded["accepted"].sum()),
+        "new_balance": new_balance,
+        "seed": seed,
+        "results": slip_results(slips, graded, settle_mode),
+    })
+
 @app.route("/api/past-picks", methods=["GET"])
 def get_user_past_picks():
     username = session.get("username")
     
     if not username:
         # For non-authenticated users, load sample data
-        return jsonify(load_past_picks()), 200
+        return json_response(load_past_picks())
     
     # Get user picks history
     picks_history = user_db.get_user_picks_history(username)
@@ -440,7 +782,8 @@ def get_user_past_picks():
     if not picks_history:
         return jsonify({"message": "No past picks found", "picks": []}), 404
     
-    return jsonify(picks_history), 200
+    return json_response(picks_history)
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
+    # The debug reloader would import this module twice and run two scrapers
+    app.run(debug=True, port=5000, use_reloader=not SCRAPE_IN_API)
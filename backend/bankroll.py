@@ -0,0 +1,162 @@
+"""
+Bankroll trajectories over many slips.
+
+Every path starts from the same balance and bets the same slip over and
+over; each bet's payout multiplier is drawn from the slip's exact payout
+distribution (simulator.loss_distributions). All paths of a chunk advance
+together as arrays, one bet at a time, so memory stays at a few arrays of
+CHUNK_PATHS floats however many paths and bets are asked for.
+
+Bet sizing strategies:
+    fixed     - the same stake every bet (or what is left, if less)
+    fraction  - a fixed fraction of the current balance
+    kelly     - the fraction maximising expected log growth for this slip,
+                scaled by kelly_multiplier (0.5 for half Kelly)
+
+A path is ruined once its balance falls below min_bet, the smallest bet the
+app accepts. Chunk i draws from child stream i of the seed record, so a
+run replays exactly and can be spread across processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from payouts import normalize_mode, payout_table
+from rng_service import generator, new_seed, spawn_seeds
+from simulator import DEFAULT_PERCENTILES, loss_distributions, validate_probabilities
+
+# Balance given to every new account (user_db.register_user)
+STARTING_BALANCE = 1000.0
+CHUNK_PATHS = 10_000
+# Bets per block of uniforms drawn at once, CHUNK_PATHS x BET_BLOCK floats
+BET_BLOCK = 100
+MAX_PATH_BETS = 10**9
+TRAJECTORY_POINTS = 20
+STRATEGIES = ("fixed", "fraction", "kelly")
+
+def payout_distribution(hit_probs, mode="PowerPlay"):
+    """(multipliers, probabilities) of one slip's payout outcomes."""
+    probs = validate_probabilities(hit_probs)
+    n_legs = len(probs)
+    return payout_table(mode)[n_legs, :n_legs + 1].copy(), loss_distributions(probs)[0]
+
+def kelly_fraction(multipliers, outcome_probs):
+    """Fraction of the balance that maximises E[log balance] for one bet.
+
+    0 for a slip with no edge. Solved by bisection on the derivative, which
+    decreases in the fraction.
+    """
+    gains = np.asarray(multipliers, dtype=float) - 1
+    outcome_probs = np.asarray(outcome_probs, dtype=float)
+    if outcome_probs @ gains <= 0:
+        return 0.0
+    if (gains[outcome_probs > 0] >= 0).all():
+        return 1.0
+    low, high = 0.0, 1.0
+    for _ in range(100):
+        f = (low + high) / 2
+        with np.errstate(divide="ignore"):
+            slope = outcome_probs @ (gains / (1 + f * gains))
+        low, high = (f, high) if slope > 0 else (low, f)
+    return low
+
+def _simulate_chunk(args):
+    (n_paths, n_bets, multipliers, cumulative, strategy, stake, fraction,
+     starting_balance, min_bet, checkpoints, record) = args
+    rng = generator(record)
+    balance = np.full(n_paths, starting_balance)
+    peak = balance.copy()
+    max_drawdown = np.zeros(n_paths)
+    ruined_at = np.full(n_paths, -1, dtype=np.int64)
+    trajectory = np.empty((len(checkpoints), n_paths), dtype=np.float32)
+    next_checkpoint = 0
+
+    for block_start in range(0, n_bets, BET_BLOCK):
+        block = min(BET_BLOCK, n_bets - block_start)
+        # Outcome index per (bet, path) from the cumulative outcome probabilities
+        outcomes = np.searchsorted(cumulative, rng.random((block, n_paths)), side="right")
+        outcomes = np.minimum(outcomes, len(multipliers) - 1)
+        for i in range(block):
+            bet_number = block_start + i
+            alive = balance >= min_bet
+            if strategy == "fixed":
+                bet = np.minimum(stake, balance)
+            else:
+                bet = fraction * balance
+            bet = np.where(alive, bet, 0.0)
+            balance += bet * (multipliers[outcomes[i]] - 1)
+            np.maximum(peak, balance, out=peak)
+            np.maximum(max_drawdown, 1 - balance / peak, out=max_drawdown)
+            ruined_at[(ruined_at < 0) & alive & (balance < min_bet)] = bet_number + 1
+            while next_checkpoint < len(checkpoints) and checkpoints[next_checkpoint] == bet_number + 1:
+                trajectory[next_checkpoint] = balance
+                next_checkpoint += 1
+
+    return balance, max_drawdown, ruined_at, trajectory
+
+def _percentiles(values, percentiles):
+    return {str(q): float(v) for q, v in zip(percentiles, np.percentile(values, percentiles))}
+
+def simulate_bankroll(hit_probs, mode="PowerPlay", strategy="fixed", n_paths=10_000, n_bets=1000,
+                      stake=10.0, fraction=0.01, kelly_multiplier=1.0,
+                      starting_balance=STARTING_BALANCE, min_bet=1.0, seed=None, workers=1,
+                      percentiles=DEFAULT_PERCENTILES):
+    """Simulate n_paths bankrolls betting the same slip n_bets times.
+
+    Returns risk of ruin, final balance and max drawdown distributions, and
+    balance percentiles at TRAJECTORY_POINTS evenly spaced bets.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {', '.join(STRATEGIES)}")
+    if n_paths < 1 or n_bets < 1 or n_paths * n_bets > MAX_PATH_BETS:
+        raise ValueError(f"paths x bets must be between 1 and {MAX_PATH_BETS:,}")
+    if starting_balance <= 0 or min_bet <= 0:
+        raise ValueError("starting_balance and min_bet must be positive")
+    multipliers, outcome_probs = payout_distribution(hit_probs, mode)
+
+    kelly = kelly_fraction(multipliers, outcome_probs)
+    if strategy == "kelly":
+        fraction = kelly * kelly_multiplier
+    if strategy == "fixed" and stake <= 0:
+        raise ValueError("stake must be positive")
+    if strategy != "fixed" and not 0 <= fraction <= 1:
+        raise ValueError("fraction must be between 0 and 1")
+
+    seed = seed if seed is not None else new_seed()
+    cumulative = np.cumsum(outcome_probs)
+    checkpoints = np.unique(np.linspace(0, n_bets, TRAJECTORY_POINTS + 1)[1:].round().astype(int))
+    chunks = [min(CHUNK_PATHS, n_paths - start) for start in range(0, n_paths, CHUNK_PATHS)]
+    tasks = [(chunk, n_bets, multipliers, cumulative, strategy, stake, fraction, starting_balance,
+              min_bet, checkpoints, record)
+             for chunk, record in zip(chunks, spawn_seeds(seed, len(chunks)))]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    else:
+        results = [_simulate_chunk(task) for task in tasks]
+
+    final = np.concatenate([r[0] for r in results])
+    drawdown = np.concatenate([r[1] for r in results])
+    ruined_at = np.concatenate([r[2] for r in results])
+    trajectory = np.concatenate([r[3] for r in results], axis=1)
+    ruined = ruined_at > 0
+
+    return {
+        "mode": normalize_mode(mode),
+        "legs": len(multipliers) - 1,
+        "strategy": strategy,
+        "paths": n_paths,
+        "bets": n_bets,
+        "starting_balance": starting_balance,
+        "stake": stake if strategy == "fixed" else None,
+        "fraction": fraction if strategy != "fixed" else None,
+        "kelly_fraction": kelly,
+        "expected_multiplier": float(outcome_probs @ multipliers),
+        "risk_of_ruin": float(ruined.mean()),
+        "median_bets_to_ruin": float(np.median(ruined_at[ruined])) if ruined.any() else None,
+        "final_balance_mean": float(final.mean()),
+        "final_balance_percentiles": _percentiles(final, percentiles),
+        "max_drawdown_mean": float(drawdown.mean()),
+        "max_drawdown_percentiles": _percentiles(drawdown, percentiles),
+        "trajectory": [{"bet": int(bet), "percentiles": _percentiles(row, percentiles)}
+                       for bet, row in zip(checkpoints, trajectory)],
+        "seed": seed,
+    }
@@ -0,0 +1,244 @@
+"""
+Benchmarks for the props endpoints, run against a synthetic board.
+
+Usage: python bench_props.py [rows ...]
+"""
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from pick_player_props import format_props, find_player_props
+from props_columnar import read_columnar, write_columnar
+from player_index import PlayerIndex
+from line_history import LineHistory
+import serialization
+from serialization import dumps_frame, stream_ndjson
+
+SPORTS = ["NFL", "NBA", "MLB", "NHL", "SOCCER", "ESPORTS", "TENNIS", "WNBA"]
+STATS = ["points", "rebounds", "assists", "passing_yds", "rushing_yds", "strikeouts",
+         "shots_attempted", "kills_on_maps_1_2", "period_1_2_goals", "hits"]
+
+def make_props_frame(n_rows, seed=0):
+    """Build a frame shaped like underdog_props.csv with n_rows rows."""
+    rng = np.random.default_rng(seed)
+    n_players = max(n_rows // 20, 1)
+    player_ids = rng.integers(0, n_players, n_rows)
+    first = np.array([f"First{i}" for i in range(n_players)], dtype=object)
+    last = np.array([f"Last{i}" for i in range(n_players)], dtype=object)
+    stat_value = rng.integers(0, 80, n_rows) + 0.5
+    # A few holes so the fallback columns get exercised
+    stat_value[rng.random(n_rows) < 0.01] = np.nan
+    return pd.DataFrame({
+        "player_id": player_ids.astype(str),
+        "first_name": first[player_ids],
+        "last_name": last[player_ids],
+        "full_name": first[player_ids] + " " + last[player_ids],
+        "sport_id": np.array(SPORTS, dtype=object)[rng.integers(0, len(SPORTS), n_rows)],
+        "team_id": rng.integers(0, 500, n_rows).astype(str),
+        "position_id": rng.integers(0, 30, n_rows).astype(str),
+        "appearance_id": player_ids.astype(str),
+        "id": np.arange(n_rows).astype(str),
+        "stat_name": np.array(STATS, dtype=object)[rng.integers(0, len(STATS), n_rows)],
+        "stat_value": stat_value,
+        "line": stat_value,
+        "choice": np.where(rng.random(n_rows) < 0.5, "over", "under"),
+        "payout_multiplier": rng.choice([0.85, 1.0, 1.03, 1.06], n_rows),
+    })
+
+def format_props_iterrows(df):
+    """The original row-by-row /api/props/formatted loop, kept for comparison."""
+    props = []
+    processed = set()
+    for _, row in df.iterrows():
+        player_value = row.get("full_name")
+        player = player_value if pd.notna(player_value) else "Unknown Player"
+        stat = None
+        for stat_col in ["stat_name", "type_over_under", "selection_subheader"]:
+            if stat_col in row and pd.notna(row[stat_col]):
+                stat = row[stat_col]
+                break
+        if stat is None or pd.isna(stat):
+            stat = "Unknown Stat"
+        value = None
+        for val_col in ["stat_value", "line", "value", "non_discounted_stat_value"]:
+            if val_col in row and pd.notna(row[val_col]):
+                value = row[val_col]
+                break
+        if value is None or pd.isna(value):
+            value = "0"
+        sport = "Unknown Sport"
+        for sport_col in ["sport_id", "sport", "sport_name", "league", "league_id"]:
+            if sport_col in row and pd.notna(row[sport_col]):
+                sport = row[sport_col]
+                break
+        key = f"{player}|{stat}|{value}"
+        if key in processed:
+            continue
+        processed.add(key)
+        props.append({"player": player, "stat": stat, "value": value, "sport": sport})
+    return props
+
+def timed(func, *args, repeat=1):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def bench_formatted(sizes):
+    print("Formatted props table (/api/props/formatted)")
+    print(f"{'rows':>10} {'iterrows':>12} {'vectorized':>12} {'speedup':>10} {'cached':>12}")
+    for n in sizes:
+        df = make_props_frame(n)
+        old_time, old = timed(format_props_iterrows, df)
+        new_time, new = timed(format_props, df, repeat=3)
+        assert old == new, "vectorized table disagrees with the original loop"
+        # What the endpoint pays per request once the table is cached
+        slice_time, _ = timed(lambda: new[:], repeat=10)
+        print(f"{n:>10} {old_time:>11.3f}s {new_time:>11.3f}s {old_time / new_time:>9.1f}x"
+              f" {slice_time * 1000:>10.3f}ms")
+
+def bench_load(sizes):
+    print("\nCold load (load_props)")
+    print(f"{'rows':>10} {'read_csv':>12} {'columnar':>12} {'speedup':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            df = make_props_frame(n)
+            csv_path = os.path.join(tmp, f"props_{n}.csv")
+            cols_path = os.path.join(tmp, f"props_{n}.cols")
+            df.to_csv(csv_path, index=False)
+            write_columnar(df, cols_path)
+            csv_time, _ = timed(pd.read_csv, csv_path)
+            cols_time, _ = timed(read_columnar, cols_path, repeat=3)
+            print(f"{n:>10} {csv_time:>11.3f}s {cols_time:>11.3f}s {csv_time / cols_time:>9.1f}x")
+
+def bench_search(sizes, queries=("first12", "last4", "st99 la", "zz")):
+    print("\nPlayer search (/api/props/player, autocomplete)")
+    print(f"{'rows':>10} {'str.contains':>14} {'index':>12} {'autocomplete':>14}")
+    for n in sizes:
+        df = make_props_frame(n)
+        index = PlayerIndex.from_frame(df)
+        scan = lambda: [find_player_props(df, q) for q in queries]
+        indexed = lambda: [find_player_props(df, q, index) for q in queries]
+        complete = lambda: [index.autocomplete(q, 10) for q in queries]
+        scan_time, _ = timed(scan, repeat=3)
+        index_time, _ = timed(indexed, repeat=3)
+        complete_time, _ = timed(complete, repeat=20)
+        per_query = 1000 / len(queries)
+        print(f"{n:>10} {scan_time * per_query:>12.3f}ms {index_time * per_query:>10.3f}ms"
+              f" {complete_time * per_query:>12.3f}ms")
+
+def full_props_body(df):
+    """The original /api/props body: copy, to_dict and one json.dumps."""
+    import json
+    class NaNHandler(json.JSONEncoder):
+        def default(self, obj):
+            if pd.isna(obj):
+                return None
+            return super().default(obj)
+    return json.dumps(df.replace({pd.NA: None}).to_dict(orient="records"), cls=NaNHandler)
+
+def bench_encode(sizes):
+    print("\nEncoding the full board")
+    print(f"{'rows':>10} {'NaNHandler':>12} {'columns+json':>14} {'columns+orjson':>16}")
+    accelerated = serialization.orjson
+    for n in sizes:
+        df = make_props_frame(n)
+        old_time, _ = timed(full_props_body, df)
+        serialization.orjson = None
+        std_time, _ = timed(dumps_frame, df, repeat=3)
+        serialization.orjson = accelerated
+        fast = f"{timed(dumps_frame, df, repeat=3)[0]:>15.3f}s" if accelerated else f"{'n/a':>16}"
+        print(f"{n:>10} {old_time:>11.3f}s {std_time:>13.3f}s {fast}")
+
+def drain(make_chunks):
+    """Time to the first chunk and to the last one, chunks discarded as sent."""
+    start = time.perf_counter()
+    first = None
+    for _ in make_chunks():
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+def traced_peak(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_stream(sizes):
+    print("\nFull board (/api/props): single body vs ?stream=ndjson")
+    print(f"{'rows':>10} {'body ttfb':>12} {'body peak':>12} {'ndjson ttfb':>12} {'ndjson total':>13} {'ndjson peak':>12}")
+    for n in sizes:
+        df = make_props_frame(n)
+        body = lambda: iter([full_props_body(df)])
+        stream = lambda: stream_ndjson(df)
+        body_first, _ = drain(body)
+        stream_first, stream_total = drain(stream)
+        body_peak = traced_peak(lambda: drain(body))
+        stream_peak = traced_peak(lambda: drain(stream))
+        print(f"{n:>10} {body_first:>11.3f}s {body_peak / 2**20:>10.1f}MB {stream_first * 1000:>10.2f}ms"
+              f" {stream_total:>12.3f}s {stream_peak / 2**20:>10.1f}MB")
+
+def bench_pages(sizes, page_size=500):
+    """Bytes and latency per request through the Flask app."""
+    import api
+    from props_store import PropsSnapshot
+    api.props_store.stop()
+    client = api.app.test_client()
+    requests = [
+        ("full board", "/api/props"),
+        ("page", f"/api/props?page_size={page_size}"),
+        ("page + fields", f"/api/props?page_size={page_size}&fields=full_name,stat_name,stat_value,sport_id"),
+        ("page + filter", f"/api/props?page_size={page_size}&sport=NBA&stat=points"),
+        ("formatted", "/api/props/formatted"),
+        ("formatted page", f"/api/props/formatted?page_size={page_size}&sport=NBA"),
+    ]
+    print(f"\nProps pages through the app (page_size={page_size})")
+    print(f"{'rows':>10} {'request':<16} {'bytes':>12} {'latency':>10}")
+    for n in sizes:
+        api.props_store.current = PropsSnapshot(make_props_frame(n), f"bench-{n}")
+        for label, url in requests:
+            elapsed, response = timed(client.get, url, repeat=3)
+            print(f"{n:>10} {label:<16} {len(response.data):>12,} {elapsed * 1000:>8.1f}ms")
+
+def bench_history(sizes, scrapes=1000, move_rate=0.02, interval=300):
+    """Recording 5-minute scrapes into the line history and querying it."""
+    print(f"\nLine history ({scrapes} scrapes, {move_rate:.0%} of lines moving per scrape)")
+    print(f"{'rows':>10} {'record':>10} {'segments':>9} {'events':>10} {'player':>10} {'movers 1d':>10}")
+    for n in sizes:
+        rng = np.random.default_rng(n)
+        board = make_props_frame(n)
+        lines = board["stat_value"].to_numpy().copy()
+        with tempfile.TemporaryDirectory() as tmp:
+            history = LineHistory(os.path.join(tmp, "history"))
+            record_time = 0.0
+            for scrape in range(scrapes):
+                moved = rng.random(n) < move_rate
+                lines[moved] += rng.choice([-1.0, 1.0], moved.sum())
+                board["stat_value"] = lines
+                start = time.perf_counter()
+                history.record(board, scraped_at=scrape * interval)
+                record_time += time.perf_counter() - start
+            end = scrapes * interval
+            player_time, _ = timed(history.line_history, board["full_name"].iloc[0], repeat=3)
+            movers_time, _ = timed(history.movers, end - 86_400, end, repeat=3)
+            print(f"{n:>10} {record_time / scrapes * 1000:>8.1f}ms {len(history.segments()):>9}"
+                  f" {len(history.events()):>10,} {player_time * 1000:>8.1f}ms {movers_time * 1000:>8.1f}ms")
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    bench_formatted(sizes)
+    bench_load(sizes)
+    bench_search(sizes)
+    bench_stream(sizes)
+    bench_encode(sizes)
+    bench_pages(sizes)
+    bench_history([n for n in sizes if n <= 100_000])
@@ -0,0 +1,358 @@
+"""
+Benchmarks for the scraper's processing of the Underdog pick'em payload.
+
+Runs against a recorded payload when one is given, otherwise against a
+synthetic payload with the same shape (players, appearances and
+over_under_lines with nested over_under/appearance_stat and options).
+Record one with:
+
+    python bench_scraper.py --record payload.json
+
+Usage: python bench_scraper.py [payload.json | lines ...] [--workers 1,2,4]
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from pick_player_props import compact_props
+from props_columnar import columnar_path, write_columnar
+from underdog_scraper import UnderdogScraper, csv_column_names, shard_pool
+
+SPORTS = ["NFL", "NBA", "MLB", "NHL", "SOCCER", "ESPORTS", "TENNIS", "WNBA"]
+# Share of players per sport on a busy NFL Sunday, for the sharding benchmark
+SUNDAY_WEIGHTS = [0.55, 0.12, 0.1, 0.08, 0.08, 0.02, 0.03, 0.02]
+STATS = ["points", "rebounds", "assists", "passing_yds", "rushing_yds", "strikeouts",
+         "shots_attempted", "kills_on_maps_1_2", "period_1_2_goals", "hits"]
+
+def _uuid(rng, n):
+    # uuid4-shaped strings, deterministic for a seed
+    digits = rng.integers(0, 16, (n, 32))
+    text = ["".join("0123456789abcdef"[d] for d in row) for row in digits]
+    return [f"{t[:8]}-{t[8:12]}-4{t[13:16]}-{t[16:20]}-{t[20:]}" for t in text]
+
+def make_payload(n_lines, seed=0, sport_weights=None):
+    """A payload shaped like the v5 over_under_lines response with n_lines lines.
+
+    Most lines offer higher and lower, some only one side; a few players
+    have no appearance, some appearances no team (individual sports), and
+    about 2% of lines are suspended. Players are spread evenly over SPORTS
+    unless sport_weights gives each sport's share.
+    """
+    rng = np.random.default_rng(seed)
+    n_players = max(n_lines // 6, 1)
+    n_teams = max(n_players // 10, 1)
+    team_ids = _uuid(rng, n_teams)
+    player_ids = _uuid(rng, n_players)
+    sports = (rng.integers(0, len(SPORTS), n_players) if sport_weights is None
+              else rng.choice(len(SPORTS), n_players, p=sport_weights))
+    teams = rng.integers(0, n_teams, n_players)
+    positions = rng.integers(1, 30, n_players)
+    players, appearances = [], []
+    appearance_ids = _uuid(rng, n_players)
+    for i in range(n_players):
+        sport = SPORTS[sports[i]]
+        team_id = None if sport in ("TENNIS", "ESPORTS") and i % 3 == 0 else team_ids[teams[i]]
+        players.append({
+            "id": player_ids[i], "country": None if i % 4 else "US",
+            "first_name": f"First{i}", "last_name": f"Last{i}",
+            "image_url": f"https://assets.underdogfantasy.com/players/{player_ids[i]}.png",
+            "jersey_number": int(rng.integers(0, 99)) if team_id else None,
+            "position_id": int(positions[i]), "position_name": f"P{positions[i]}",
+            "sport_id": sport, "team_id": team_id,
+        })
+        if i % 50 == 49:
+            # Listed without an appearance on this board
+            continue
+        appearances.append({
+            "id": appearance_ids[i], "badges": [], "lineup_status_id": None,
+            "match_id": int(100000 + teams[i] // 2), "match_type": "Game",
+            "player_id": player_ids[i], "position_id": int(positions[i]), "team_id": team_id,
+        })
+
+    line_ids = _uuid(rng, n_lines)
+    option_ids = _uuid(rng, 2 * n_lines)
+    owners = rng.integers(0, len(appearances), n_lines)
+    stat_values = rng.integers(0, 80, n_lines) + 0.5
+    multipliers = rng.choice(["0.85", "1.0", "1.03", "1.06", "1.2"], (n_lines, 2))
+    sides = rng.integers(0, 4, n_lines)
+    lines = []
+    for i in range(n_lines):
+        appearance = appearances[owners[i]]
+        stat = STATS[i % len(STATS)]
+        value = f"{stat_values[i]}"
+        options = []
+        for j, (choice, display) in enumerate((("higher", "Higher"), ("lower", "Lower"))):
+            # One side only on a quarter of the lines
+            if sides[i] == j + 1:
+                continue
+            options.append({
+                "id": option_ids[2 * i + j], "choice": choice, "choice_display": display,
+                "over_under_line_id": line_ids[i], "payout_multiplier": multipliers[i, j],
+                "selection_header": f"{stat} {display}", "selection_subheader": f"{value} {stat}",
+            })
+        lines.append({
+            "id": line_ids[i], "expires_at": None, "live_event": False, "live_event_stat": None,
+            "line_type": "balanced", "non_discounted_stat_value": None,
+            "options": options,
+            "over_under": {
+                "appearance_stat": {"id": line_ids[i], "appearance_id": appearance["id"],
+                                    "display_stat": stat.replace("_", " ").title(),
+                                    "graded_by": "statistic", "pickem_stat_id": None, "stat": stat},
+                "category": "player_prop", "grid_display_title": None, "has_alternates": False,
+                "id": line_ids[i], "option_priority": "none", "scoring_type_id": None,
+                "title": f"{stat} O/U",
+            },
+            "over_under_id": line_ids[i], "rank": i, "sort_by": i,
+            "stat_value": value, "status": "suspended" if i % 50 == 7 else "active",
+        })
+    return {"players": players, "appearances": appearances, "over_under_lines": lines,
+            "games": [], "solo_games": []}
+
+def process_data_original(scraper, players, appearances, over_under_lines):
+    """The original row-wise process_data, kept for comparison."""
+    players = players.rename(columns={"id": "player_id"})
+    appearances = appearances.rename(columns={"id": "appearance_id"})
+
+    player_appearances = players.merge(appearances, on=["player_id", "position_id", "team_id"], how="left")
+
+    over_under_lines = over_under_lines.reset_index(drop=True)
+    over_under_lines_expanded = over_under_lines.explode("options")
+
+    options_df = pd.json_normalize(over_under_lines_expanded["options"])
+
+    over_under_lines_expanded = pd.concat([over_under_lines_expanded.drop("options", axis=1).reset_index(drop=True),
+                                        options_df.reset_index(drop=True)], axis=1)
+
+    over_under_lines_expanded["appearance_id"] = over_under_lines_expanded["over_under"].apply(lambda x: x["appearance_stat"]["appearance_id"])
+    over_under_lines_expanded["stat_name"] = over_under_lines_expanded["over_under"].apply(lambda x: x["appearance_stat"]["stat"])
+
+    columns_to_remove = ['expires_at', 'live_event', 'live_event_stat']
+    over_under_lines_expanded = over_under_lines_expanded.drop(columns=columns_to_remove, errors='ignore')
+
+    over_under_lines_expanded["choice"] = over_under_lines_expanded["choice"].map({"lower": "under", "higher": "over"}).fillna(over_under_lines_expanded["choice"])
+
+    underdog_props = player_appearances.merge(over_under_lines_expanded, on="appearance_id", how="left", suffixes=("", "_over_under"))
+    underdog_props["full_name"] = underdog_props["first_name"] + " " + underdog_props["last_name"]
+
+    return scraper.apply_name_corrections(underdog_props)
+
+def timed(func, *args, repeat=1):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def board_csv(scraper, processed):
+    """The text underdog_props.csv would hold for a processed board."""
+    return scraper.filter_data(processed).to_csv(index=False)
+
+def bench_process(payloads):
+    scraper = UnderdogScraper()
+    print("Payload processing (process_data, same board as the original)")
+    print(f"{'lines':>10} {'rows':>10} {'original':>12} {'columnar':>12} {'speedup':>10}")
+    for payload in payloads:
+        frames = scraper.combine_data(payload)
+        old_time, old = timed(process_data_original, scraper, *frames, repeat=3)
+        new_time, new = timed(scraper.process_data, *frames, repeat=3)
+        assert board_csv(scraper, old) == board_csv(scraper, new), "columnar board differs from the original"
+        print(f"{len(payload['over_under_lines']):>10} {len(new):>10} {old_time:>11.3f}s"
+              f" {new_time:>11.3f}s {old_time / new_time:>9.1f}x")
+
+def bench_shards(payloads, workers=(1, 2, 4)):
+    """process_by_sport against one pass over the whole payload.
+
+    Both sides include saving the whole board's columnar file, and
+    process_by_sport every sport's partition too. Shows when the whole
+    board and the first (smallest) sport were saved, for a pool of each
+    size (1 processes the sports in turn).
+    """
+    print(f"\nProcessing by sport ({os.cpu_count()} CPUs)")
+    print(f"{'lines':>10} {'sports':>7} {'workers':>8} {'board':>10} {'first sport':>12} {'speedup':>8}")
+    for payload in payloads:
+        with tempfile.TemporaryDirectory() as tmp:
+            scraper = UnderdogScraper(os.path.join(tmp, "underdog_props.csv"))
+            frames = scraper.combine_data(payload)
+            def save(board):
+                compacted, _ = compact_props(board.set_axis(csv_column_names(board.columns), axis=1),
+                                             report=False)
+                write_columnar(compacted, columnar_path(scraper.csv_path))
+                return board
+            def sharded():
+                # Without old partitions every sport is saved and published
+                scraper.remove_partitions()
+                return save(scraper.process_by_sport(*frames))
+            single_time, single = timed(lambda: save(scraper.filter_data(scraper.process_data(*frames))),
+                                        repeat=3)
+            n_lines = len(payload["over_under_lines"])
+            print(f"{n_lines:>10} {'-':>7} {'one pass':>8} {single_time:>9.3f}s {'-':>12} {1:>7.1f}x")
+            for n in workers:
+                scraper.pool = shard_pool({"shard_workers": n})
+                best = float("inf")
+                try:
+                    # The first run also starts the pool's workers
+                    for _ in range(3):
+                        elapsed, board = timed(sharded)
+                        if elapsed < best:
+                            best, first = elapsed, min(scraper.partition_seconds.values())
+                finally:
+                    if scraper.pool is not None:
+                        scraper.pool.shutdown()
+                    scraper.pool = None
+                assert board.to_csv(index=False) == single.to_csv(index=False), "sharded board differs"
+                print(f"{n_lines:>10} {len(scraper.partition_seconds):>7} {n:>8} {best:>9.3f}s"
+                      f" {first:>11.3f}s {single_time / best:>7.1f}x")
+
+class StandIn:
+    """State of a local stand-in for the pick'em endpoint."""
+    def __init__(self, body, etag=True, compress=True):
+        self.body = body
+        self.etag = etag
+        self.compress = compress
+        self.fail_next = 0
+        self.requests = []
+        self.url = None
+        self._compressed = (None, None)
+
+    def response(self, headers):
+        """(status, headers, body) for a GET with the given request headers."""
+        self.requests.append(dict(headers))
+        if self.fail_next:
+            self.fail_next -= 1
+            return 503, {"Retry-After": "0"}, b""
+        tag = f'"{hashlib.sha256(self.body).hexdigest()[:16]}"'
+        if self.etag and headers.get("If-None-Match") == tag:
+            return 304, {"ETag": tag}, b""
+        out = {"Content-Type": "application/json"}
+        if self.etag:
+            out["ETag"] = tag
+        body = self.body
+        if self.compress and "gzip" in headers.get("Accept-Encoding", ""):
+            # Compressed once per body, as a server or CDN would cache it
+            if self._compressed[0] is not body:
+                self._compressed = (body, gzip.compress(body, compresslevel=5))
+            body = self._compressed[1]
+            out["Content-Encoding"] = "gzip"
+        return 200, out, body
+
+@contextmanager
+def serve_payload(body, etag=True, compress=True):
+    """Serve body from a local stand-in for the pick'em endpoint; yields the StandIn."""
+    stand_in = StandIn(body, etag, compress)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            status, headers, body = stand_in.response(self.headers)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stand_in.url = f"http://127.0.0.1:{server.server_port}/over_under_lines"
+    try:
+        yield stand_in
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def traced(func):
+    """(seconds, peak traced bytes, result) of one call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def bench_stream(payloads):
+    """Fetching and parsing through a local stand-in: json.loads vs streaming."""
+    scraper = UnderdogScraper()
+    print("\nFetch + parse from a local server (peak traced memory)")
+    print(f"{'body MB':>10} {'loads':>10} {'loads MB':>10} {'stream':>10} {'stream MB':>10}")
+    for payload in payloads:
+        body = json.dumps(payload).encode("utf-8")
+        with serve_payload(body, etag=False, compress=False) as stand_in:
+            scraper.fetcher.url = stand_in.url
+            old_time, old_peak, old = traced(lambda: scraper.combine_data(scraper.fetch_data()))
+            scraper.fetcher.forget()
+            new_time, new_peak, new = traced(scraper.stream_data)
+        old_csv = board_csv(scraper, scraper.process_data(*old))
+        assert old_csv == board_csv(scraper, scraper.process_data(*new)), "streamed board differs"
+        print(f"{len(body) / 1e6:>10.1f} {old_time:>9.2f}s {old_peak / 1e6:>10.1f}"
+              f" {new_time:>9.2f}s {new_peak / 1e6:>10.1f}")
+
+def bench_fetch(payloads):
+    """Fetch metrics through a local stand-in: full, compressed, revalidated."""
+    print("\nFetches from a local server (stream_data)")
+    print(f"{'body MB':>10} {'fetch':<22} {'status':>6} {'wire MB':>9} {'elapsed':>9}")
+    for payload in payloads:
+        body = json.dumps(payload).encode("utf-8")
+        runs = [
+            ("identity", dict(etag=False, compress=False), False),
+            ("gzip", dict(etag=False, compress=True), False),
+            ("same body (hash)", dict(etag=False, compress=True), True),
+            ("same body (304)", dict(etag=True, compress=True), True),
+        ]
+        for label, options, repeat in runs:
+            scraper = UnderdogScraper()
+            with serve_payload(body, **options) as stand_in:
+                scraper.fetcher.url = stand_in.url
+                if repeat:
+                    scraper.stream_data()
+                scraper.stream_data()
+            metrics = scraper.fetcher.last_metrics
+            print(f"{len(body) / 1e6:>10.1f} {label:<22} {metrics['status']:>6}"
+                  f" {metrics['wire_bytes'] / 1e6:>9.2f} {metrics['elapsed_seconds']:>8.2f}s")
+
+def record_payload(path):
+    """Save the live payload to path for benchmarking."""
+    scraper = UnderdogScraper()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(scraper.fetch_data(), f)
+    print(f"Payload saved to {path}")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = (1, 2, 4)
+    if "--workers" in args:
+        at = args.index("--workers")
+        workers = tuple(int(n) for n in args[at + 1].split(","))
+        del args[at:at + 2]
+    if args[:1] == ["--record"]:
+        record_payload(args[1] if len(args) > 1 else "payload.json")
+    elif args and args[0].endswith(".json"):
+        with open(args[0], encoding="utf-8") as f:
+            payloads = [json.load(f)]
+        bench_process(payloads)
+        bench_shards(payloads, workers)
+        bench_stream(payloads)
+        bench_fetch(payloads)
+    else:
+        sizes = [int(arg) for arg in args] or [1_000, 10_000, 50_000]
+        payloads = [make_payload(n) for n in sizes]
+        bench_process(payloads)
+        bench_shards([make_payload(n, sport_weights=SUNDAY_WEIGHTS) for n in sizes], workers)
+        bench_stream(payloads)
+        bench_fetch(payloads)
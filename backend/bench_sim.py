@@ -0,0 +1,159 @@
+"""
+Benchmarks for the slip simulators.
+
+Usage: python bench_sim.py [trials]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from simulator import evaluate_slips, exact_slip, simulate_slip
+from slip_builder import optimize_slips
+from bankroll import simulate_bankroll
+from rng_service import seed_from
+from settlement import ResultIndex, settle_open_slips
+
+def bench_monte_carlo(trials):
+    print(f"Monte Carlo, {trials:,} trials")
+    print(f"{'legs':>6} {'mode':>10} {'seconds':>10} {'EV':>10}")
+    rng = np.random.default_rng(0)
+    for legs in (2, 4, 6, 8):
+        probs = rng.uniform(0.45, 0.65, legs)
+        for mode in ("PowerPlay", "Flex"):
+            start = time.perf_counter()
+            result = simulate_slip(probs, mode, trials, rng=rng)
+            elapsed = time.perf_counter() - start
+            print(f"{legs:>6} {mode:>10} {elapsed:>10.3f} {result['expected_payout']:>10.4f}")
+
+def bench_exact(n_slips=100_000):
+    print(f"\nExact Poisson-binomial, {n_slips:,} slips of 2-8 legs in one batch")
+    rng = np.random.default_rng(0)
+    n_legs = rng.integers(2, 9, n_slips)
+    probs = rng.uniform(0.45, 0.65, (n_slips, 8))
+    probs[np.arange(8) >= n_legs[:, None]] = 1.0
+    flex = n_legs >= 3
+    start = time.perf_counter()
+    expected, _, _ = evaluate_slips(probs, n_legs, flex)
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(1000):
+        exact_slip(probs[i, :n_legs[i]], "Flex" if flex[i] else "PowerPlay")
+    single = (time.perf_counter() - start) / 1000
+    print(f"batch: {elapsed:.3f}s ({n_slips / elapsed:,.0f} slips/s), single slip: {single * 1e6:.0f}us")
+
+def bench_optimizer(n_props=5000):
+    print(f"\nOptimal slips over {n_props:,} props (both sides), PowerPlay and Flex, 2-8 legs")
+    rng = np.random.default_rng(0)
+    p = rng.uniform(0.4, 0.6, n_props)
+    legs = pd.DataFrame({
+        "player": [f"Player {i // 4}" for i in range(n_props)] * 2,
+        "stat": [f"stat{i % 4}" for i in range(n_props)] * 2,
+        "line": np.tile(rng.integers(1, 40, n_props) + 0.5, 2),
+        "pick": ["over"] * n_props + ["under"] * n_props,
+        "probability": np.concatenate([p, 0.96 - p]),
+    })
+    for workers in (1, None):
+        result = optimize_slips(legs, ["PowerPlay", "Flex"], top_k=5, workers=workers)
+        best = result["slips"][0]
+        print(f"workers={workers or 'auto'}: {result['elapsed_seconds']:.2f}s, "
+              f"best {best['mode']} {best['n_legs']} legs EV {best['expected_payout']:.4f}")
+
+def bench_bankroll(n_paths=100_000, n_bets=1000):
+    print(f"\nBankroll paths, {n_paths:,} paths x {n_bets:,} bets, 3-leg Flex")
+    for strategy in ("fixed", "fraction", "kelly"):
+        start = time.perf_counter()
+        result = simulate_bankroll([0.6, 0.62, 0.58], "Flex", strategy, n_paths, n_bets,
+                                   fraction=0.02, kelly_multiplier=0.5, seed=seed_from(0))
+        elapsed = time.perf_counter() - start
+        print(f"{strategy:>9}: {elapsed:.2f}s, ruin {result['risk_of_ruin']:.3f}, "
+              f"median final ${result['final_balance_percentiles']['50']:,.0f}")
+
+def make_open_slips(n_slips, n_players=5000, n_users=1000, seed=0):
+    """A user database dict of open slips and a results table for them."""
+    rng = np.random.default_rng(seed)
+    stats = ["pts", "reb", "ast", "goals"]
+    legs_per_slip = rng.integers(2, 9, n_slips)
+    total = int(legs_per_slip.sum())
+    players = rng.integers(n_players, size=total)
+    stat_ids = rng.integers(len(stats), size=total)
+    lines = rng.integers(0, 40, total) + 0.5
+    overs = rng.random(total) < 0.5
+    users = {f"user{u}": {"balance": 1000.0, "picks_history": []} for u in range(n_users)}
+    names = list(users)
+    leg = 0
+    for i, n_legs in enumerate(legs_per_slip):
+        picks = [{"player": f"Player {players[j]}", "stat": stats[stat_ids[j]], "value": str(lines[j]),
+                  "pick": "OVER" if overs[j] else "UNDER"} for j in range(leg, leg + n_legs)]
+        leg += n_legs
+        users[names[i % n_users]]["picks_history"].append(
+            {"picks": picks, "bet_amount": 10.0, "mode": "Flex", "is_completed": False})
+    results = ResultIndex({
+        "player": [f"Player {p}" for p in range(n_players) for _ in stats],
+        "stat": stats * n_players,
+        "actual": rng.integers(0, 40, n_players * len(stats)).astype(float),
+    })
+    return {"users": users}, results
+
+def bench_settlement(n_slips=300_000):
+    db_data, results = make_open_slips(n_slips)
+    summary = settle_open_slips(db_data, results)
+    print(f"\nSettlement, {n_slips:,} open slips: {summary['elapsed_seconds']:.2f}s "
+          f"({n_slips / summary['elapsed_seconds']:,.0f} slips/s)")
+
+def bench_batch_picks(n_slips=2000, history=5000):
+    """Slips per second through /api/picks one at a time vs /api/picks/batch.
+
+    Uses a throwaway user database whose user already has `history` slips,
+    since every write rewrites the whole file.
+    """
+    import tempfile
+    import user_db
+    import api
+    from props_store import PropsSnapshot
+    from bench_props import make_props_frame
+    api.props_store.stop()
+    api.props_store.current = PropsSnapshot(make_props_frame(10_000), "bench")
+    board = api.props_store.current.formatted_frame
+    rng = np.random.default_rng(0)
+    slips = []
+    for _ in range(n_slips):
+        rows = board.iloc[rng.choice(len(board), 3, replace=False)]
+        slips.append({"picks": [{"player": r.player, "stat": r.stat, "value": r.value, "pick": "OVER"}
+                                for r in rows.itertuples()], "bet_amount": 1.0, "mode": "Flex"})
+
+    original = user_db.DB_FILE
+    user_db.DB_FILE = tempfile.mktemp(suffix=".json")
+    try:
+        user_db.save_db({"users": {}})
+        user_db.register_user("bench", "bench")
+        with user_db.transaction() as db_data:
+            db_data["users"]["bench"]["balance"] = 1e9
+            db_data["users"]["bench"]["picks_history"] = [
+                dict(slips[i % n_slips], result="loss", payout=0, is_completed=True)
+                for i in range(history)]
+        client = api.app.test_client()
+        client.post("/api/auth/login", json={"username": "bench", "password": "bench"})
+        print(f"\nPlacing {n_slips:,} slips, user with {history:,} slips of history")
+        single = slips[:200]
+        start = time.perf_counter()
+        for slip in single:
+            client.post("/api/picks", json=slip)
+        single_rate = len(single) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        response = client.post("/api/picks/batch", json={"slips": slips})
+        batch_rate = n_slips / (time.perf_counter() - start)
+        assert response.get_json()["accepted"] == n_slips
+        print(f"/api/picks: {single_rate:,.0f} slips/s, /api/picks/batch: {batch_rate:,.0f} slips/s")
+    finally:
+        os.remove(user_db.DB_FILE)
+        user_db.DB_FILE = original
+
+if __name__ == "__main__":
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    bench_monte_carlo(trials)
+    bench_exact()
+    bench_optimizer()
+    bench_bankroll()
+    bench_settlement()
+    bench_batch_picks()
@@ -0,0 +1,182 @@
+"""
+Correlated slip simulation with a Gaussian copula.
+
+Legs from the same game are not independent: two props of one player move
+together, teammates a little, opponents less. Each leg gets a latent
+standard normal and hits when it falls below the normal quantile of its
+hit probability, so each leg keeps its own hit probability while the
+latents are correlated:
+
+    same appearance (player in a game)   PLAYER_CORRELATION
+    same team, same game                 TEAM_CORRELATION
+    same game                            GAME_CORRELATION
+    different games                      0
+
+An under leg flips the sign of its latent. Games are independent, so the
+correlation matrix is block diagonal and each game's block is factored on
+its own; factors are cached by the shape of the game's legs (which share
+a player or a team, and their sides), so any slip with a game of the same
+shape, whoever the players are, skips the factorization.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from rng_service import generator, new_seed, spawn_seeds
+from simulator import CHUNK_TRIALS, DEFAULT_TRIALS, MAX_TRIALS, summarize_loss_distribution, \
+    validate_probabilities
+
+PLAYER_CORRELATION = 0.35
+TEAM_CORRELATION = 0.15
+GAME_CORRELATION = 0.05
+
+def leg_context(df, player, stat, line, player_index=None):
+    """(game, appearance, team) of a prop on the board, or None if it is not on it.
+
+    The game is the match_id when the board has one, otherwise the
+    appearance_id, which still groups legs of the same player.
+    """
+    rows = df.iloc[player_index.rows(player)] if player_index is not None else df
+    match = rows[(rows["full_name"].astype(object) == player)
+                 & (rows["stat_name"].astype(object) == stat)]
+    if "stat_value" in match.columns and line is not None:
+        match = match[np.isclose(match["stat_value"].astype(float), float(line))]
+    if match.empty:
+        return None
+    row = match.iloc[0]
+    appearance = _scalar(row.get("appearance_id"))
+    game = _scalar(row.get("match_id"))
+    return (game if game is not None else appearance, appearance, _scalar(row.get("team_id")))
+
+def slip_contexts(df, legs, player_index=None):
+    """Game contexts of slip legs ({player, stat, line}) and the legs not on the board.
+
+    A leg that is not on the board is treated as its own game, independent
+    of the others.
+    """
+    contexts, missing = [], []
+    for i, leg in enumerate(legs):
+        context = None
+        if df is not None:
+            context = leg_context(df, leg.get("player"), leg.get("stat"), leg.get("line"), player_index)
+        if context is None:
+            missing.append(leg)
+            context = (("leg", i), ("leg", i), None)
+        contexts.append(context)
+    return contexts, missing
+
+def _scalar(value):
+    if value is None or pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+def _block_correlation(layout, player_rho, team_rho, game_rho):
+    n = len(layout)
+    corr = np.eye(n)
+    for i in range(n):
+        for j in range(i + 1, n):
+            (app_i, team_i, sign_i), (app_j, team_j, sign_j) = layout[i], layout[j]
+            if app_i == app_j:
+                rho = player_rho
+            elif team_i is not None and team_i == team_j:
+                rho = team_rho
+            else:
+                rho = game_rho
+            corr[i, j] = corr[j, i] = rho * sign_i * sign_j
+    return corr
+
+@lru_cache(maxsize=1024)
+def game_factor(layout, player_rho=PLAYER_CORRELATION, team_rho=TEAM_CORRELATION,
+                game_rho=GAME_CORRELATION):
+    """Cholesky factor of one game's leg correlation block.
+
+    layout is a tuple of (appearance, team, sign) per leg in the game, sign
+    +1 for over and -1 for under; slip_blocks passes it through
+    layout_shape so the cache is shared by games of the same shape.
+    """
+    corr = _block_correlation(layout, player_rho, team_rho, game_rho)
+    try:
+        factor = np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        # Clip to the nearest positive definite matrix with a unit diagonal
+        values, vectors = np.linalg.eigh(corr)
+        corr = vectors @ np.diag(np.maximum(values, 1e-6)) @ vectors.T
+        scale = 1 / np.sqrt(np.diag(corr))
+        factor = np.linalg.cholesky(corr * np.outer(scale, scale))
+    factor.setflags(write=False)
+    return factor
+
+def layout_shape(layout):
+    """layout with appearances and teams renumbered in order of first use.
+
+    The correlation block only depends on which legs share an appearance or
+    a team, so this is the cache key for game_factor.
+    """
+    appearances, teams = {}, {}
+    return tuple((appearances.setdefault(appearance, len(appearances)),
+                  None if team is None else teams.setdefault(team, len(teams)), sign)
+                 for appearance, team, sign in layout)
+
+def slip_blocks(contexts, picks, correlations=None):
+    """Group legs by game: list of (leg positions, Cholesky factor)."""
+    correlations = correlations or {}
+    if not isinstance(correlations, dict):
+        raise ValueError("correlations must map player/team/game to a correlation")
+    rhos = (float(correlations.get("player", PLAYER_CORRELATION)),
+            float(correlations.get("team", TEAM_CORRELATION)),
+            float(correlations.get("game", GAME_CORRELATION)))
+    if not all(-1 < rho < 1 for rho in rhos):
+        raise ValueError("Correlations must be between -1 and 1")
+    games = {}
+    for i, (game, appearance, team) in enumerate(contexts):
+        games.setdefault(game, []).append(i)
+    blocks = []
+    for positions in games.values():
+        layout = tuple((contexts[i][1], contexts[i][2], -1 if str(picks[i]).lower() == "under" else 1)
+                       for i in positions)
+        blocks.append((np.array(positions), game_factor(layout_shape(layout), *rhos)))
+    return blocks
+
+def _correlated_chunk(args):
+    thresholds, blocks, chunk, record = args
+    rng = generator(record)
+    latent = np.empty((chunk, len(thresholds)))
+    for positions, factor in blocks:
+        latent[:, positions] = rng.standard_normal((chunk, len(positions))) @ factor.T
+    losses = (latent >= thresholds).sum(axis=1)
+    return np.bincount(losses, minlength=len(thresholds) + 1)
+
+def simulate_correlated_slip(hit_probs, contexts, picks, mode="PowerPlay", trials=DEFAULT_TRIALS,
+                             stake=1.0, seed=None, workers=1, correlations=None):
+    """Simulate a slip whose legs are correlated within games.
+
+    contexts holds a (game, appearance, team) tuple per leg (leg_context)
+    and picks the "over"/"under" side per leg. correlations may override
+    the "player", "team" and "game" correlations.
+    """
+    probs = validate_probabilities(hit_probs)
+    if len(contexts) != len(probs) or len(picks) != len(probs):
+        raise ValueError("Every leg needs a game context and a pick")
+    if not 1 <= trials <= MAX_TRIALS:
+        raise ValueError(f"trials must be between 1 and {MAX_TRIALS}")
+    # Latent below the quantile of the hit probability means a hit
+    normal = NormalDist()
+    thresholds = np.array([np.inf if p >= 1 else -np.inf if p <= 0 else normal.inv_cdf(p)
+                           for p in probs])
+    blocks = slip_blocks(contexts, picks, correlations)
+
+    seed = seed if seed is not None else new_seed()
+    chunks = [min(CHUNK_TRIALS, trials - start) for start in range(0, trials, CHUNK_TRIALS)]
+    tasks = [(thresholds, blocks, chunk, record)
+             for chunk, record in zip(chunks, spawn_seeds(seed, len(chunks)))]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            counts = sum(pool.map(_correlated_chunk, tasks))
+    else:
+        counts = sum(_correlated_chunk(task) for task in tasks)
+
+    result = summarize_loss_distribution(counts / trials, mode, stake)
+    result.update({"method": "correlated", "trials": trials, "seed": seed,
+                   "games": len(blocks)})
+    return result
@@ -0,0 +1,117 @@
+"""
+Implied over/under probabilities and fair lines per prop.
+
+Underdog prices a side by its payout_multiplier: a side paying more than
+1x is the less likely one. A standard leg is priced to break even in a
+2-pick 3x PowerPlay, i.e. at BASE_LEG_PROBABILITY = 1/sqrt(3), so a side
+paying m implies p0 / m. When both sides are on the board their implied
+probabilities are normalized to sum to 1 (removing the margin); a lone
+side keeps its own and the other side gets the rest.
+
+The fair line is the median of the stat under a normal approximation with
+a Poisson-like spread (sqrt of the line): the line moved by
+sqrt(line) * z, where z is the normal quantile of the over probability.
+
+The table is built once per props snapshot and written next to the board
+as underdog_props.implied.cols, in the same columnar format.
+"""
+import os
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from pick_player_props import prop_key
+
+BASE_LEG_PROBABILITY = 3 ** -0.5
+# Bounds for a single side's probability when the other side is missing
+MIN_PROBABILITY = 0.01
+MAX_PROBABILITY = 0.99
+IMPLIED_COLUMNS = ["player", "stat", "line", "sport", "over_multiplier", "under_multiplier",
+                   "over_probability", "under_probability", "fair_line"]
+
+def implied_path(csv_path):
+    """Path of the implied table that sits next to csv_path."""
+    return os.path.splitext(csv_path)[0] + ".implied.cols"
+
+def _side_multipliers(df, choice):
+    side = df[df["choice"] == choice]
+    side = side[~side.duplicated(["player", "stat", "line"])]
+    return side.set_index(["player", "stat", "line"])["multiplier"]
+
+def _normal_quantiles(probs):
+    # Few distinct multipliers, so few distinct probabilities to invert
+    uniques, inverse = np.unique(probs, return_inverse=True)
+    normal = NormalDist()
+    return np.array([normal.inv_cdf(p) for p in uniques])[inverse.reshape(-1)]
+
+def build_implied_table(df):
+    """One row per prop (player, stat, line) with implied probabilities and fair line."""
+    if df is None or df.empty or not {"full_name", "stat_name", "choice"} <= set(df.columns):
+        return pd.DataFrame({column: [] for column in IMPLIED_COLUMNS})
+    line_column = "stat_value" if "stat_value" in df.columns else "line"
+    props = pd.DataFrame({
+        "player": df["full_name"].astype(object),
+        "stat": df["stat_name"].astype(object),
+        "line": pd.to_numeric(df[line_column], errors="coerce").astype(float),
+        "choice": df["choice"].astype(object).str.lower(),
+        "multiplier": (pd.to_numeric(df["payout_multiplier"], errors="coerce").astype(float)
+                       if "payout_multiplier" in df.columns else 1.0),
+        "sport": df["sport_id"].astype(object) if "sport_id" in df.columns else None,
+    })
+    props = props[props["line"].notna() & props["choice"].isin(["over", "under"])]
+    props["multiplier"] = props["multiplier"].where(props["multiplier"] > 0, 1.0).fillna(1.0)
+
+    table = props[~props.duplicated(["player", "stat", "line"])][["player", "stat", "line", "sport"]]
+    table = table.set_index(["player", "stat", "line"])
+    table["over_multiplier"] = _side_multipliers(props, "over")
+    table["under_multiplier"] = _side_multipliers(props, "under")
+    table = table.reset_index()
+
+    over = BASE_LEG_PROBABILITY / table["over_multiplier"].to_numpy(dtype=float)
+    under = BASE_LEG_PROBABILITY / table["under_multiplier"].to_numpy(dtype=float)
+    over_probability = np.where(np.isnan(under), over, over / (over + under))
+    over_probability = np.where(np.isnan(over), 1 - under, over_probability)
+    over_probability = np.clip(over_probability, MIN_PROBABILITY, MAX_PROBABILITY)
+    table["over_probability"] = over_probability
+    table["under_probability"] = 1 - over_probability
+    spread = np.sqrt(np.maximum(table["line"].to_numpy(dtype=float), 1.0))
+    table["fair_line"] = table["line"].to_numpy(dtype=float) + spread * _normal_quantiles(over_probability)
+    return table[IMPLIED_COLUMNS]
+
+class ImpliedTable:
+    """The implied table of a snapshot with O(1) lookup by prop."""
+    def __init__(self, frame):
+        self.frame = frame.reset_index(drop=True)
+        keys = zip(self.frame["player"].tolist(), self.frame["stat"].tolist(), self.frame["line"].tolist())
+        self._positions = {}
+        for position, key in enumerate(keys):
+            self._positions.setdefault(prop_key(*key), position)
+        self._over = self.frame["over_probability"].to_numpy(dtype=float)
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(build_implied_table(df))
+
+    def __len__(self):
+        return len(self.frame)
+
+    def probability(self, player, stat, line, pick="over"):
+        """Implied probability of one side of a prop, None if it is not on the board."""
+        position = self._positions.get(prop_key(player, stat, line))
+        if position is None:
+            return None
+        over = float(self._over[position])
+        return 1 - over if str(pick).lower() == "under" else over
+
+    def row(self, player, stat, line):
+        position = self._positions.get(prop_key(player, stat, line))
+        return None if position is None else self.frame.iloc[position].to_dict()
+
+    def candidate_legs(self):
+        """Both sides of every prop as slip builder candidates."""
+        sides = []
+        for pick in ("over", "under"):
+            sides.append(pd.DataFrame({
+                "player": self.frame["player"], "stat": self.frame["stat"], "line": self.frame["line"],
+                "pick": pick, "probability": self.frame[f"{pick}_probability"],
+            }))
+        return pd.concat(sides, ignore_index=True)
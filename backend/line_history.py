@@ -0,0 +1,283 @@
+"""
+Line movement history of the props board.
+
+Every scrape is diffed against the previous one on (appearance_id, stat,
+choice), joining the two boards on integer keys built from the key
+columns' category codes, and only the props whose line or payout
+multiplier changed, that appeared or that left the board are appended to
+the history. Each event row carries the previous line and multiplier as
+well as the new ones (NaN when the prop appeared or was removed), so the
+movement over a window is read from the window's own events.
+
+The history lives next to the board in underdog_props.history/:
+
+    latest.cols                     the last recorded board (diff base)
+    segment-<first>-<last>.cols     events of scrapes first..last
+
+Segments use the columnar snapshot format and are never modified. When
+the newest COMPACT_FANOUT segments cover the same number of scrapes they
+are merged into one, so months of 5-minute scrapes stay at a few dozen
+files and each event is rewritten only a handful of times.
+"""
+import os
+import re
+import time
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from props_columnar import read_columnar, write_columnar
+
+KEY_COLUMNS = ["appearance_id", "stat", "choice"]
+STATE_COLUMNS = KEY_COLUMNS + ["player", "sport", "line", "multiplier"]
+HISTORY_COLUMNS = ["scraped_at"] + KEY_COLUMNS + ["player", "sport", "line", "previous_line",
+                                                  "multiplier", "previous_multiplier"]
+COMPACT_FANOUT = 16
+SEGMENT_PATTERN = re.compile(r"^segment-(\d+)-(\d+)\.cols$")
+
+def history_path(csv_path):
+    """Directory of the line history that sits next to csv_path."""
+    return os.path.splitext(csv_path)[0] + ".history"
+
+def _categorical(series):
+    """A column as a Categorical of strings, converting each distinct value once."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    # 1 and "1" are the same key once written out as text
+    text_codes, text = pd.factorize(pd.Index([str(u) for u in uniques], dtype=object))
+    codes = np.where(codes < 0, -1, text_codes[codes] if len(text_codes) else codes)
+    return pd.Categorical.from_codes(codes, categories=text)
+
+def board_state(df):
+    """The diffable part of a board: one row per (appearance_id, stat, choice)."""
+    if df is None or df.empty:
+        return pd.DataFrame({column: [] for column in STATE_COLUMNS})
+    line_column = "stat_value" if "stat_value" in df.columns else "line"
+    state = pd.DataFrame({
+        "appearance_id": _categorical(df["appearance_id"]),
+        "stat": _categorical(df["stat_name"]),
+        "choice": _categorical(df["choice"]),
+        "player": _categorical(df["full_name"]),
+        "sport": (_categorical(df["sport_id"]) if "sport_id" in df.columns
+                  else pd.Categorical([None] * len(df))),
+        "line": pd.to_numeric(df[line_column], errors="coerce").astype(float),
+        "multiplier": (pd.to_numeric(df["payout_multiplier"], errors="coerce").astype(float)
+                       if "payout_multiplier" in df.columns else np.nan),
+    })
+    # Players without lines come through the scraper's left merge as NaN keys
+    state = state[state["stat"].notna() & state["choice"].notna()]
+    return state[~state.duplicated(KEY_COLUMNS)].reset_index(drop=True)
+
+def _row_keys(previous, current):
+    """One int64 key per row of both states, from the key columns' codes
+    over the union of their categories."""
+    previous_keys = np.zeros(len(previous), dtype=np.int64)
+    current_keys = np.zeros(len(current), dtype=np.int64)
+    for column in KEY_COLUMNS:
+        columns = (previous[column].astype("category"), current[column].astype("category"))
+        categories = pd.Index(columns[0].cat.categories, dtype=object).union(
+            pd.Index(columns[1].cat.categories, dtype=object))
+        for keys, values in zip((previous_keys, current_keys), columns):
+            # Null keys (code -1) take the trailing code 0
+            codes = np.append(categories.get_indexer(values.cat.categories) + 1, 0)
+            keys *= len(categories) + 1
+            keys += codes[values.cat.codes.to_numpy()]
+    return previous_keys, current_keys
+
+def _differs(a, b):
+    return (a != b) & ~(np.isnan(a) & np.isnan(b))
+
+def diff_states(previous, current, scraped_at):
+    """History events turning the previous board state into the current one.
+
+    The two states are joined on integer row keys: a hash lookup of each
+    current key among the previous ones and the other way round.
+    """
+    previous_keys, current_keys = _row_keys(previous, current)
+    # Position of each current prop in the previous state, -1 if it is new
+    position = pd.Index(previous_keys).get_indexer(current_keys)
+    removed = pd.Index(current_keys).get_indexer(previous_keys) < 0
+
+    line = current["line"].to_numpy(float)
+    multiplier = current["multiplier"].to_numpy(float)
+    # Position -1 picks the trailing NaN
+    previous_line = np.append(previous["line"].to_numpy(float), np.nan)[position]
+    previous_multiplier = np.append(previous["multiplier"].to_numpy(float), np.nan)[position]
+    changed = ((position < 0) | _differs(line, previous_line)
+               | _differs(multiplier, previous_multiplier))
+
+    gone = previous[removed]
+    events = pd.concat([
+        current[changed][KEY_COLUMNS + ["player", "sport"]].assign(
+            line=line[changed], previous_line=previous_line[changed],
+            multiplier=multiplier[changed], previous_multiplier=previous_multiplier[changed]),
+        gone[KEY_COLUMNS + ["player", "sport"]].assign(
+            line=np.nan, previous_line=gone["line"].to_numpy(float),
+            multiplier=np.nan, previous_multiplier=gone["multiplier"].to_numpy(float)),
+    ], ignore_index=True)
+    events.insert(0, "scraped_at", np.full(len(events), int(scraped_at), dtype=np.int64))
+    return events
+
+def concat_events(parts):
+    """Concatenate event frames, merging the dictionaries of their text columns."""
+    if not parts:
+        return pd.DataFrame({column: [] for column in HISTORY_COLUMNS})
+    data = {}
+    for column in parts[0].columns:
+        if isinstance(parts[0][column].dtype, pd.CategoricalDtype):
+            data[column] = union_categoricals([part[column] for part in parts])
+        else:
+            data[column] = np.concatenate([part[column].to_numpy() for part in parts])
+    return pd.DataFrame(data)
+
+class LineHistory:
+    """Append-only line history in a directory (see the module docstring)."""
+    def __init__(self, directory):
+        self.directory = directory
+        self._frames = {}
+
+    @property
+    def latest_path(self):
+        return os.path.join(self.directory, "latest.cols")
+
+    def segments(self):
+        """(first, last, path) of every live segment, oldest first.
+
+        A segment whose scrapes are covered by a merged one is left over from
+        an interrupted compaction and is skipped.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        found = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                found.append((int(match.group(1)), int(match.group(2)),
+                              os.path.join(self.directory, name)))
+        found.sort(key=lambda s: (s[0], -s[1]))
+        live = []
+        for segment in found:
+            if live and segment[1] <= live[-1][1]:
+                continue
+            live.append(segment)
+        return live
+
+    def latest_state(self):
+        if not os.path.exists(self.latest_path):
+            return board_state(None)
+        return read_columnar(self.latest_path)
+
+    def record(self, board, scraped_at=None):
+        """Append the changes between the last recorded board and this one."""
+        scraped_at = scraped_at if scraped_at is not None else time.time()
+        os.makedirs(self.directory, exist_ok=True)
+        current = board_state(board)
+        events = diff_states(self.latest_state(), current, scraped_at)
+        if len(events):
+            segments = self.segments()
+            number = segments[-1][1] + 1 if segments else 1
+            write_columnar(events, self._segment_path(number, number))
+            self.compact()
+            write_columnar(current, self.latest_path)
+        return {
+            "changes": len(events),
+            "added": int((events["previous_line"].isna() & events["line"].notna()).sum()),
+            "removed": int((events["line"].isna() & events["previous_line"].notna()).sum()),
+            "props": len(current),
+        }
+
+    def _segment_path(self, first, last):
+        return os.path.join(self.directory, f"segment-{first:010d}-{last:010d}.cols")
+
+    def compact(self):
+        """Merge the newest segments while COMPACT_FANOUT of them have the same span."""
+        while True:
+            segments = self.segments()
+            tail = segments[-COMPACT_FANOUT:]
+            spans = {last - first for first, last, _ in tail}
+            if len(tail) < COMPACT_FANOUT or len(spans) != 1:
+                return
+            merged = concat_events([read_columnar(path) for _, _, path in tail])
+            # Write the merged segment before removing its parts, so a crash
+            # in between leaves duplicates that segments() skips
+            write_columnar(merged, self._segment_path(tail[0][0], tail[-1][1]))
+            for _, _, path in tail:
+                # Drop the mapping first; a mapped file cannot be removed on
+                # Windows (where read_columnar does not map files anyway)
+                self._frames.pop(path, None)
+                os.remove(path)
+
+    def _segment_frames(self):
+        """Memory-mapped frames of the live segments, read once per segment."""
+        segments = self.segments()
+        # Let go of segments merged away since, by this or another process
+        live = {path for _, _, path in segments}
+        for path in [path for path in self._frames if path not in live]:
+            del self._frames[path]
+        frames = []
+        for _, _, path in segments:
+            if path not in self._frames:
+                try:
+                    self._frames[path] = read_columnar(path)
+                except FileNotFoundError:
+                    # Merged away since the listing
+                    return self._segment_frames()
+            frames.append(self._frames[path])
+        return frames
+
+    def events(self, since=None, until=None):
+        """Events with since < scraped_at <= until, oldest first."""
+        parts = []
+        for frame in self._segment_frames():
+            # Segments are in scrape order, so the window is a slice
+            times = frame["scraped_at"].to_numpy()
+            start = 0 if since is None else np.searchsorted(times, since, side="right")
+            stop = len(times) if until is None else np.searchsorted(times, until, side="right")
+            if start < stop:
+                parts.append(frame.iloc[start:stop])
+        return concat_events(parts)
+
+    def line_history(self, player, stat=None, since=None, until=None):
+        """Events of one player, optionally for one stat, oldest first."""
+        parts = []
+        for frame in self._segment_frames():
+            if player not in frame["player"].cat.categories:
+                continue
+            mask = frame["player"] == player
+            if stat is not None:
+                mask &= frame["stat"] == stat
+            times = frame["scraped_at"].to_numpy()
+            if since is not None:
+                mask &= times > since
+            if until is not None:
+                mask &= times <= until
+            parts.append(frame[mask.to_numpy()])
+        return concat_events(parts)
+
+    def movers(self, since, until=None, limit=20, sport=None):
+        """Props whose line moved the most between since and until.
+
+        The line at the start of the window is the previous line of a
+        prop's first event in it and the line at the end is the new line of
+        its last one. Props that appeared or left the board in the window
+        are not movers. Over and under share a line, so each prop is listed
+        once.
+        """
+        events = self.events(since, until)
+        if sport is not None:
+            events = events[events["sport"] == sport]
+        if events.empty:
+            return events.assign(start_line=[], end_line=[], change=[], moves=[])[
+                ["appearance_id", "player", "sport", "stat", "start_line", "end_line", "change", "moves"]]
+        grouped = events.groupby(KEY_COLUMNS, sort=False, observed=True)
+        moved = grouped.agg(player=("player", "last"), sport=("sport", "last"),
+                            start_line=("previous_line", "first"), end_line=("line", "last"),
+                            moves=("line", "size")).reset_index()
+        moved["change"] = moved["end_line"] - moved["start_line"]
+        moved = moved[moved["change"].notna() & (moved["change"] != 0)]
+        moved = moved.assign(size=moved["change"].abs()).sort_values(
+            ["size", "choice"], ascending=[False, True], kind="stable")
+        moved = moved[~moved.duplicated(["appearance_id", "stat"])]
+        return moved[["appearance_id", "player", "sport", "stat", "start_line", "end_line",
+                      "change", "moves"]].head(limit).reset_index(drop=True)
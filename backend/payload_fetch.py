@@ -0,0 +1,179 @@
+"""
+HTTP fetching of the pick'em payload.
+
+One PayloadFetcher is kept per scraper, so every fetch reuses its pooled
+keep-alive session. Requests:
+
+- ask for every compression urllib3 can decode (gzip and deflate, plus br
+  and zstd when brotli/zstandard are installed); bodies are decompressed
+  as they stream
+- are conditional: the ETag and Last-Modified of the last good response
+  go out as If-None-Match / If-Modified-Since, and a 304 means the board
+  is unchanged
+- hash the body as it streams; a 200 whose body hashes the same as the
+  last one also counts as unchanged
+- time out, and are retried on connection errors, timeouts, 429 and 5xx
+  up to `retries` more times with full-jitter exponential backoff
+
+Every fetch leaves a metrics dict in `last_metrics` (and the recent ones
+in `metrics`).
+"""
+import hashlib
+import random
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+CHUNK_SIZE = 1 << 16
+DEFAULT_TIMEOUT = (5.0, 30.0)
+DEFAULT_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+METRICS_KEPT = 100
+
+class FetchError(Exception):
+    """The payload could not be fetched, after retries where they apply."""
+
+class PayloadFetcher:
+    """Conditional, compressed, retried GETs of one URL over a pooled session."""
+    def __init__(self, url, headers=None, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP, sleep=time.sleep):
+        self.url = url
+        self.timeout = tuple(timeout) if isinstance(timeout, (list, tuple)) else timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.sleep = sleep
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(headers or {})
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        self.etag = None
+        self.last_modified = None
+        self.body_hash = None
+        self.last_metrics = None
+        self.metrics = deque(maxlen=METRICS_KEPT)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config["ud_pickem_url"], config.get("headers"),
+                   timeout=config.get("fetch_timeout", DEFAULT_TIMEOUT),
+                   retries=config.get("fetch_retries", DEFAULT_RETRIES))
+
+    def backoff(self, attempt, retry_after=None):
+        """Seconds to wait before retry number attempt (1-based)."""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
+
+    def forget(self):
+        """Drop the validators so the next fetch downloads and counts as changed."""
+        self.etag = self.last_modified = self.body_hash = None
+
+    def _conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def fetch(self, consume):
+        """GET the payload and pass its decompressed body chunks to consume.
+
+        Returns (changed, value): (False, None) on a 304 or a body identical
+        to the last one, else (True, consume(chunks)). Raises FetchError.
+        """
+        started = time.perf_counter()
+        metrics = {"url": self.url, "attempts": 0, "status": None, "changed": False,
+                   "bytes": 0, "wire_bytes": 0, "encoding": None, "first_byte_seconds": None,
+                   "elapsed_seconds": None, "retry_wait_seconds": 0.0, "error": None}
+        try:
+            changed, value = self._fetch_with_retries(consume, metrics)
+        except FetchError as e:
+            metrics["error"] = str(e)
+            raise
+        finally:
+            metrics["elapsed_seconds"] = round(time.perf_counter() - started, 4)
+            self.last_metrics = metrics
+            self.metrics.append(metrics)
+        metrics["changed"] = changed
+        print(f"Fetched {self.url}: status {metrics['status']}, {metrics['wire_bytes']:,} bytes on the wire "
+              f"({metrics['encoding'] or 'identity'}), {metrics['bytes']:,} decoded, "
+              f"{metrics['elapsed_seconds']:.2f}s, {'changed' if changed else 'unchanged'}")
+        return changed, value
+
+    def _fetch_with_retries(self, consume, metrics):
+        attempt = 0
+        while True:
+            attempt += 1
+            metrics["attempts"] = attempt
+            retry_after = None
+            try:
+                return self._fetch_once(consume, metrics)
+            except _Retryable as e:
+                error, retry_after = e.args[0], e.retry_after
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                error = f"{type(e).__name__}: {e}"
+            except requests.RequestException as e:
+                raise FetchError(f"Request failed: {e}") from e
+            if attempt > self.retries:
+                raise FetchError(f"Request failed after {attempt} attempts: {error}")
+            wait = self.backoff(attempt, retry_after)
+            metrics["retry_wait_seconds"] += wait
+            print(f"Fetch attempt {attempt} failed ({error}), retrying in {wait:.1f}s")
+            self.sleep(wait)
+
+    def _fetch_once(self, consume, metrics):
+        request_started = time.perf_counter()
+        with self.session.get(self.url, headers=self._conditional_headers(), timeout=self.timeout,
+                              stream=True) as response:
+            metrics["first_byte_seconds"] = round(time.perf_counter() - request_started, 4)
+            metrics["status"] = response.status_code
+            if response.status_code == 304:
+                return False, None
+            if response.status_code in RETRY_STATUSES:
+                raise _Retryable(f"status {response.status_code}",
+                                 retry_after=_retry_after(response.headers.get("Retry-After")))
+            if response.status_code != 200:
+                raise FetchError(f"Request failed with status {response.status_code}")
+            metrics["encoding"] = response.headers.get("Content-Encoding")
+
+            digest = hashlib.sha256()
+            metrics["bytes"] = 0
+            def chunks():
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    digest.update(chunk)
+                    metrics["bytes"] += len(chunk)
+                    yield chunk
+            body = chunks()
+            value = consume(body)
+            # Whatever consume left unread still counts towards the hash
+            for _ in body:
+                pass
+            metrics["wire_bytes"] = response.raw.tell()
+
+            body_hash = digest.hexdigest()
+            changed = body_hash != self.body_hash
+            self.etag = response.headers.get("ETag")
+            self.last_modified = response.headers.get("Last-Modified")
+            self.body_hash = body_hash
+            return changed, value if changed else None
+
+class _Retryable(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def _retry_after(value):
+    """Seconds from a numeric Retry-After header, None otherwise."""
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
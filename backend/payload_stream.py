@@ -0,0 +1,159 @@
+"""
+Streaming parse of the Underdog pick'em payload.
+
+The payload is one JSON object whose large members are arrays of records
+(players, appearances, over_under_lines, games, ...). Instead of holding
+the whole body as text and building the full object graph with
+json.loads, read_tables walks the top-level object as the body arrives and
+decodes one array element at a time with the standard library decoder.
+Each record is appended to per-column lists straight away and dropped, so
+at any moment only the columns, one record and a small window of the body
+are held. Members that are not wanted are decoded element by element and
+discarded.
+
+Decoding element by element loses json.loads' sharing of repeated object
+keys, so keys are interned per body instead; a per-table transform can
+also trim nested values down to the fields that are used.
+
+The columns come out as pd.DataFrame(list_of_records) would build them:
+columns in order of first appearance, NaN where a record lacks a key.
+"""
+import codecs
+import json
+import pandas as pd
+
+CHUNK_SIZE = 1 << 16
+TABLES = ("players", "appearances", "over_under_lines")
+WHITESPACE = " \t\n\r"
+
+class RecordColumns:
+    """Per-column lists of a sequence of records."""
+    def __init__(self):
+        self.columns = {}
+        self.rows = 0
+
+    def add(self, record):
+        columns = self.columns
+        for key, value in record.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [float("nan")] * self.rows
+            column.append(value)
+        self.rows += 1
+        if len(record) != len(columns):
+            # Keys this record lacks
+            for column in columns.values():
+                if len(column) < self.rows:
+                    column.append(float("nan"))
+
+    def frame(self):
+        return pd.DataFrame(self.columns, index=pd.RangeIndex(self.rows))
+
+class _Reader:
+    """A window over the decoded body with the position of the parser."""
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.keys = {}
+        self.json = json.JSONDecoder(object_pairs_hook=self._object)
+        self.text = ""
+        self.pos = 0
+        self.done = False
+
+    def fill(self):
+        """Append the next chunk; False once the body is exhausted."""
+        if self.done:
+            return False
+        # Drop what has been parsed so the window stays small
+        if self.pos > CHUNK_SIZE:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.text += self.utf8.decode(b"", final=True)
+            self.done = True
+            return False
+        self.text += self.utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+        return True
+
+    def _object(self, pairs):
+        # One string object per distinct key, as within a single json.loads
+        keys = self.keys
+        return {keys.setdefault(key, key): value for key, value in pairs}
+
+    def peek(self):
+        """Next non-whitespace character, or "" at the end of the body."""
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in payload at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the JSON value at the current position, reading more as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                # Most likely cut off by the end of the window
+                if self.fill():
+                    continue
+                raise
+            # A number ending the window may continue in the next chunk
+            if end == len(self.text) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def elements(self):
+        """Decode the elements of the array at the current position one by one."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == "]":
+                self.pos += 1
+                return
+            self.expect(",")
+
+def read_tables(chunks, tables=TABLES, transforms=None):
+    """DataFrames of the given array members of a JSON object body.
+
+    chunks is an iterable of bytes (or str) pieces of the body, such as
+    response.iter_content(). transforms may map a table name to a function
+    applied to each of its records before it is stored. A member that is
+    missing gives an empty frame.
+    """
+    transforms = transforms or {}
+    reader = _Reader(chunks)
+    builders = {name: RecordColumns() for name in tables}
+    reader.expect("{")
+    if reader.peek() == "}":
+        return {name: builder.frame() for name, builder in builders.items()}
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        builder = builders.get(key)
+        transform = transforms.get(key)
+        if reader.peek() == "[":
+            for record in reader.elements():
+                if builder is not None:
+                    builder.add(transform(record) if transform else record)
+        else:
+            reader.value()
+        if reader.peek() == "}":
+            break
+        reader.expect(",")
+    return {name: builder.frame() for name, builder in builders.items()}
@@ -0,0 +1,83 @@
+"""
+Underdog PowerPlay and Flex payout tables.
+
+Both tables are arrays indexed by [number of picks, number of losses] and
+hold the multiplier applied to the stake. PowerPlay only pays with zero
+losses; Flex needs at least 3 picks and pays with up to 2 losses on 6+
+pick slips. Anything outside the tables pays 0.
+"""
+import numpy as np
+
+MAX_PICKS = 8
+MIN_FLEX_PICKS = 3
+
+POWERPLAY = "PowerPlay"
+FLEX = "Flex"
+
+# Multiplier for a perfect PowerPlay slip of n picks, n = 0..8
+_POWERPLAY_PERFECT = [0, 1.5, 3, 6, 10, 20, 35, 65, 120]
+
+# Flex multipliers by picks, then by losses (0, 1, 2)
+_FLEX_BY_LOSSES = {
+    3: [3, 1],
+    4: [6, 1.5],
+    5: [10, 2.5],
+    6: [25, 2.6, 0.25],
+    7: [40, 2.75, 0.5],
+    8: [80, 3, 1],
+}
+
+def _build_tables():
+    powerplay = np.zeros((MAX_PICKS + 1, MAX_PICKS + 1))
+    powerplay[:, 0] = _POWERPLAY_PERFECT
+    flex = np.zeros((MAX_PICKS + 1, MAX_PICKS + 1))
+    for n, multipliers in _FLEX_BY_LOSSES.items():
+        flex[n, :len(multipliers)] = multipliers
+    powerplay.setflags(write=False)
+    flex.setflags(write=False)
+    return powerplay, flex
+
+POWERPLAY_TABLE, FLEX_TABLE = _build_tables()
+
+def normalize_mode(mode):
+    """Map the spellings used around the app ("PowerPlay", "flex", ...) to a mode."""
+    if isinstance(mode, str) and mode.strip().lower() == "flex":
+        return FLEX
+    return POWERPLAY
+
+def payout_table(mode):
+    return FLEX_TABLE if normalize_mode(mode) == FLEX else POWERPLAY_TABLE
+
+def payout_multiplier(mode, n_picks, losses=0):
+    """Multiplier for one slip."""
+    if not 0 <= n_picks <= MAX_PICKS or not 0 <= losses <= MAX_PICKS:
+        return 0
+    value = payout_table(mode)[n_picks, losses]
+    return int(value) if value.is_integer() else float(value)
+
+def payout_multipliers(n_picks, losses, flex):
+    """Multipliers for many slips at once.
+
+    n_picks and losses are integer arrays and flex a boolean array (or a
+    scalar for all slips), broadcast together. Out-of-range slips get 0.
+    """
+    n_picks, losses, flex = np.broadcast_arrays(np.asarray(n_picks), np.asarray(losses),
+                                                np.asarray(flex, dtype=bool))
+    valid = (n_picks >= 0) & (n_picks <= MAX_PICKS) & (losses >= 0) & (losses <= MAX_PICKS)
+    n_idx = np.where(valid, n_picks, 0)
+    l_idx = np.where(valid, losses, 0)
+    multipliers = np.where(flex, FLEX_TABLE[n_idx, l_idx], POWERPLAY_TABLE[n_idx, l_idx])
+    return np.where(valid, multipliers, 0.0)
+
+def batch_payouts(stakes, n_picks, losses, flex):
+    """Amount returned (stake times multiplier) for each slip."""
+    return np.asarray(stakes, dtype=float) * payout_multipliers(n_picks, losses, flex)
+
+def payout_tables_json():
+    """Both tables as nested lists, [picks][losses], for the frontend."""
+    return {
+        "max_picks": MAX_PICKS,
+        "min_flex_picks": MIN_FLEX_PICKS,
+        POWERPLAY: POWERPLAY_TABLE.tolist(),
+        FLEX: FLEX_TABLE.tolist(),
+    }
@@ -0,0 +1,126 @@
+"""
+Grade many slips in one pass for /api/picks/batch.
+
+Slips are checked against the props board, then stakes, pick counts and
+modes become arrays: the simulated win/loss of every slip comes from one
+draw of a seeded stream and payouts from batch_payouts. For a logged-in
+user all accepted slips, the history records and the new balance are
+written in a single user_db transaction.
+
+A slip is accepted when it has 1-8 legs (3-8 for Flex), every leg is on
+the board with a pick of over/under, no prop appears twice, and the
+stakes of the accepted slips so far still fit in the balance.
+"""
+import time
+import numpy as np
+from payouts import FLEX, MAX_PICKS, MIN_FLEX_PICKS, batch_payouts, normalize_mode
+from pick_player_props import prop_key
+from rng_service import generator
+
+MAX_BATCH_SLIPS = 10_000
+SETTLE_MODES = ("simulate", "results")
+
+def slip_error(slip, board):
+    """Why a slip cannot be placed, or None if it is valid."""
+    if not isinstance(slip, dict):
+        return "Slip must be an object"
+    picks = slip.get("picks")
+    if not isinstance(picks, list) or not 1 <= len(picks) <= MAX_PICKS:
+        return f"A slip needs between 1 and {MAX_PICKS} picks"
+    if normalize_mode(slip.get("mode", "PowerPlay")) == FLEX and len(picks) < MIN_FLEX_PICKS:
+        return f"Flex needs at least {MIN_FLEX_PICKS} picks"
+    try:
+        bet_amount = float(slip.get("bet_amount", 10))
+    except (TypeError, ValueError):
+        return "bet_amount must be a number"
+    # NaN would pass the check below and then poison the balance
+    if not np.isfinite(bet_amount):
+        return "bet_amount must be a finite number"
+    if bet_amount <= 0:
+        return "bet_amount must be positive"
+    keys = set()
+    for pick in picks:
+        if not isinstance(pick, dict):
+            return "Each pick must be an object"
+        if str(pick.get("pick", "")).lower() not in ("over", "under"):
+            return "Each pick needs a pick of over or under"
+        key = prop_key(pick.get("player"), pick.get("stat"), pick.get("line", pick.get("value")))
+        if key not in board:
+            return f"{pick.get('player')} {pick.get('stat')} {pick.get('line', pick.get('value'))} is not on the board"
+        if key in keys:
+            return f"{pick.get('player')} {pick.get('stat')} is picked more than once"
+        keys.add(key)
+    return None
+
+def grade_batch(slips, board, seed, settle="simulate", balance=None):
+    """Validate and grade a batch of slips.
+
+    Returns a dict of per-slip arrays (accepted, win, payout, stake) and
+    the list of errors (None for accepted slips). With settle="results"
+    nothing is drawn: accepted slips stay open for settlement.py.
+    """
+    if settle not in SETTLE_MODES:
+        raise ValueError(f"settle must be one of {', '.join(SETTLE_MODES)}")
+    errors = [slip_error(slip, board) for slip in slips]
+    valid = np.array([e is None for e in errors], dtype=bool)
+    stakes = np.array([float(s.get("bet_amount", 10)) if e is None else 0.0
+                       for s, e in zip(slips, errors)])
+    n_picks = np.array([len(s["picks"]) if e is None else 0 for s, e in zip(slips, errors)])
+    flex = np.array([e is None and normalize_mode(s.get("mode", "PowerPlay")) == FLEX
+                     for s, e in zip(slips, errors)], dtype=bool)
+
+    accepted = valid
+    if balance is not None:
+        # Slips are taken in order while their stakes still fit in the balance
+        accepted = valid & (np.cumsum(stakes) <= balance)
+        errors = [e if e is not None or ok else "Insufficient balance"
+                  for e, ok in zip(errors, accepted)]
+        stakes = np.where(accepted, stakes, 0.0)
+
+    # Slip i uses draw i of the batch's stream (the same rule as /api/picks:
+    # an even chance of every leg hitting)
+    wins = generator(seed).integers(2, size=len(slips)).astype(bool) & accepted
+    if settle == "results":
+        wins[:] = False
+    payouts = batch_payouts(stakes, n_picks, 0, flex) * wins
+    return {"accepted": accepted, "win": wins, "payout": payouts, "stake": stakes, "errors": errors}
+
+def slip_results(slips, graded, settle="simulate"):
+    """Per-slip response entries."""
+    results = []
+    for i, slip in enumerate(slips):
+        if not graded["accepted"][i]:
+            results.append({"index": i, "success": False, "error": graded["errors"][i]})
+        elif settle == "results":
+            results.append({"index": i, "success": True, "result": "pending"})
+        else:
+            results.append({"index": i, "success": True,
+                            "result": "win" if graded["win"][i] else "loss",
+                            "payout": float(graded["payout"][i])})
+    return results
+
+def history_records(slips, graded, seed, settle="simulate", created_at=None):
+    """Pick records for the accepted slips, as /api/picks writes them."""
+    created_at = created_at if created_at is not None else int(time.time())
+    records = []
+    for i in np.flatnonzero(graded["accepted"]).tolist():
+        slip = slips[i]
+        record = {
+            "created_at": created_at,
+            "picks": slip["picks"],
+            "bet_amount": float(graded["stake"][i]),
+            "mode": slip.get("mode", "PowerPlay"),
+        }
+        if settle == "results":
+            record.update({"result": "pending", "payout": None, "is_completed": False})
+        else:
+            record.update({
+                "result": "win" if graded["win"][i] else "loss",
+                "payout": float(graded["payout"][i]),
+                "is_completed": True,
+                # Replay: draw batch_index of generator(seed).integers(2, size=...)
+                "seed": seed,
+                "batch_index": i,
+            })
+        records.append(record)
+    return records
@@ -1,86 +1,168 @@
+import os
+import numpy as np
 import pandas as pd
 from datetime import datetime
-import random
+from props_columnar import columnar_path, numeric_text, read_columnar
+from player_index import PlayerIndex
+from payouts import FLEX, POWERPLAY, payout_multiplier
+from rng_service import coin_flip, generator, new_seed
 
-# Load the scraped props CSV file
+def props_source(csv_path='underdog_props.csv'):
+    """Pick the file load_props will read.
+
+    The columnar snapshot written by the scraper is preferred; the CSV is only
+    used when the snapshot is missing or older than the CSV.
+    """
+    cols_path = columnar_path(csv_path)
+    if os.path.exists(cols_path):
+        if not os.path.exists(csv_path) or os.path.getmtime(cols_path) >= os.path.getmtime(csv_path):
+            return cols_path
+    return csv_path
+
+# Load the scraped props, memory-mapping the columnar snapshot when present
 def load_props(csv_path='underdog_props.csv'):
+    source = props_source(csv_path)
     try:
+        if source != csv_path:
+            return read_columnar(source)
         df = pd.read_csv(csv_path)
         return df
     except FileNotFoundError:
         print(f"File {csv_path} not found. Please run the scraper first.")
         return None
 
-def find_player_props(df, player_name):
-    # Case-insensitive search for player name
-    matches = df[df['full_name'].fillna('').str.lower().str.contains(player_name.lower())]
+def _compact_column(series, category_ratio):
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype):
+        return series
+    if pd.api.types.is_integer_dtype(dtype):
+        narrow = pd.to_numeric(series, downcast="integer")
+        # Keep the original (possibly memory-mapped) array when nothing shrinks
+        return narrow if narrow.dtype != dtype else series
+    if dtype == np.float64:
+        # Only narrow to float32 when every value survives the round trip,
+        # so lines like 25.5 shrink but 1.03 multipliers keep their JSON form
+        narrow = series.astype(np.float32)
+        same = (narrow.astype(np.float64) == series) | series.isna()
+        return narrow if same.all() else series
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        # Numbers sent as text compact (and serve) as the numbers read_csv gives
+        numeric = numeric_text(series)
+        if numeric is not None:
+            return _compact_column(numeric, category_ratio)
+        non_null = series.count()
+        if non_null and series.nunique() <= category_ratio * non_null:
+            return series.astype("category")
+    return series
+
+def compact_props(df, keep_columns=None, category_ratio=0.5, report=True):
+    """Shrink a loaded props frame for long-lived API processes.
+
+    Numeric text becomes numbers, repeated strings become categoricals,
+    integers are downcast, floats go to float32 when that is lossless, and
+    columns outside keep_columns (if given) are dropped. Returns (frame, report) where report lists the
+    before/after dtype and bytes of every original column. Measuring the
+    bytes of text columns takes longer than compacting them, so pass
+    report=False (report is then None) when it is not needed.
+    """
+    before = df.memory_usage(deep=True, index=False) if report else None
+    dtypes_before = df.dtypes
+    kept = [i for i, c in enumerate(df.columns) if keep_columns is None or c in keep_columns]
+    # By position: the scraped board repeats some names (lines and options both have an id)
+    compacted = pd.DataFrame({j: _compact_column(df.iloc[:, i], category_ratio) for j, i in enumerate(kept)},
+                             copy=False)
+    compacted.columns = df.columns[kept]
+    if not report:
+        return compacted, None
+    after = dict(zip(kept, compacted.memory_usage(deep=True, index=False)))
+    report = [{
+        "column": str(column),
+        "dtype_before": str(dtypes_before.iloc[i]),
+        "dtype_after": str(compacted.iloc[:, kept.index(i)].dtype) if i in after else None,
+        "bytes_before": int(before.iloc[i]),
+        "bytes_after": int(after[i]) if i in after else 0,
+    } for i, column in enumerate(df.columns)]
+    return compacted, report
+
+def find_player_props(df, player_name, index=None):
+    # Case-insensitive search for player name, through the snapshot's name
+    # index when one is available
+    if index is not None:
+        return df.iloc[index.rows(player_name)]
+    matches = df[df['full_name'].astype(object).fillna('').str.lower().str.contains(player_name.lower(), regex=False)]
     return matches
 
+# Fallback column names for each field of the formatted props table
+FORMATTED_PROP_COLUMNS = {
+    "player": (["full_name"], "Unknown Player"),
+    "stat": (["stat_name", "type_over_under", "selection_subheader"], "Unknown Stat"),
+    "value": (["stat_value", "line", "value", "non_discounted_stat_value"], "0"),
+    "sport": (["sport_id", "sport", "sport_name", "league", "league_id"], "Unknown Sport"),
+}
+
+def _coalesce_columns(df, columns, default):
+    # First non-null value across the candidate columns, column by column
+    result = pd.Series(None, index=df.index, dtype=object)
+    for col in columns:
+        if col in df.columns:
+            missing = result.isna()
+            if not missing.any():
+                break
+            result = result.where(~missing, df[col].astype(object))
+    return result.where(result.notna(), default)
+
+def format_props_frame(df):
+    """Build the player/stat/value/sport table served by /api/props/formatted.
+
+    Duplicate player/stat/value rows are dropped, keeping the first one, and
+    the result is reindexed from 0 in board order.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=list(FORMATTED_PROP_COLUMNS))
+    formatted = pd.DataFrame({
+        field: _coalesce_columns(df, columns, default)
+        for field, (columns, default) in FORMATTED_PROP_COLUMNS.items()
+    })
+    # Dedupe on the string form of the key, matching how picks are compared
+    keys = formatted[["player", "stat", "value"]].astype(str)
+    return formatted[~keys.duplicated()].reset_index(drop=True)
+
+def format_props(df, formatted=None):
+    """The formatted props table as a list of dicts."""
+    if formatted is None:
+        formatted = format_props_frame(df)
+    fields = list(formatted.columns)
+    columns = [formatted[field].tolist() for field in fields]
+    return [dict(zip(fields, row)) for row in zip(*columns)]
+
+def prop_key(player, stat, line):
+    """Hashable (player, stat, line) key of a prop; lines compare as numbers."""
+    try:
+        line = float(line)
+    except (TypeError, ValueError):
+        pass
+    return (player, stat, line)
+
+def board_keys(formatted):
+    """Set of prop_key for every row of the formatted props table."""
+    return {prop_key(*row) for row in zip(formatted["player"].tolist(), formatted["stat"].tolist(),
+                                          formatted["value"].tolist())}
+
 # standard underdog powerplay calculation
 def powerplay_payout(n):
-    if n == 1:
-        return 1.5
-    elif n == 2:
-        return 3
-    elif n == 3:
-        return 6
-    elif n == 4:
-        return 10
-    elif n == 5:
-        return 20
-    elif n == 6:
-        return 35
-    elif n == 7:
-        return 65
-    elif n == 8:
-        return 120
-    else:
-        return 0
+    return payout_multiplier(POWERPLAY, n)
     
 # standard underdog flex calculation
 def flex_payout(n, losses):
-    if losses == 0:
-        if n == 8:
-            return 80
-        elif n == 7:
-            return 40
-        elif n == 6:
-            return 25
-        elif n == 5:
-            return 10
-        elif n == 4: 
-            return 6
-        elif n == 3:
-            return 3
-    elif losses == 1:
-        if n == 8:
-            return 3
-        elif n == 7:
-            return 2.75
-        elif n == 6:
-            return 2.6
-        elif n == 5:
-            return 2.5
-        elif n == 4: 
-            return 1.5
-        elif n == 3:
-            return 1
-    elif losses == 2:
-        if n == 8:
-            return 1
-        elif n == 7:
-            return 0.5
-        elif n == 6:
-            return 0.25
-    return 0
+    return payout_multiplier(FLEX, n, losses)
 
 def main():
     df = load_props()
     if df is None:
         return
     # List all unique players
-    unique_players = df['full_name'].dropna().unique()
-    unique_players = sorted(unique_players)
+    player_index = PlayerIndex.from_frame(df)
+    unique_players = sorted(player_index.names)
     picks = []
     balance = 1000.0  # Starting fake balance
     flex_mode = False
@@ -91,13 +173,14 @@ def main():
             "4. Toggle Flex Mode\n"
             "5. Remove a pick\n"
             "6. Save picks\n"
-            "7. Exit\n")
+            "7. Suggest slips\n"
+            "8. Exit\n")
     
     print(f"\nCurrent balance: ${balance:.2f}")
 
     while True:
         print(menu)
-        player_choice = input("Enter a number (1-7) or type a player name/number: ").strip()
+        player_choice = input("Enter a number (1-8) or type a player name/number: ").strip()
         
         # 1. View picks
         if player_choice == '1' or player_choice.lower() == 'picks':
@@ -184,6 +267,8 @@ def main():
                     except ValueError:
                         print("Please enter a valid number.")
                 potential_winnings = bet * multiplier
+                # random for now, from a seed written with the slip so it can be replayed
+                seed = new_seed()
                 with open(filename, 'a') as f:
                     f.write(f"\nBet: ${bet}\n")
                     f.write(f"Multiplier: {multiplier}x\n")
@@ -191,9 +276,9 @@ def main():
                         f.write(f"Flexed Payout: ${potential_winnings:.2f}\n{flex_payouts}\n")
                     else:
                         f.write(f"PowerPlay Payout: ${potential_winnings:.2f}\n")
+                    f.write(f"Seed: {seed['entropy']}\n")
 
-                # random for now
-                win = random.choice([True, False])
+                win = coin_flip(generator(seed))
                 if win:
                     balance += potential_winnings - bet
                     print(f"You WON! You receive ${potential_winnings:.2f} (profit: ${potential_winnings-bet:.2f})")
@@ -209,8 +294,28 @@ def main():
                     break
             break
 
-        # 7. Exit
-        if player_choice == '7' or player_choice.lower() == 'exit':
+        # 7. Suggest slips
+        if player_choice == '7' or player_choice.lower() == 'suggest':
+            # Imported here: slip_builder imports this module
+            from implied import ImpliedTable
+            from slip_builder import optimize_slips, print_slips
+            mode = "Flex" if flex_mode else "PowerPlay"
+            result = optimize_slips(ImpliedTable.from_frame(df).candidate_legs(), [mode], top_k=3)
+            if not result["slips"]:
+                print("\nNo slips to suggest for this board.")
+                continue
+            print(f"\nBest {mode} slips at the board's implied probabilities:")
+            print_slips(result)
+            use = input("Enter a slip number to make it your picks (or 'back' to cancel): ").strip()
+            if not use.isdigit() or int(use) < 1 or int(use) > len(result["slips"]):
+                continue
+            picks = [{'player': leg['player'], 'stat': leg['stat'], 'line': leg['line'], 'pick': leg['pick']}
+                     for leg in result["slips"][int(use)-1]["legs"]]
+            print(f"\nYour picks are now slip {use} ({len(picks)} picks).")
+            continue
+
+        # 8. Exit
+        if player_choice == '8' or player_choice.lower() == 'exit':
             break
         
         
@@ -220,7 +325,7 @@ def main():
         if player_choice.isdigit() and 1 <= int(player_choice) <= len(unique_players):
             player_name = unique_players[int(player_choice)-1]
         else:
-            matches_by_name = [p for p in unique_players if player_choice.lower() in p.lower()]
+            matches_by_name = player_index.find_names(player_choice)
             if len(matches_by_name) == 1:
                 player_name = matches_by_name[0]
             elif len(matches_by_name) > 1:
@@ -231,7 +336,7 @@ def main():
             else:
                 print("No player matched that name. Try again.")
                 continue
-        matches = find_player_props(df, player_name)
+        matches = find_player_props(df, player_name, player_index)
         if matches.empty:
             print(f"No props found for '{player_name}'. Try again.")
             continue
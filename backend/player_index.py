@@ -0,0 +1,128 @@
+import re
+import bisect
+import unicodedata
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+
+def normalize_name(name):
+    """Case-fold, strip accents and collapse whitespace for name matching."""
+    name = unicodedata.normalize("NFKD", str(name))
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", name.casefold())
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class PlayerIndex:
+    """Name index over one props snapshot.
+
+    Each distinct player name maps to the row positions of its props. Lookups
+    go through a trigram index for substring matches and a sorted list of
+    word-boundary suffixes ("stephen curry", "curry") for prefix matches, so
+    they touch a handful of names instead of scanning every row.
+    """
+    def __init__(self, names, positions):
+        self.names = list(names)
+        self._positions = positions
+        self._normalized = [normalize_name(n) for n in self.names]
+        self._prop_counts = np.array([len(p) for p in positions], dtype=np.int64)
+
+        word_starts = []
+        trigrams = defaultdict(set)
+        self._exact = defaultdict(list)
+        for name_id, norm in enumerate(self._normalized):
+            self._exact[norm].append(name_id)
+            start = 0
+            for token in norm.split(" "):
+                word_starts.append((norm[start:], start == 0, name_id))
+                start += len(token) + 1
+            for gram in _trigrams(norm):
+                trigrams[gram].add(name_id)
+        word_starts.sort()
+        self._word_start_keys = [w[0] for w in word_starts]
+        self._word_start_first = np.array([w[1] for w in word_starts], dtype=bool)
+        self._word_start_ids = np.array([w[2] for w in word_starts], dtype=np.int64)
+        self._trigrams = {gram: frozenset(ids) for gram, ids in trigrams.items()}
+        # Position of each name in alphabetical order, the final tie-break
+        self._alpha_rank = np.empty(len(self.names), dtype=np.int64)
+        self._alpha_rank[np.argsort(np.array(self._normalized, dtype=object), kind="stable")] = \
+            np.arange(len(self.names))
+
+    @classmethod
+    def from_frame(cls, df, column="full_name"):
+        if df is None or column not in df.columns or df.empty:
+            return cls([], [])
+        codes, uniques = pd.factorize(df[column].astype(object))
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        # Nulls have code -1 and sort first; skip them
+        start = len(codes) - counts.sum()
+        positions = np.split(order[start:], np.cumsum(counts)[:-1]) if len(uniques) else []
+        return cls(list(uniques), positions)
+
+    def __len__(self):
+        return len(self.names)
+
+    def match_ids(self, query):
+        """Ids of every name containing query (after normalization)."""
+        query = normalize_name(query)
+        if not query:
+            return list(range(len(self.names)))
+        if len(query) < 3:
+            return [i for i, norm in enumerate(self._normalized) if query in norm]
+        postings = []
+        for gram in _trigrams(query):
+            ids = self._trigrams.get(gram)
+            if not ids:
+                return []
+            postings.append(ids)
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        # Trigrams can match out of order, confirm with a real substring test
+        return sorted(i for i in candidates if query in self._normalized[i])
+
+    def find_names(self, query):
+        """Player names containing query, sorted alphabetically."""
+        return sorted(self.names[i] for i in self.match_ids(query))
+
+    def rows(self, query):
+        """Row positions (in board order) of props for players matching query."""
+        ids = self.match_ids(query)
+        if not ids:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate([self._positions[i] for i in ids]))
+
+    def autocomplete(self, query, limit=10):
+        """Top `limit` players for a search box, best matches first.
+
+        Exact names rank first, then names starting with the query, then names
+        with a word starting with it, then any other substring match. Ties go
+        to the player with more props on the board.
+        """
+        query = normalize_name(query)
+        if not query or limit <= 0:
+            return []
+        lo = bisect.bisect_left(self._word_start_keys, query)
+        hi = bisect.bisect_left(self._word_start_keys, query + "\U0010ffff", lo)
+        ids = self._word_start_ids[lo:hi]
+        # 1 = name starts with the query, 2 = some word does
+        ranks = np.where(self._word_start_first[lo:hi], 1, 2)
+        if len(ids) < limit:
+            extra = np.setdiff1d(np.array(self.match_ids(query), dtype=np.int64), ids)
+            ids = np.concatenate([ids, extra])
+            ranks = np.concatenate([ranks, np.full(len(extra), 3)])
+        if not len(ids):
+            return []
+        ranks[(ranks == 1) & np.isin(ids, self._exact.get(query, []))] = 0
+        # Keep the best rank of names that matched at several word starts
+        order = np.lexsort((self._alpha_rank[ids], -self._prop_counts[ids], ranks))
+        best = []
+        seen = set()
+        for i in ids[order]:
+            if i not in seen:
+                seen.add(i)
+                best.append(i)
+                if len(best) == limit:
+                    break
+        return [{"player": self.names[i], "props": int(self._prop_counts[i])} for i in best]
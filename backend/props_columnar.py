@@ -0,0 +1,174 @@
+"""
+Typed columnar snapshot of the props board.
+
+The scraper writes this next to underdog_props.csv and the API memory-maps
+it instead of re-parsing the CSV. The file is a small JSON header followed
+by one raw, 64-byte aligned buffer per column:
+
+    b"UDPROPS1" | uint64 header length | header JSON | column buffers
+
+Numeric, bool and datetime columns are stored as their numpy arrays, as is
+text that read_csv would parse as numbers (the payload sends lines and
+multipliers as strings). Everything else is dictionary encoded: the column buffer holds integer codes
+(-1 for null) and a second buffer holds the distinct strings as NUL
+separated UTF-8, so loading costs one split per dictionary rather than a
+parse per row, and the codes load straight into a pandas Categorical.
+Columns are stored by position, so repeated names (a line's id and its
+option's id) survive the round trip.
+
+The file is memory-mapped except on Windows, which cannot replace or delete
+a mapped file; the scraper replaces snapshots the API has loaded, so there
+they are read into memory instead.
+"""
+import os
+import json
+import numpy as np
+import pandas as pd
+
+MAGIC = b"UDPROPS1"
+ALIGNMENT = 64
+MEMORY_MAP = os.name != "nt"
+
+def columnar_path(csv_path):
+    """Path of the columnar snapshot that sits next to csv_path."""
+    return os.path.splitext(csv_path)[0] + ".cols"
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _codes_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+def numeric_text(series):
+    """series as numbers if read_csv would read it back as numbers, else None.
+
+    Text columns qualify when every value parses as a number; a column with
+    no values at all reads back as float64 NaN.
+    """
+    if not (pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)):
+        return None
+    if not series.count():
+        return pd.Series(np.nan, index=series.index, dtype=np.float64)
+    try:
+        return pd.to_numeric(series.astype(object))
+    except (ValueError, TypeError):
+        return None
+
+def _encode_column(series):
+    """Return (column header, numpy array) for one column."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = [str(c) for c in dtype.categories]
+        # Numbers as text, or categories only their type tells apart (1.2 and
+        # "1.2"), are encoded from the values instead
+        if (len(set(categories)) == len(categories)
+                and numeric_text(pd.Series(dtype.categories, dtype=object)) is None):
+            codes = series.cat.codes.to_numpy().astype(_codes_dtype(len(categories)))
+            return {"kind": "category", "categories": categories}, codes
+        series = series.astype(object)
+        dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype) and not series.hasnans:
+        return {"kind": "bool"}, series.to_numpy(dtype=np.bool_)
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        tz = getattr(dtype, "tz", None)
+        values = series.dt.tz_convert("UTC").dt.tz_localize(None) if tz is not None else series
+        return ({"kind": "datetime", "tz": str(tz) if tz is not None else None},
+                values.to_numpy(dtype="datetime64[ns]").view(np.int64))
+    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+        if isinstance(dtype, np.dtype):
+            return {"kind": "numeric"}, series.to_numpy()
+        # Nullable extension integers/floats become float64 with NaN
+        return {"kind": "numeric"}, series.to_numpy(dtype=np.float64, na_value=np.nan)
+    numeric = numeric_text(series)
+    if numeric is not None:
+        return _encode_column(numeric)
+    # Strings and anything else: dictionary encode the text form
+    values = series.astype(object)
+    values = values.where(values.isna(), values.map(lambda v: v if isinstance(v, str) else str(v)))
+    categorical = pd.Categorical(values)
+    categories = [str(c) for c in categorical.categories]
+    codes = categorical.codes.astype(_codes_dtype(len(categories)))
+    return {"kind": "category", "categories": categories}, codes
+
+def write_columnar(df, path):
+    """Write df to path atomically (temp file + rename)."""
+    columns = []
+    buffers = []
+    offset = 0
+    for i, name in enumerate(df.columns):
+        header, array = _encode_column(df.iloc[:, i])
+        array = np.ascontiguousarray(array)
+        header.update({"name": str(name), "dtype": array.dtype.str, "offset": offset})
+        buffers.append((offset, array.tobytes()))
+        offset = _align(offset + array.nbytes)
+        if header["kind"] == "category":
+            categories = header.pop("categories")
+            if any("\0" in c for c in categories):
+                raise ValueError(f"Column {name} contains NUL characters")
+            blob = "\0".join(categories).encode("utf-8")
+            header.update({"categories_offset": offset, "categories_nbytes": len(blob),
+                           "n_categories": len(categories)})
+            buffers.append((offset, blob))
+            offset = _align(offset + len(blob))
+        columns.append(header)
+    header_bytes = json.dumps({"rows": len(df), "columns": columns}).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        for buffer_offset, data in buffers:
+            f.seek(data_start + buffer_offset)
+            f.write(data)
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+def read_columnar(path):
+    """Memory-map a columnar snapshot as a DataFrame without parsing it.
+
+    Column data stays in the page cache and is shared between processes
+    mapping the same file; only the string dictionaries are materialised.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a props snapshot")
+        header_len = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    data_start = _align(len(MAGIC) + 8 + header_len)
+    rows = header["rows"]
+    has_data = any(column.get("n_categories") for column in header["columns"]) or rows
+    buffer = None
+    if has_data:
+        buffer = np.memmap(path, mode="r", dtype=np.uint8) if MEMORY_MAP else np.fromfile(path, dtype=np.uint8)
+
+    data = []
+    for column in header["columns"]:
+        dtype = np.dtype(column["dtype"])
+        if rows:
+            array = np.frombuffer(buffer, dtype=dtype, count=rows,
+                                  offset=data_start + column["offset"])
+        else:
+            array = np.empty(0, dtype=dtype)
+        kind = column["kind"]
+        if kind == "category":
+            categories = []
+            if column["n_categories"]:
+                start = data_start + column["categories_offset"]
+                blob = buffer[start:start + column["categories_nbytes"]].tobytes()
+                categories = blob.decode("utf-8").split("\0")
+            data.append(pd.Categorical.from_codes(array, categories=categories))
+        elif kind == "datetime":
+            values = pd.Series(array.view("datetime64[ns]"), copy=False)
+            if column["tz"]:
+                values = values.dt.tz_localize("UTC").dt.tz_convert(column["tz"])
+            data.append(values)
+        else:
+            data.append(array)
+    df = pd.DataFrame(dict(enumerate(data)), copy=False)
+    df.columns = [column["name"] for column in header["columns"]]
+    return df
@@ -0,0 +1,114 @@
+"""
+Filtering, column projection and cursor pagination for the props endpoints.
+
+Query parameters (all optional):
+    sport=NBA,NFL   stat=points   player=curry
+    fields=full_name,stat_name,stat_value
+    page_size=500   cursor=<next cursor from the previous page>
+
+A cursor is bound to the snapshot version and the filters it was issued
+for, so paging never skips or repeats rows within a snapshot; once the
+board reloads, old cursors are rejected and the client starts over.
+"""
+import base64
+import hashlib
+import numpy as np
+
+MAX_PAGE_SIZE = 10000
+
+# Board columns each filter applies to, per table
+FILTER_COLUMNS = {
+    "props": {"sport": "sport_id", "stat": "stat_name", "player": "full_name"},
+    "formatted": {"sport": "sport", "stat": "stat", "player": "player"},
+}
+
+class StaleCursorError(ValueError):
+    """The cursor was issued for another snapshot version or query."""
+
+def parse_list(value):
+    if value is None:
+        return None
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    return items or None
+
+def parse_fields(args, columns):
+    fields = parse_list(args.get("fields"))
+    if fields is None:
+        return None
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def _isin_ignore_case(series, values):
+    wanted = {v.lower() for v in values}
+    matching = [u for u in series.dropna().unique() if str(u).lower() in wanted]
+    return series.isin(matching).to_numpy()
+
+def filter_positions(df, args, table="props", player_index=None):
+    """Row positions of df matching the sport/stat/player filters in args."""
+    columns = FILTER_COLUMNS[table]
+    mask = np.ones(len(df), dtype=bool)
+    for name in ("sport", "stat"):
+        values = parse_list(args.get(name))
+        if values is not None and columns[name] in df.columns:
+            mask &= _isin_ignore_case(df[columns[name]], values)
+        elif values is not None:
+            mask[:] = False
+    player = args.get("player")
+    if player:
+        if player_index is not None and table == "props":
+            player_mask = np.zeros(len(df), dtype=bool)
+            player_mask[player_index.rows(player)] = True
+            mask &= player_mask
+        elif player_index is not None:
+            mask &= df[columns["player"]].isin(player_index.find_names(player)).to_numpy()
+        else:
+            mask &= (df[columns["player"]].astype(object).fillna("").str.lower()
+                     .str.contains(player.lower(), regex=False).to_numpy())
+    return np.flatnonzero(mask)
+
+def query_key(args):
+    """Short hash of the parameters that decide which rows a page holds."""
+    items = args.items(multi=True) if hasattr(args, "getlist") else args.items()
+    items = sorted((k, v) for k, v in items if k not in ("cursor", "page_size"))
+    return hashlib.sha1(repr(items).encode("utf-8")).hexdigest()[:12]
+
+def encode_cursor(version, offset, key):
+    raw = f"{version}:{offset}:{key}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor, version, key):
+    """Return the offset stored in cursor, checking it belongs to this query."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_version, offset, cursor_key = \
+            base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").rsplit(":", 2)
+        offset = int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if cursor_version != version or cursor_key != key:
+        raise StaleCursorError("Cursor is from a different props snapshot or query, start again")
+    return offset
+
+def paginate(positions, args, version):
+    """Slice positions for the requested page.
+
+    Returns (page_positions, next_cursor); next_cursor is None on the last
+    page, and pagination is skipped entirely without page_size or cursor.
+    """
+    page_size = args.get("page_size")
+    cursor = args.get("cursor")
+    if page_size is None and cursor is None:
+        return positions, None
+    try:
+        page_size = int(page_size) if page_size is not None else 500
+    except ValueError:
+        raise ValueError("page_size must be an integer")
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+    key = query_key(args)
+    offset = decode_cursor(cursor, version, key) if cursor else 0
+    end = offset + page_size
+    next_cursor = encode_cursor(version, end, key) if end < len(positions) else None
+    return positions[offset:end], next_cursor
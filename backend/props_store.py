@@ -0,0 +1,328 @@
+import os
+import re
+import time
+import threading
+from pick_player_props import board_keys, compact_props, load_props, format_props, format_props_frame, props_source
+from player_index import PlayerIndex
+from props_columnar import read_columnar, write_columnar
+from implied import ImpliedTable, implied_path
+
+class PropsSnapshot:
+    """An immutable view of one load of the props board.
+
+    Everything derived from the board is built here, before the snapshot is
+    published, so request handlers never pay for it and never see a
+    half-built table.
+    """
+    def __init__(self, df, version, source=None, load_seconds=0.0, memory_report=None,
+                 implied_frame=None):
+        self.df = df
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+        self.load_seconds = load_seconds
+        self.memory_report = memory_report
+        self.formatted_frame = format_props_frame(df)
+        self.formatted_props = format_props(df, self.formatted_frame)
+        self.player_index = PlayerIndex.from_frame(df)
+        # prop_key of every prop, for checking picks against the board
+        self.board_keys = board_keys(self.formatted_frame)
+        # Implied probabilities and fair lines per prop, loaded from disk when
+        # the store has a fresh copy
+        self.implied = (ImpliedTable(implied_frame) if implied_frame is not None
+                        else ImpliedTable.from_frame(df))
+
+    @property
+    def row_count(self):
+        return 0 if self.df is None else len(self.df)
+
+    def info(self):
+        info = {
+            "version": self.version,
+            "source": self.source,
+            "rows": self.row_count,
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 4),
+        }
+        if self.memory_report is not None:
+            info["memory_bytes_before"] = sum(c["bytes_before"] for c in self.memory_report)
+            info["memory_bytes"] = sum(c["bytes_after"] for c in self.memory_report)
+        return info
+
+def file_signature(path):
+    """Return (mtime_ns, size) for path, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def source_signature(csv_path):
+    """Return (path, mtime_ns, size) of the file load_props would read."""
+    source = props_source(csv_path)
+    signature = file_signature(source)
+    if signature is None:
+        return None
+    return (source,) + signature
+
+def signature_version(signature):
+    if signature is None:
+        return "empty"
+    return f"{signature[-2]:x}-{signature[-1]:x}"
+
+def partitions_path(csv_path):
+    """Directory of the per-sport partitions of the board next to csv_path."""
+    return os.path.splitext(csv_path)[0] + ".sports"
+
+def partition_name(sport):
+    """File stem of a sport's partition; lookups by sport ignore case."""
+    name = re.sub(r"[^A-Za-z0-9_-]", "_", str(sport)) if sport is not None else ""
+    return name or "_"
+
+def partition_path(csv_path, sport):
+    return os.path.join(partitions_path(csv_path), partition_name(sport) + ".cols")
+
+class PropsStore:
+    """Holds the current props snapshot and reloads it when the board changes.
+
+    The columnar snapshot next to the CSV is watched instead of the CSV when
+    the scraper has written one (see props_source). A scraper running in the
+    same process hands its boards over with publish() instead.
+
+    When the scraper also writes per-sport partitions (underdog_props.sports/)
+    each one is loaded into its own snapshot as soon as it changes, without
+    waiting for the other sports or the whole board; see partition().
+
+    Readers take `store.current` once per request and use that snapshot for
+    the whole request; a reload builds a complete new snapshot and swaps the
+    reference in one assignment.
+    """
+    def __init__(self, csv_path="underdog_props.csv", poll_interval=2.0, compact=False,
+                 keep_columns=None):
+        self.csv_path = csv_path
+        self.poll_interval = poll_interval
+        # Run every load through compact_props (see its docstring)
+        self.compact = compact
+        self.keep_columns = keep_columns
+        self.current = PropsSnapshot(None, signature_version(None))
+        self.reload_count = 0
+        self.last_error = None
+        self.last_checked_at = None
+        self._signature = None
+        self._pending_signature = None
+        self._reload_lock = threading.Lock()
+        # Partition name (lower case) -> snapshot, replaced as a whole on change
+        self.partitions = {}
+        self._partition_signatures = {}
+        self._partition_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def reload(self, force=False):
+        """Load the board into a new snapshot if it changed. Returns True on swap."""
+        with self._reload_lock:
+            self.last_checked_at = time.time()
+            signature = source_signature(self.csv_path)
+            if signature == self._signature and not force:
+                return False
+            if signature is None:
+                # The board was removed; keep serving the last one we had
+                return False
+            start = time.perf_counter()
+            try:
+                df = load_props(self.csv_path)
+                # The file may have been rewritten while we read it
+                if source_signature(self.csv_path) != signature:
+                    return False
+                memory_report = None
+                if self.compact and df is not None:
+                    df, memory_report = compact_props(df, self.keep_columns)
+                implied_frame = self._load_implied(signature)
+                snapshot = PropsSnapshot(df, signature_version(signature), signature[0],
+                                         time.perf_counter() - start, memory_report, implied_frame)
+                if implied_frame is None:
+                    self._save_implied(snapshot)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Error reloading props: {self.last_error}")
+                return False
+            self._signature = signature
+            self.current = snapshot
+            self.reload_count += 1
+            self.last_error = None
+            print(f"Loaded props version {snapshot.version}: {snapshot.row_count} rows "
+                  f"in {snapshot.load_seconds:.2f}s")
+            return True
+
+    def publish(self, df, signature=None):
+        """Swap in a board handed over in memory by an in-process scraper.
+
+        No file is read. signature is the source signature of the files the
+        scraper saved the same board to, if it did: the snapshot takes that
+        version and the watcher treats those files as already loaded.
+        """
+        with self._reload_lock:
+            start = time.perf_counter()
+            memory_report = None
+            if self.compact:
+                df, memory_report = compact_props(df, self.keep_columns)
+            if signature is not None:
+                version, source = signature_version(signature), signature[0]
+            else:
+                version, source = f"{time.time_ns():x}-pushed", "scraper"
+            snapshot = PropsSnapshot(df, version, source, time.perf_counter() - start, memory_report)
+            if signature is not None:
+                self._save_implied(snapshot)
+                self._signature = signature
+                self._pending_signature = None
+            self.current = snapshot
+            self.reload_count += 1
+            self.last_error = None
+            print(f"Published props version {snapshot.version}: {snapshot.row_count} rows "
+                  f"in {snapshot.load_seconds:.2f}s")
+            return snapshot
+
+    def partition(self, sport):
+        """Snapshot of one sport's partition, or None if there is none."""
+        return self.partitions.get(partition_name(sport).lower())
+
+    def reload_partitions(self):
+        """Load every partition whose file changed and drop those that are gone.
+
+        Each partition is loaded and swapped in on its own, so a small sport
+        is served as soon as its file is read. Returns the names swapped.
+        """
+        directory = partitions_path(self.csv_path)
+        names = os.listdir(directory) if os.path.isdir(directory) else []
+        paths = {name[:-len(".cols")]: os.path.join(directory, name)
+                 for name in names if name.endswith(".cols")}
+        swapped = []
+        with self._partition_lock:
+            for name, signature in list(self._partition_signatures.items()):
+                # Partitions published without a file are the scraper's to remove
+                if signature is not None and name not in paths:
+                    self._swap_partition(name, None, None)
+                    swapped.append(name)
+            for name, path in sorted(paths.items()):
+                signature = file_signature(path)
+                if signature is None or (path,) + signature == self._partition_signatures.get(name):
+                    continue
+                start = time.perf_counter()
+                try:
+                    df = read_columnar(path)
+                    memory_report = None
+                    if self.compact:
+                        df, memory_report = compact_props(df, self.keep_columns)
+                    snapshot = PropsSnapshot(df, signature_version(signature), path,
+                                             time.perf_counter() - start, memory_report)
+                except Exception as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    print(f"Error loading props partition {name}: {self.last_error}")
+                    continue
+                self._swap_partition(name, snapshot, (path,) + signature)
+                swapped.append(name)
+        return swapped
+
+    def publish_partition(self, sport, df, signature=None):
+        """Swap in one sport's partition handed over in memory (see publish).
+        A df of None removes the partition."""
+        name = partition_name(sport)
+        with self._partition_lock:
+            if df is None:
+                self._swap_partition(name, None, None)
+                return None
+            start = time.perf_counter()
+            memory_report = None
+            if self.compact:
+                df, memory_report = compact_props(df, self.keep_columns)
+            if signature is not None:
+                version, source = signature_version(signature), signature[0]
+            else:
+                version, source = f"{time.time_ns():x}-pushed", "scraper"
+            snapshot = PropsSnapshot(df, version, source, time.perf_counter() - start, memory_report)
+            self._swap_partition(name, snapshot, signature)
+            return snapshot
+
+    def _swap_partition(self, name, snapshot, signature):
+        partitions = dict(self.partitions)
+        if snapshot is None:
+            partitions.pop(name.lower(), None)
+            self._partition_signatures.pop(name, None)
+            print(f"Dropped props partition {name}")
+        else:
+            partitions[name.lower()] = snapshot
+            self._partition_signatures[name] = signature
+            print(f"Loaded props partition {name} version {snapshot.version}: "
+                  f"{snapshot.row_count} rows in {snapshot.load_seconds:.2f}s")
+        self.partitions = partitions
+
+    def _load_implied(self, signature):
+        """The stored implied table if it is at least as new as the board."""
+        path = implied_path(self.csv_path)
+        stored = file_signature(path)
+        if stored is None or stored[0] < signature[1]:
+            return None
+        try:
+            return read_columnar(path)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring implied table {path}: {e}")
+            return None
+
+    def _save_implied(self, snapshot):
+        path = implied_path(self.csv_path)
+        try:
+            write_columnar(snapshot.implied.frame, path)
+        except OSError as e:
+            print(f"Could not write implied table {path}: {e}")
+
+    def poll(self):
+        """Reload once the board signature has been stable for one poll interval.
+
+        Waiting for two identical readings avoids loading a CSV that is still
+        being written by something other than the scraper.
+        """
+        signature = source_signature(self.csv_path)
+        if signature == self._signature:
+            self._pending_signature = None
+            return False
+        if signature != self._pending_signature:
+            self._pending_signature = signature
+            return False
+        self._pending_signature = None
+        return self.reload()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                # Partitions first: the scraper writes them before the whole board
+                self.reload_partitions()
+                self.poll()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def start(self):
+        """Start the background watcher thread (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="props-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        stats = self.current.info()
+        stats.update({
+            "reload_count": self.reload_count,
+            "last_error": self.last_error,
+            "last_checked_at": self.last_checked_at,
+            "poll_interval": self.poll_interval,
+            "watching": self._thread is not None and self._thread.is_alive(),
+        })
+        if self.partitions:
+            stats["partitions"] = {name: snapshot.info() for name, snapshot in sorted(self.partitions.items())}
+        return stats
@@ -0,0 +1,100 @@
+"""
+Pre-serialized, pre-compressed response bodies keyed by
+(endpoint, query parameters, props snapshot version).
+
+A props response is fully determined by that key, so the ETag can be
+derived from the key alone and a repeat request costs a dict lookup.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+def make_etag(key):
+    return '"' + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:20] + '"'
+
+def etag_matches(if_none_match, etag, exists=False):
+    """True when an If-None-Match header value covers etag.
+
+    "*" matches any current representation, so it only counts once the
+    caller knows the resource exists (exists=True).
+    """
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return (exists and "*" in candidates) or etag in candidates
+
+class CachedBody:
+    __slots__ = ("body", "gzipped", "mimetype", "etag", "headers")
+
+    def __init__(self, body, mimetype, etag, headers=None, compress_level=6):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=compress_level)
+        self.mimetype = mimetype
+        self.etag = etag
+        self.headers = headers or {}
+
+    @property
+    def nbytes(self):
+        return len(self.body) + len(self.gzipped)
+
+class ResponseCache:
+    """Thread-safe LRU of CachedBody, bounded by entry count and total bytes."""
+    def __init__(self, max_entries=256, max_bytes=256 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        if entry.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,52 @@
+"""
+Seeded random streams for every simulated outcome.
+
+Each slip result or simulation draws from its own numpy Generator built
+from a seed record, {"entropy": hex string, "spawn_key": [ints]}, which
+maps onto a numpy SeedSequence. Records are JSON-safe and stored with the
+pick, so generator(record) replays the exact same draws later.
+
+Child streams (spawn_seeds) are numpy spawned sequences: statistically
+independent of each other and of their parent, and fully determined by
+the parent record and the child's index. Work split into shards that each
+use child i gives the same result however the shards are spread over
+processes.
+"""
+import secrets
+import numpy as np
+
+ENTROPY_BITS = 128
+
+def _record(entropy, spawn_key=()):
+    return {"entropy": format(entropy, "x"), "spawn_key": [int(k) for k in spawn_key]}
+
+def new_seed():
+    """A fresh seed record from OS entropy."""
+    return _record(secrets.randbits(ENTROPY_BITS))
+
+def seed_from(value):
+    """Seed record from a user-supplied seed: an int, a hex string or a record."""
+    if isinstance(value, dict):
+        return _record(int(str(value["entropy"]), 16), value.get("spawn_key", ()))
+    if isinstance(value, str):
+        return _record(int(value, 16))
+    value = int(value)
+    if value < 0:
+        raise ValueError("seed must be a non-negative integer")
+    return _record(value)
+
+def seed_sequence(record):
+    return np.random.SeedSequence(int(record["entropy"], 16), spawn_key=tuple(record["spawn_key"]))
+
+def generator(record):
+    """Generator for a seed record; the same record always gives the same draws."""
+    return np.random.Generator(np.random.PCG64(seed_sequence(record)))
+
+def spawn_seeds(record, n, start=0):
+    """Records of children start..start+n-1 of record, as SeedSequence.spawn makes them."""
+    return [_record(int(record["entropy"], 16), list(record["spawn_key"]) + [i])
+            for i in range(start, start + n)]
+
+def coin_flip(rng):
+    """True or False with equal chance."""
+    return bool(rng.integers(2))
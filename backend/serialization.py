@@ -0,0 +1,132 @@
+"""
+JSON encoding of DataFrame-backed responses.
+
+Rows are encoded straight from the column arrays, with nulls (NaN, NA, NaT,
+missing categories) turned into None per column rather than per object.
+When orjson is installed it is used as the encoder; otherwise the standard
+library json module is used with compact separators. Both produce the same
+JSON for the values these helpers emit.
+"""
+import json
+import math
+import datetime
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # optional accelerated backend
+    orjson = None
+
+STREAM_BATCH_ROWS = 1000
+
+def _default(obj):
+    """Encode the numpy/pandas values that turn up outside of frames."""
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return None if np.isnan(obj) else float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return None if pd.isna(obj) else obj.isoformat()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _replace_nan(obj):
+    # Only needed on the stdlib path, which would otherwise emit NaN literals
+    if isinstance(obj, float):
+        return None if math.isnan(obj) else obj
+    if isinstance(obj, dict):
+        return {k: _replace_nan(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_replace_nan(v) for v in obj]
+    return obj
+
+class _Encoder(json.JSONEncoder):
+    def default(self, obj):
+        return _default(obj)
+
+_stdlib_encoder = _Encoder(separators=(",", ":"), allow_nan=False)
+
+def backend_name():
+    return "orjson" if orjson is not None else "json"
+
+def dumps(obj):
+    """Serialize obj to JSON bytes, NaN and numpy scalars included."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    try:
+        return _stdlib_encoder.encode(obj).encode("utf-8")
+    except ValueError:
+        # A float NaN somewhere in plain Python data
+        return _stdlib_encoder.encode(_replace_nan(obj)).encode("utf-8")
+
+def column_to_list(series):
+    """Python values of a column with every kind of null as None."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Code -1 (null) picks the trailing None
+        lookup = np.empty(len(dtype.categories) + 1, dtype=object)
+        lookup[:-1] = dtype.categories.to_numpy(dtype=object)
+        lookup[-1] = None
+        return lookup[series.cat.codes.to_numpy()].tolist()
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        values = series.to_numpy(dtype=object)
+        mask = series.isna().to_numpy()
+        values = np.array([v.isoformat() if not m else None for v, m in zip(values, mask)], dtype=object)
+        return values.tolist()
+    if isinstance(dtype, np.dtype) and dtype.kind in "iub":
+        return series.to_numpy().tolist()
+    if isinstance(dtype, np.dtype) and dtype.kind == "f":
+        values = series.to_numpy()
+        mask = np.isnan(values)
+        if not mask.any():
+            return values.tolist()
+        values = values.astype(object)
+        values[mask] = None
+        return values.tolist()
+    values = series.to_numpy(dtype=object)
+    mask = pd.isna(values)
+    if mask.any():
+        values = values.copy()
+        values[mask] = None
+    return values.tolist()
+
+def iter_record_batches(df, batch_size=STREAM_BATCH_ROWS):
+    """Yield lists of row dicts, batch_size rows at a time."""
+    names = [str(c) for c in df.columns]
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start:start + batch_size]
+        columns = [column_to_list(batch[c]) for c in batch.columns]
+        yield [dict(zip(names, row)) for row in zip(*columns)]
+
+def frame_records(df):
+    """All rows of df as dicts, nulls as None."""
+    records = []
+    for batch in iter_record_batches(df, batch_size=max(len(df), 1)):
+        records.extend(batch)
+    return records
+
+def dumps_frame(df):
+    """Serialize df as a JSON array of row objects."""
+    return dumps(frame_records(df))
+
+def stream_ndjson(df, batch_size=STREAM_BATCH_ROWS):
+    """Yield the frame as newline-delimited JSON, one row per line."""
+    for records in iter_record_batches(df, batch_size):
+        yield b"".join(dumps(record) + b"\n" for record in records)
+
+def stream_json_array(df, batch_size=STREAM_BATCH_ROWS):
+    """Yield the frame as one JSON array, written batch by batch."""
+    yield b"["
+    first = True
+    for records in iter_record_batches(df, batch_size):
+        body = dumps(records)[1:-1]
+        yield body if first else b"," + body
+        first = False
+    yield b"]"
@@ -0,0 +1,192 @@
+"""
+Settle open slips against actual stat results.
+
+A results file has one row per player and stat with the actual value
+(player, stat, actual), as CSV or JSON records. It is loaded into a
+ResultIndex keyed on the normalized player name and stat, and every leg of
+every open slip is looked up in one vectorized pass.
+
+Legs hit when the actual value is on the picked side of the line and push
+(are voided) when it lands exactly on it. A slip is graded once all of its
+legs have a result: pushed legs are dropped, the remaining legs' losses go
+through the payout tables, and a slip whose legs all pushed is refunded.
+Flex slips cut below 3 live legs by pushes pay as PowerPlay.
+
+Open slips are pick records with is_completed false; their stake was taken
+from the balance when they were placed, so settling credits the payout.
+
+Usage: python settlement.py results.csv
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+import user_db
+from payouts import FLEX, MIN_FLEX_PICKS, batch_payouts, normalize_mode
+from player_index import normalize_name
+
+PENDING, MISS, HIT, PUSH = -1, 0, 1, 2
+LEG_RESULTS = {MISS: "miss", HIT: "hit", PUSH: "push"}
+
+def _factorize(values):
+    """(codes, distinct values as strings); missing values count as ""."""
+    codes, uniques = pd.factorize(np.array(values, dtype=object))
+    # Missing values get code -1; give them a trailing "" instead
+    codes[codes < 0] = len(uniques)
+    return codes, [str(v) for v in uniques] + [""]
+
+def _player_key(player):
+    # Same normalization as the player search index
+    return normalize_name(player).strip()
+
+def _stat_key(stat):
+    return stat.strip().lower()
+
+class ResultIndex:
+    """Actual stat values keyed by (player, stat)."""
+    def __init__(self, results):
+        df = pd.DataFrame(results)
+        missing = {"player", "stat", "actual"} - set(df.columns)
+        if missing:
+            raise ValueError(f"Results need columns: {', '.join(sorted(missing))}")
+        actual = pd.to_numeric(df["actual"], errors="coerce").tolist()
+        players = [_player_key(str(p)) for p in df["player"].tolist()]
+        stats = [_stat_key(str(s)) for s in df["stat"].tolist()]
+        # A later row for the same player and stat replaces an earlier one
+        self._actual = {key: value for key, value in zip(zip(players, stats), actual)
+                        if value == value}
+
+    @classmethod
+    def from_file(cls, path):
+        if str(path).lower().endswith(".json"):
+            return cls(pd.read_json(path))
+        return cls(pd.read_csv(path))
+
+    def __len__(self):
+        return len(self._actual)
+
+    def lookup(self, players, stats):
+        """Actual values for many legs, NaN where there is no result yet.
+
+        Names are normalized and looked up once per distinct (player, stat)
+        pair, then gathered back to the legs.
+        """
+        player_codes, player_names = _factorize(players)
+        stat_codes, stat_names = _factorize(stats)
+        player_names = [_player_key(p) for p in player_names]
+        stat_names = [_stat_key(s) for s in stat_names]
+        n_stats = max(len(stat_names), 1)
+        pair_codes, pairs = pd.factorize(player_codes.astype(np.int64) * n_stats + stat_codes)
+        values = np.array([self._actual.get((player_names[pair // n_stats], stat_names[pair % n_stats]),
+                                            np.nan) for pair in pairs.tolist()], dtype=float)
+        return values[pair_codes]
+
+def _parse_lines(values):
+    """Lines as floats, converting each distinct value once; NaN if unusable."""
+    codes, uniques = _factorize(values)
+    parsed = pd.to_numeric(pd.Series(uniques, dtype=object), errors="coerce").to_numpy(dtype=float)
+    return parsed[codes]
+
+def grade_slips(slips, results):
+    """Grade pick records against a ResultIndex.
+
+    Returns a dict of per-slip arrays (settled, losses, live_legs, payout)
+    and per-leg arrays (slip, outcome, actual) in the order the legs appear.
+    """
+    legs_per_slip = [len(slip.get("picks") or []) for slip in slips]
+    legs = [leg for slip in slips for leg in slip.get("picks") or []]
+    slip_of_leg = np.repeat(np.arange(len(slips)), legs_per_slip)
+    players = [leg.get("player") for leg in legs]
+    stats = [leg.get("stat") for leg in legs]
+    lines = [leg.get("line", leg.get("value")) for leg in legs]
+    picks = [leg.get("pick", "over") for leg in legs]
+    actual = results.lookup(players, stats)
+    lines = _parse_lines(lines)
+    pick_codes, pick_names = _factorize(picks)
+    over = np.array([p.lower() != "under" for p in pick_names], dtype=bool)[pick_codes]
+
+    outcome = np.full(len(legs), PENDING, dtype=np.int8)
+    known = ~np.isnan(actual) & ~np.isnan(lines)
+    outcome[known & (actual == lines)] = PUSH
+    outcome[known & (actual != lines)] = MISS
+    outcome[known & (actual != lines) & ((actual > lines) == over)] = HIT
+
+    n_slips = len(slips)
+    def per_slip(mask):
+        return np.bincount(slip_of_leg[mask], minlength=n_slips)
+    n_legs = np.bincount(slip_of_leg, minlength=n_slips)
+    settled = (per_slip(outcome == PENDING) == 0) & (n_legs > 0)
+    losses = per_slip(outcome == MISS)
+    live_legs = per_slip((outcome == MISS) | (outcome == HIT))
+
+    stakes = np.array([float(slip.get("bet_amount", 0)) for slip in slips], dtype=float)
+    flex = np.array([normalize_mode(slip.get("mode")) == FLEX for slip in slips], dtype=bool)
+    payout = batch_payouts(stakes, live_legs, losses, flex & (live_legs >= MIN_FLEX_PICKS))
+    payout = np.where(live_legs == 0, stakes, payout)
+    return {"settled": settled, "losses": losses, "live_legs": live_legs, "payout": payout,
+            "leg_slip": slip_of_leg, "leg_outcome": outcome, "leg_actual": actual}
+
+def settle_open_slips(db_data, results, settled_at=None):
+    """Grade every open slip of every user in db_data and apply the payouts.
+
+    Updates db_data in place and returns a summary.
+    """
+    started = time.perf_counter()
+    settled_at = settled_at if settled_at is not None else int(time.time())
+    owners, slips = [], []
+    for user in db_data["users"].values():
+        for record in user.get("picks_history", []):
+            if not record.get("is_completed", True):
+                owners.append(user)
+                slips.append(record)
+
+    grades = grade_slips(slips, results)
+    settled, payout = grades["settled"], grades["payout"]
+    leg_outcome, leg_actual = grades["leg_outcome"].tolist(), grades["leg_actual"].tolist()
+    leg = 0
+    paid_out = 0.0
+    for i, record in enumerate(slips):
+        legs = record.get("picks") or []
+        if not settled[i]:
+            leg += len(legs)
+            continue
+        for pick in legs:
+            pick["result"] = LEG_RESULTS[leg_outcome[leg]]
+            pick["actual"] = leg_actual[leg]
+            leg += 1
+        amount = float(payout[i])
+        record.update({
+            "result": "win" if amount > 0 else "loss",
+            "payout": amount,
+            "losses": int(grades["losses"][i]),
+            "is_completed": True,
+            "settled_at": settled_at,
+        })
+        owners[i]["balance"] = owners[i].get("balance", 1000.0) + amount
+        paid_out += amount
+
+    return {
+        "open_slips": len(slips),
+        "settled": int(settled.sum()),
+        "pending": int(len(slips) - settled.sum()),
+        "paid_out": paid_out,
+        "results": len(results),
+        "elapsed_seconds": round(time.perf_counter() - started, 4),
+    }
+
+def settle(results):
+    """Settle all open slips in the user database in one transaction."""
+    with user_db.transaction() as db_data:
+        return settle_open_slips(db_data, results)
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python settlement.py results.csv")
+        return
+    results = ResultIndex.from_file(sys.argv[1])
+    summary = settle(results)
+    print(f"Settled {summary['settled']} of {summary['open_slips']} open slips "
+          f"({summary['pending']} still pending), paid out ${summary['paid_out']:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Monte Carlo and exact evaluation of pick'em slips.
+
+A slip's payout depends only on how many of its legs lose, so a batch of
+trials is reduced to a histogram of loss counts; expected payout, variance
+and percentiles all come from that histogram and the payout table.
+
+With independent legs the number of losses is Poisson-binomial, and its
+distribution can be computed exactly in O(legs^2) (loss_distributions),
+which is what evaluate_slip uses unless Monte Carlo is asked for.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from payouts import FLEX_TABLE, MAX_PICKS, POWERPLAY_TABLE, normalize_mode, payout_table
+from rng_service import generator, spawn_seeds
+
+DEFAULT_TRIALS = 100_000
+MAX_TRIALS = 10_000_000
+# Trials drawn per chunk; bounds memory at CHUNK_TRIALS x legs uniforms
+CHUNK_TRIALS = 1 << 18
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+def validate_probabilities(hit_probs):
+    """Return hit_probs as a float array, raising ValueError if unusable."""
+    probs = np.asarray(hit_probs, dtype=float)
+    if probs.ndim != 1 or not 1 <= len(probs) <= MAX_PICKS:
+        raise ValueError(f"A slip needs between 1 and {MAX_PICKS} legs")
+    if np.isnan(probs).any() or (probs < 0).any() or (probs > 1).any():
+        raise ValueError("Leg probabilities must be between 0 and 1")
+    return probs
+
+def _chunk_loss_counts(probs, chunk, rng):
+    # A leg loses when its uniform draw lands at or above its hit probability
+    losses = (rng.random((chunk, len(probs))) >= probs).sum(axis=1)
+    return np.bincount(losses, minlength=len(probs) + 1)
+
+def _seeded_chunk(args):
+    probs, chunk, record = args
+    return _chunk_loss_counts(probs, chunk, generator(record))
+
+def simulate_loss_counts(hit_probs, trials, rng=None, seed=None, workers=1):
+    """Histogram of losses per trial, length legs + 1.
+
+    With a seed record, chunk i draws from child stream i of the seed, so
+    the counts replay exactly and do not depend on how many worker
+    processes share the chunks.
+    """
+    probs = validate_probabilities(hit_probs)
+    chunks = [min(CHUNK_TRIALS, trials - start) for start in range(0, trials, CHUNK_TRIALS)]
+    if seed is not None:
+        tasks = [(probs, chunk, record) for chunk, record in zip(chunks, spawn_seeds(seed, len(chunks)))]
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                return sum(pool.map(_seeded_chunk, tasks))
+        return sum(_seeded_chunk(task) for task in tasks)
+
+    rng = rng if rng is not None else np.random.default_rng()
+    counts = np.zeros(len(probs) + 1, dtype=np.int64)
+    for chunk in chunks:
+        counts += _chunk_loss_counts(probs, chunk, rng)
+    return counts
+
+def summarize_loss_distribution(loss_probs, mode, stake=1.0, percentiles=DEFAULT_PERCENTILES):
+    """EV, variance and payout percentiles from P(k losses), k = 0..legs."""
+    loss_probs = np.asarray(loss_probs, dtype=float)
+    n_legs = len(loss_probs) - 1
+    payouts = stake * payout_table(mode)[n_legs, :n_legs + 1]
+    expected = float(loss_probs @ payouts)
+    variance = float(loss_probs @ (payouts - expected) ** 2)
+
+    # Percentiles of a discrete distribution: smallest payout whose
+    # cumulative probability reaches q
+    order = np.argsort(payouts, kind="stable")
+    cumulative = np.cumsum(loss_probs[order])
+    payout_percentiles = {}
+    for q in percentiles:
+        i = min(np.searchsorted(cumulative, q / 100 - 1e-12), len(order) - 1)
+        payout_percentiles[str(q)] = float(payouts[order[i]])
+
+    return {
+        "legs": n_legs,
+        "mode": normalize_mode(mode),
+        "stake": stake,
+        "expected_payout": expected,
+        "expected_profit": expected - stake,
+        "variance": variance,
+        "std": float(np.sqrt(variance)),
+        "win_probability": float(loss_probs[payouts > stake].sum()),
+        "cash_probability": float(loss_probs[payouts > 0].sum()),
+        "loss_probabilities": loss_probs.tolist(),
+        "payout_by_losses": payouts.tolist(),
+        "payout_percentiles": payout_percentiles,
+    }
+
+def simulate_slip(hit_probs, mode="PowerPlay", trials=DEFAULT_TRIALS, stake=1.0, rng=None,
+                  percentiles=DEFAULT_PERCENTILES, seed=None, workers=1):
+    """Simulate a slip `trials` times and summarize the payout distribution.
+
+    hit_probs are the per-leg probabilities of the pick hitting, assumed
+    independent. Payouts are in the same unit as stake. Pass a seed record
+    (rng_service) instead of rng to make the run replayable.
+    """
+    if not 1 <= trials <= MAX_TRIALS:
+        raise ValueError(f"trials must be between 1 and {MAX_TRIALS}")
+    counts = simulate_loss_counts(hit_probs, trials, rng, seed, workers)
+    result = summarize_loss_distribution(counts / trials, mode, stake, percentiles)
+    result.update({"method": "monte_carlo", "trials": trials})
+    if seed is not None:
+        result["seed"] = seed
+    return result
+
+def loss_distributions(hit_probs):
+    """Exact P(k losses) for many slips at once.
+
+    hit_probs is a (slips, legs) array; shorter slips are padded with 1.0
+    (a leg that always hits adds no losses). Returns a (slips, legs + 1)
+    array whose row i is the loss-count distribution of slip i.
+    """
+    probs = np.atleast_2d(np.asarray(hit_probs, dtype=float))
+    n_slips, n_legs = probs.shape
+    dist = np.zeros((n_slips, n_legs + 1))
+    dist[:, 0] = 1.0
+    for leg in range(n_legs):
+        p = probs[:, leg:leg + 1]
+        # Either this leg hits (losses unchanged) or it loses (shift by one)
+        dist[:, 1:leg + 2] = dist[:, 1:leg + 2] * p + dist[:, :leg + 1] * (1 - p)
+        dist[:, 0] *= p[:, 0]
+    return dist
+
+def evaluate_slips(hit_probs, n_legs, flex, stakes=1.0):
+    """Exact expected payout and variance for many slips.
+
+    hit_probs is padded as in loss_distributions, n_legs gives each slip's
+    real leg count and flex whether it is a Flex slip. Returns
+    (expected_payout, variance, loss_distributions) arrays.
+    """
+    dist = loss_distributions(hit_probs)
+    n_slips, width = dist.shape
+    n_legs = np.broadcast_to(np.asarray(n_legs), (n_slips,))
+    flex = np.broadcast_to(np.asarray(flex, dtype=bool), (n_slips,))
+    stakes = np.broadcast_to(np.asarray(stakes, dtype=float), (n_slips,))
+    losses = np.arange(width)
+    payouts = np.where(flex[:, None], FLEX_TABLE[n_legs[:, None], losses],
+                       POWERPLAY_TABLE[n_legs[:, None], losses]) * stakes[:, None]
+    expected = (dist * payouts).sum(axis=1)
+    variance = (dist * (payouts - expected[:, None]) ** 2).sum(axis=1)
+    return expected, variance, dist
+
+def exact_slip(hit_probs, mode="PowerPlay", stake=1.0, percentiles=DEFAULT_PERCENTILES):
+    """Same summary as simulate_slip, from the exact loss distribution."""
+    probs = validate_probabilities(hit_probs)
+    result = summarize_loss_distribution(loss_distributions(probs)[0], mode, stake, percentiles)
+    result["method"] = "exact"
+    return result
+
+def evaluate_slip(hit_probs, mode="PowerPlay", stake=1.0, method="exact", trials=DEFAULT_TRIALS,
+                  rng=None, percentiles=DEFAULT_PERCENTILES, seed=None, workers=1):
+    """Evaluate a slip exactly, or by simulation with method="monte_carlo"."""
+    if method == "exact":
+        return exact_slip(hit_probs, mode, stake, percentiles)
+    if method == "monte_carlo":
+        return simulate_slip(hit_probs, mode, trials, stake, rng, percentiles, seed, workers)
+    raise ValueError("method must be 'exact' or 'monte_carlo'")
@@ -0,0 +1,217 @@
+"""
+Search for the best slips over a set of candidate legs.
+
+A candidate leg is a prop on the board plus a side and the probability of
+that side hitting. Slips follow the same rules as the CLI: 2-8 legs, at
+most one leg per prop (player, stat, line), so no duplicates and no
+picking both sides.
+
+Expected payout only grows when a leg's hit probability grows, for
+PowerPlay and Flex alike. With candidates sorted by probability, the best
+way to finish a partial slip is to take the next best legs, which gives an
+upper bound on any completion. The search keeps a beam of the partial
+slips with the highest bound at each depth and scores the finished slips
+exactly with the Poisson-binomial evaluator. Slip sizes and modes are
+searched in parallel across a process pool.
+
+Usage: python slip_builder.py [probabilities.csv] [--mode Flex] [--top-k 5] ...
+(or "Suggest slips" in the pick_player_props.py menu)
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from payouts import FLEX, MAX_PICKS, MIN_FLEX_PICKS, normalize_mode
+from pick_player_props import load_props, prop_key
+from implied import ImpliedTable
+from simulator import evaluate_slips
+
+MIN_LEGS = 2
+DEFAULT_BEAM_WIDTH = 256
+# Expansions kept per depth, as a multiple of the beam width, before the
+# exact evaluation
+PREFILTER_FACTOR = 4
+
+def prepare_candidates(legs):
+    """Clean and sort candidate legs.
+
+    legs is a DataFrame (or list of dicts) with player, stat, line, pick and
+    probability. Rows with an unusable probability or pick are dropped,
+    repeated (prop, pick) rows keep their best probability, and the result
+    is sorted by probability, best first, with an integer prop key column.
+    """
+    df = pd.DataFrame(legs)
+    missing = {"player", "stat", "line", "pick", "probability"} - set(df.columns)
+    if missing:
+        raise ValueError(f"Candidate legs need columns: {', '.join(sorted(missing))}")
+    df = df[["player", "stat", "line", "pick", "probability"]].copy()
+    df["pick"] = df["pick"].astype(str).str.lower()
+    df["probability"] = pd.to_numeric(df["probability"], errors="coerce")
+    df = df[df["pick"].isin(["over", "under"]) & df["probability"].between(0, 1)]
+    df = (df.sort_values("probability", ascending=False, kind="stable")
+            .drop_duplicates(["player", "stat", "line", "pick"])
+            .reset_index(drop=True))
+    df["prop_key"] = df.groupby(["player", "stat", "line"], sort=False).ngroup()
+    return df
+
+def split_board_legs(board, legs):
+    """Split candidate leg dicts into (on the board, not on the board).
+
+    board is a snapshot's board_keys; a leg is on the board when its
+    player, stat and line match a prop.
+    """
+    known, unknown = [], []
+    for leg in legs:
+        key = prop_key(leg.get("player"), leg.get("stat"), leg.get("line"))
+        (known if key in board else unknown).append(leg)
+    return known, unknown
+
+def _search_size(probs, keys, n_legs, flex, stake, top_k, beam_width, max_variance):
+    """Beam search for the best slips with exactly n_legs legs.
+
+    Returns a list of (expected payout, variance, leg indices).
+    """
+    n_candidates = len(probs)
+    if n_candidates < n_legs:
+        return []
+    # Window of next candidates tried per partial slip; a few extra so that
+    # skipping conflicting props does not empty it
+    window = min(beam_width + n_legs, n_candidates)
+    states = np.empty((1, 0), dtype=np.int64)
+
+    for depth in range(n_legs):
+        need = n_legs - depth - 1
+        last = states[:, -1] if depth else np.full(len(states), -1)
+        js = last[:, None] + 1 + np.arange(window)
+        valid = js < n_candidates - need
+        js = np.minimum(js, n_candidates - 1)
+        if depth:
+            conflict = (keys[js][:, :, None] == keys[states][:, None, :]).any(axis=2)
+            valid &= ~conflict
+        rows, cols = np.nonzero(valid)
+        if not len(rows):
+            return []
+        chosen = js[rows, cols]
+        expanded = np.concatenate([states[rows], chosen[:, None]], axis=1)
+
+        # Bound: the partial slip finished with the next best candidates
+        tail = chosen[:, None] + 1 + np.arange(need)
+        bound_probs = np.concatenate([probs[expanded], probs[np.minimum(tail, n_candidates - 1)]],
+                                     axis=1)
+        # The chance of a perfect slip orders PowerPlay exactly and Flex
+        # closely; only the most promising few get the full evaluation. The
+        # last step keeps them all under a variance cap, which it filters on.
+        shortlist = PREFILTER_FACTOR * max(beam_width, top_k)
+        final_filter = need == 0 and max_variance is not None
+        if len(expanded) > shortlist and not final_filter:
+            perfect = np.log(np.maximum(bound_probs, 1e-300)).sum(axis=1)
+            picked = np.argpartition(-perfect, shortlist - 1)[:shortlist]
+            picked.sort()
+            expanded, bound_probs = expanded[picked], bound_probs[picked]
+
+        if depth < n_legs - 1:
+            bound, _, _ = evaluate_slips(bound_probs, n_legs, flex, stake)
+            keep = np.argsort(-bound, kind="stable")[:beam_width]
+            states = expanded[keep]
+            continue
+
+        expected, variance, _ = evaluate_slips(bound_probs, n_legs, flex, stake)
+        feasible = np.ones(len(expected), dtype=bool)
+        if max_variance is not None:
+            feasible = variance <= max_variance
+        order = [i for i in np.argsort(-expected, kind="stable") if feasible[i]][:top_k]
+        return [(float(expected[i]), float(variance[i]), expanded[i].tolist()) for i in order]
+    return []
+
+def _search_task(args):
+    mode, n_legs, probs, keys, stake, top_k, beam_width, max_variance = args
+    results = _search_size(probs, keys, n_legs, mode == FLEX, stake, top_k, beam_width, max_variance)
+    return [(ev, var, mode, legs) for ev, var, legs in results]
+
+def optimize_slips(legs, modes=("PowerPlay",), min_legs=MIN_LEGS, max_legs=MAX_PICKS, top_k=5,
+                   stake=1.0, max_variance=None, beam_width=DEFAULT_BEAM_WIDTH, workers=None):
+    """Top `top_k` slips by exact expected payout over the candidate legs.
+
+    modes is any of "PowerPlay"/"Flex"; Flex slips start at 3 legs.
+    max_variance caps the payout variance (in stake units squared) of the
+    returned slips. workers is the process pool size, 1 to search inline.
+    """
+    started = time.perf_counter()
+    candidates = prepare_candidates(legs)
+    probs = candidates["probability"].to_numpy(dtype=float)
+    keys = candidates["prop_key"].to_numpy()
+    min_legs = max(min_legs, MIN_LEGS)
+    max_legs = min(max_legs, MAX_PICKS)
+    if min_legs > max_legs:
+        raise ValueError(f"Slips need between {MIN_LEGS} and {MAX_PICKS} legs")
+
+    tasks = []
+    for mode in dict.fromkeys(normalize_mode(m) for m in modes):
+        lowest = max(min_legs, MIN_FLEX_PICKS) if mode == FLEX else min_legs
+        for n_legs in range(lowest, max_legs + 1):
+            tasks.append((mode, n_legs, probs, keys, stake, top_k, beam_width, max_variance))
+
+    workers = workers if workers is not None else min(len(tasks), os.cpu_count() or 1)
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            found = [slip for result in pool.map(_search_task, tasks) for slip in result]
+    else:
+        found = [slip for task in tasks for slip in _search_task(task)]
+
+    found.sort(key=lambda slip: -slip[0])
+    records = candidates.drop(columns="prop_key").to_dict(orient="records")
+    slips = [{
+        "mode": mode,
+        "legs": [records[i] for i in legs],
+        "n_legs": len(legs),
+        "stake": stake,
+        "expected_payout": ev,
+        "expected_profit": ev - stake,
+        "variance": var,
+        "std": var ** 0.5,
+    } for ev, var, mode, legs in found[:top_k]]
+    return {
+        "slips": slips,
+        "candidates": len(candidates),
+        "searched_sizes": len(tasks),
+        "elapsed_seconds": round(time.perf_counter() - started, 4),
+    }
+
+def print_slips(result):
+    print(f"Searched {result['candidates']} legs in {result['elapsed_seconds']:.2f}s")
+    for rank, slip in enumerate(result["slips"], 1):
+        print(f"\n{rank}. {slip['mode']} {slip['n_legs']} legs - EV ${slip['expected_payout']:.2f} "
+              f"on ${slip['stake']:.2f} (std ${slip['std']:.2f})")
+        for leg in slip["legs"]:
+            print(f"   - {leg['player']} | {leg['stat']} (Line: {leg['line']}): {leg['pick']} "
+                  f"({leg['probability']:.1%})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the best slips for a set of leg probabilities.")
+    parser.add_argument("probabilities", nargs="?",
+                        help="CSV with player, stat, line, pick, probability columns "
+                             "(default: implied probabilities of the current board)")
+    parser.add_argument("--mode", action="append", choices=["PowerPlay", "Flex"],
+                        help="Mode to search, repeat for both (default PowerPlay)")
+    parser.add_argument("--min-legs", type=int, default=MIN_LEGS)
+    parser.add_argument("--max-legs", type=int, default=MAX_PICKS)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--stake", type=float, default=10.0)
+    parser.add_argument("--max-variance", type=float, default=None)
+    parser.add_argument("--beam-width", type=int, default=DEFAULT_BEAM_WIDTH)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.probabilities:
+        legs = pd.read_csv(args.probabilities)
+    else:
+        legs = ImpliedTable.from_frame(load_props()).candidate_legs()
+    result = optimize_slips(legs, args.mode or ["PowerPlay"],
+                            args.min_legs, args.max_legs, args.top_k, args.stake,
+                            args.max_variance, args.beam_width, args.workers)
+    print_slips(result)
+
+if __name__ == "__main__":
+    main()
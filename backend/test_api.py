@@ -0,0 +1,101 @@
+"""
+Test script to verify the API's props responses and past picks
+"""
+import json
+import os
+import tempfile
+import pandas as pd
+import api
+from props_store import PropsSnapshot
+import user_db
+from payouts import payout_multiplier
+
+def publish_board():
+    return api.props_store.publish(pd.DataFrame({
+        "full_name": ["A Player", "B Player"],
+        "stat_name": ["points", "rebounds"],
+        "stat_value": [10.5, 4.5],
+        "sport_id": ["NBA", "NBA"],
+    }))
+
+def test_cache_negotiates_ndjson():
+    previous = api.props_store.current
+    try:
+        publish_board()
+        client = api.app.test_client()
+        as_json = client.get("/api/props")
+        assert as_json.status_code == 200 and as_json.mimetype == "application/json"
+        assert "Accept" in as_json.headers["Vary"]
+        assert len(json.loads(as_json.data)) == 2
+
+        # Same URL, other representation: neither the cached JSON body nor a 304
+        ndjson = {"Accept": "application/x-ndjson"}
+        streamed = client.get("/api/props", headers=ndjson)
+        assert streamed.mimetype == "application/x-ndjson"
+        assert len(streamed.data.decode().strip().splitlines()) == 2
+        revalidated = client.get("/api/props", headers=dict(ndjson, **{"If-None-Match": as_json.headers["ETag"]}))
+        assert revalidated.status_code == 200 and revalidated.mimetype == "application/x-ndjson"
+
+        # JSON is still served from the cache, and revalidates
+        assert client.get("/api/props").data == as_json.data
+        assert client.get("/api/props", headers={"If-None-Match": as_json.headers["ETag"]}).status_code == 304
+    finally:
+        api.props_store.current = previous
+
+def test_wildcard_if_none_match_needs_a_resource():
+    previous = api.props_store.current
+    try:
+        client = api.app.test_client()
+        wildcard = {"If-None-Match": "*"}
+        api.props_store.current = PropsSnapshot(None, "empty")
+        assert client.get("/api/props", headers=wildcard).status_code == 404
+        publish_board()
+        assert client.get("/api/props/player/Nobody", headers=wildcard).status_code == 404
+        assert client.get("/api/props", headers=wildcard).status_code == 304
+    finally:
+        api.props_store.current = previous
+
+def test_past_picks_count_only_legs():
+    # The sample slips in Data/ end with the CLI's bet and payout lines
+    past_picks = api.load_past_picks()
+    assert past_picks
+    for slip in past_picks:
+        assert 1 <= len(slip["picks"]) <= 8
+        assert not any(str(pick["player"]).startswith(("Bet:", "Multiplier:")) for pick in slip["picks"])
+        if slip["won"]:
+            assert slip["payout"] == slip["bet"] * payout_multiplier(slip["mode"], len(slip["picks"])) > 0
+
+def test_batch_for_unknown_user_leaves_db_alone():
+    path = tempfile.mktemp(suffix=".json")
+    original = user_db.DB_FILE
+    user_db.DB_FILE = path
+    try:
+        user_db.save_db({"users": {}})
+        written = os.stat(path).st_mtime_ns
+        client = api.app.test_client()
+        with client.session_transaction() as session:
+            session["username"] = "nobody"
+        response = client.post("/api/picks/batch", json={"slips": [{"picks": []}]})
+        assert response.status_code == 404
+        assert os.stat(path).st_mtime_ns == written
+    finally:
+        user_db.DB_FILE = original
+        for leftover in (path, path + ".lock"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+def test_bankroll_request_size_is_capped():
+    client = api.app.test_client()
+    body = {"probabilities": [0.55, 0.55], "seed": 1}
+    too_big = client.post("/api/bankroll", json=dict(body, paths=100_000, bets=1_000))
+    assert too_big.status_code == 400 and "paths x bets" in too_big.get_json()["error"]
+    ok = client.post("/api/bankroll", json=dict(body, paths=1_000, bets=100))
+    assert ok.status_code == 200 and ok.get_json()["success"]
+
+if __name__ == "__main__":
+    test_cache_negotiates_ndjson()
+    test_wildcard_if_none_match_needs_a_resource()
+    test_past_picks_count_only_legs()
+    test_batch_for_unknown_user_leaves_db_alone()
+    test_bankroll_request_size_is_capped()
+    print("\nAll tests completed!")
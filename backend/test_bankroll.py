@@ -0,0 +1,43 @@
+"""
+Test script to verify the bankroll simulator
+"""
+import numpy as np
+from bankroll import kelly_fraction, payout_distribution, simulate_bankroll
+from rng_service import seed_from
+
+def test_kelly_fraction_two_outcomes():
+    # Even-money style bet: f* = p - (1 - p) / b with b = multiplier - 1
+    p = 0.6
+    assert np.isclose(kelly_fraction([0, 3], [1 - p, p]), p - (1 - p) / 2)
+    multipliers, probs = payout_distribution([0.5, 0.5], "PowerPlay")
+    assert kelly_fraction(multipliers, probs) == 0.0
+
+def test_fixed_stake_matches_expected_value():
+    multipliers, probs = payout_distribution([0.6, 0.62, 0.58], "Flex")
+    result = simulate_bankroll([0.6, 0.62, 0.58], "Flex", "fixed", n_paths=20_000, n_bets=50,
+                               stake=10, seed=seed_from(1))
+    # No path can be ruined within 50 $10 bets from $1,000
+    assert result["risk_of_ruin"] == 0.0
+    expected = 1000 + 50 * 10 * (probs @ multipliers - 1)
+    assert abs(result["final_balance_mean"] - expected) < 5
+    assert 0 <= result["max_drawdown_percentiles"]["50"] <= 1
+
+def test_losing_slip_is_ruined():
+    result = simulate_bankroll([0.3, 0.3], "PowerPlay", "fixed", n_paths=1000, n_bets=500,
+                               stake=100, seed=seed_from(2))
+    assert result["risk_of_ruin"] > 0.99
+    assert result["median_bets_to_ruin"] is not None
+
+def test_replay_and_chunking():
+    args = ([0.6, 0.6, 0.6], "Flex", "kelly", 25_000, 40)
+    first = simulate_bankroll(*args, kelly_multiplier=0.5, seed=seed_from(3))
+    pooled = simulate_bankroll(*args, kelly_multiplier=0.5, seed=seed_from(3), workers=2)
+    assert first == pooled
+    assert [point["bet"] for point in first["trajectory"]][-1] == 40
+
+if __name__ == "__main__":
+    test_kelly_fraction_two_outcomes()
+    test_fixed_stake_matches_expected_value()
+    test_losing_slip_is_ruined()
+    test_replay_and_chunking()
+    print("\nAll tests completed!")
@@ -0,0 +1,69 @@
+"""
+Test script to verify the correlated slip simulation
+"""
+import numpy as np
+import pandas as pd
+from correlation import game_factor, leg_context, simulate_correlated_slip, slip_contexts
+from rng_service import seed_from
+from simulator import exact_slip
+
+TRIALS = 400_000
+
+def test_uncorrelated_matches_exact():
+    probs = [0.55, 0.6, 0.5]
+    contexts = [(1, 10, 100), (1, 11, 100), (2, 12, 200)]
+    result = simulate_correlated_slip(probs, contexts, ["over"] * 3, "Flex", TRIALS,
+                                      seed=seed_from(1),
+                                      correlations={"player": 0, "team": 0, "game": 0})
+    exact = exact_slip(probs, "Flex")
+    assert np.allclose(result["loss_probabilities"], exact["loss_probabilities"], atol=0.005)
+
+def test_same_player_legs_move_together():
+    probs = [0.55, 0.55]
+    same_player = [(1, 10, 100), (1, 10, 100)]
+    independent = 0.55 * 0.55
+    overs = simulate_correlated_slip(probs, same_player, ["over", "over"], trials=TRIALS,
+                                     seed=seed_from(2))
+    mixed = simulate_correlated_slip(probs, same_player, ["over", "under"], trials=TRIALS,
+                                     seed=seed_from(2))
+    assert overs["loss_probabilities"][0] > independent + 0.02
+    assert mixed["loss_probabilities"][0] < independent - 0.02
+    # Each leg keeps its own hit probability
+    expected_losses = np.dot(np.arange(3), overs["loss_probabilities"])
+    assert abs(expected_losses - 0.9) < 0.01
+
+def test_factor_cache_and_replay():
+    contexts = [(1, 10, 100), (1, 11, 100), (1, 12, 200)]
+    simulate_correlated_slip([0.5] * 3, contexts, ["over"] * 3, trials=1000, seed=seed_from(3))
+    hits = game_factor.cache_info().hits
+    again = simulate_correlated_slip([0.5] * 3, contexts, ["over"] * 3, trials=1000, seed=seed_from(3))
+    assert game_factor.cache_info().hits == hits + 1
+    first = simulate_correlated_slip([0.5] * 3, contexts, ["over"] * 3, trials=1000, seed=seed_from(3))
+    assert first["loss_probabilities"] == again["loss_probabilities"]
+    # Other players in another game, in the same shape, share the factor
+    other_game = [(2, 20, 300), (2, 21, 300), (2, 22, 400)]
+    other = simulate_correlated_slip([0.5] * 3, other_game, ["over"] * 3, trials=1000, seed=seed_from(3))
+    assert game_factor.cache_info().hits == hits + 3
+    assert other["loss_probabilities"] == first["loss_probabilities"]
+
+def test_leg_context_from_board():
+    board = pd.DataFrame({
+        "full_name": ["Dodo", "Dodo", "Dawy"],
+        "stat_name": ["period_1_2_goals", "period_1_2_shots_attempted", "kills_on_maps_1_2"],
+        "stat_value": [0.5, 0.5, 33.5],
+        "appearance_id": [7, 7, 8],
+        "match_id": [70, 70, 80],
+        "team_id": [1, 1, 2],
+    })
+    assert leg_context(board, "Dodo", "period_1_2_goals", 0.5) == (70, 7, 1)
+    legs = [{"player": "Dodo", "stat": "period_1_2_shots_attempted", "line": 0.5},
+            {"player": "Nobody", "stat": "pts", "line": 1}]
+    contexts, missing = slip_contexts(board, legs)
+    assert contexts[0] == (70, 7, 1) and missing == legs[1:]
+
+if __name__ == "__main__":
+    test_uncorrelated_matches_exact()
+    test_same_player_legs_move_together()
+    test_factor_cache_and_replay()
+    test_leg_context_from_board()
+    print("\nAll tests completed!")
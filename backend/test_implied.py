@@ -0,0 +1,53 @@
+"""
+Test script to verify implied probabilities and fair lines
+"""
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from implied import BASE_LEG_PROBABILITY, ImpliedTable, build_implied_table, implied_path
+from props_store import PropsStore
+
+def board():
+    return pd.DataFrame({
+        "full_name": ["A", "A", "B", "C", "C"],
+        "stat_name": ["pts", "pts", "reb", "ast", "ast"],
+        "stat_value": [20.5, 20.5, 8.5, 5.5, 5.5],
+        "choice": ["over", "under", "over", "over", "under"],
+        "payout_multiplier": [1.0, 1.0, 0.85, 1.06, 0.94],
+        "sport_id": ["NBA"] * 5,
+    })
+
+def test_probabilities_and_fair_lines():
+    table = ImpliedTable.from_frame(board())
+    assert len(table) == 3
+    # Even prices on both sides are a coin flip with the fair line on the line
+    assert np.isclose(table.probability("A", "pts", "20.5"), 0.5)
+    assert np.isclose(table.row("A", "pts", 20.5)["fair_line"], 20.5)
+    # A lone side keeps its own implied probability
+    assert np.isclose(table.probability("B", "reb", 8.5), BASE_LEG_PROBABILITY / 0.85)
+    # The side paying more is the less likely one, and the fair line moves away from it
+    over = table.probability("C", "ast", 5.5, "over")
+    assert over < 0.5 and np.isclose(over + table.probability("C", "ast", 5.5, "under"), 1)
+    assert table.row("C", "ast", 5.5)["fair_line"] < 5.5
+    assert table.probability("Nobody", "pts", 1) is None
+    legs = table.candidate_legs()
+    assert len(legs) == 6 and set(legs["pick"]) == {"over", "under"}
+
+def test_stored_next_to_board():
+    folder = tempfile.mkdtemp()
+    csv_path = os.path.join(folder, "underdog_props.csv")
+    board().to_csv(csv_path, index=False)
+    store = PropsStore(csv_path)
+    store.reload()
+    assert os.path.exists(implied_path(csv_path))
+    reloaded = PropsStore(csv_path)
+    reloaded.reload()
+    stored, built = reloaded.current.implied.frame, build_implied_table(board())
+    assert np.allclose(stored["over_probability"], built["over_probability"])
+    assert reloaded.current.implied.probability("C", "ast", 5.5) == store.current.implied.probability("C", "ast", 5.5)
+
+if __name__ == "__main__":
+    test_probabilities_and_fair_lines()
+    test_stored_next_to_board()
+    print("\nAll tests completed!")
@@ -0,0 +1,101 @@
+"""
+Test script to verify the line movement history
+"""
+import tempfile
+import numpy as np
+import pandas as pd
+import line_history
+import props_columnar
+from line_history import LineHistory, board_state, diff_states
+
+def board(lines, multipliers=None):
+    n = len(lines)
+    return pd.DataFrame({
+        "full_name": [f"Player {i}" for i in range(n)],
+        "sport_id": ["NBA"] * n,
+        "appearance_id": [f"app-{i}" for i in range(n)],
+        "stat_name": ["points"] * n,
+        "stat_value": lines,
+        "choice": ["over"] * n,
+        "payout_multiplier": multipliers if multipliers is not None else [1.0] * n,
+    })
+
+def test_diff_states():
+    previous = board_state(board([10.5, 20.5, 30.5]))
+    current = board_state(board([10.5, 21.5, 30.5, 40.5], [1.0, 1.0, 1.06, 1.0]).iloc[1:])
+    events = diff_states(previous, current, 60).set_index("appearance_id")
+    assert sorted(events.index) == ["app-0", "app-1", "app-2", "app-3"]
+    assert events.loc["app-1", "previous_line"] == 20.5 and events.loc["app-1", "line"] == 21.5
+    assert events.loc["app-2", "multiplier"] == 1.06 and events.loc["app-2", "line"] == 30.5
+    assert np.isnan(events.loc["app-3", "previous_line"]) and events.loc["app-3", "line"] == 40.5
+    assert np.isnan(events.loc["app-0", "line"]) and events.loc["app-0", "player"] == "Player 0"
+    assert (events["scraped_at"] == 60).all()
+    assert len(diff_states(current, current, 120)) == 0
+
+def test_record_and_query():
+    history = LineHistory(tempfile.mkdtemp())
+    assert history.record(board([10.5, 20.5]), scraped_at=0)["added"] == 2
+    assert history.record(board([10.5, 20.5]), scraped_at=300)["changes"] == 0
+    history.record(board([11.5, 20.5]), scraped_at=600)
+    history.record(board([12.5, 19.5]), scraped_at=900)
+    assert len(history.segments()) == 3
+
+    events = history.line_history("Player 0", "points")
+    assert events["line"].tolist() == [10.5, 11.5, 12.5]
+    assert history.line_history("Player 0", since=600)["line"].tolist() == [12.5]
+    assert history.line_history("Nobody").empty
+
+    movers = history.movers(since=300)
+    assert movers["player"].tolist() == ["Player 0", "Player 1"]
+    assert movers["change"].tolist() == [2.0, -1.0] and movers["moves"].tolist() == [2, 1]
+    assert history.movers(since=600, until=600).empty
+
+def test_compaction_keeps_events():
+    line_history.COMPACT_FANOUT, fanout = 4, line_history.COMPACT_FANOUT
+    try:
+        history = LineHistory(tempfile.mkdtemp())
+        for scrape in range(18):
+            history.record(board([10.5 + scrape, 20.5]), scraped_at=scrape * 300)
+        assert [(first, last) for first, last, _ in history.segments()] == [(1, 16), (17, 17), (18, 18)]
+        assert history.line_history("Player 0")["line"].tolist() == [10.5 + s for s in range(18)]
+        assert history.movers(since=0)["change"].tolist() == [17.0]
+    finally:
+        line_history.COMPACT_FANOUT = fanout
+
+def test_reader_drops_merged_segments():
+    # The API reads the history the scraper writes, with its own LineHistory
+    line_history.COMPACT_FANOUT, fanout = 2, line_history.COMPACT_FANOUT
+    try:
+        directory = tempfile.mkdtemp()
+        writer, reader = LineHistory(directory), LineHistory(directory)
+        for scrape in range(8):
+            writer.record(board([10.5 + scrape]), scraped_at=scrape * 300)
+            assert len(reader.events()) == scrape + 1
+        assert len(writer.segments()) == 1
+        assert list(reader._frames) == [path for _, _, path in writer.segments()]
+    finally:
+        line_history.COMPACT_FANOUT = fanout
+
+def test_compaction_without_memory_map():
+    # As on Windows: segments are read into memory, so merging can remove them
+    line_history.COMPACT_FANOUT, fanout = 2, line_history.COMPACT_FANOUT
+    props_columnar.MEMORY_MAP, memory_map = False, props_columnar.MEMORY_MAP
+    try:
+        history = LineHistory(tempfile.mkdtemp())
+        for scrape in range(5):
+            history.record(board([10.5 + scrape]), scraped_at=scrape * 300)
+            # Queried between scrapes, so the merged segments were loaded
+            assert len(history.events()) == scrape + 1
+        assert [(first, last) for first, last, _ in history.segments()] == [(1, 4), (5, 5)]
+        assert history.line_history("Player 0")["line"].tolist() == [10.5 + s for s in range(5)]
+    finally:
+        line_history.COMPACT_FANOUT = fanout
+        props_columnar.MEMORY_MAP = memory_map
+
+if __name__ == "__main__":
+    test_diff_states()
+    test_record_and_query()
+    test_compaction_keeps_events()
+    test_reader_drops_merged_segments()
+    test_compaction_without_memory_map()
+    print("\nAll tests completed!")
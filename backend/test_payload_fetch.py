@@ -0,0 +1,84 @@
+"""
+Test script to verify conditional, compressed and retried payload fetches
+"""
+import json
+import socket
+from bench_scraper import make_payload, serve_payload
+from payload_fetch import FetchError, PayloadFetcher
+
+BODY = json.dumps(make_payload(200)).encode("utf-8")
+
+def read_all(chunks):
+    return b"".join(chunks)
+
+def fetcher(url, **kwargs):
+    waits = []
+    kwargs.setdefault("retries", 2)
+    return PayloadFetcher(url, {"Accept": "application/json"}, sleep=waits.append, **kwargs), waits
+
+def test_compressed_and_conditional():
+    with serve_payload(BODY) as stand_in:
+        client, _ = fetcher(stand_in.url)
+        changed, body = client.fetch(read_all)
+        assert changed and body == BODY
+        metrics = client.last_metrics
+        assert metrics["status"] == 200 and metrics["encoding"] == "gzip"
+        assert metrics["bytes"] == len(BODY) and 0 < metrics["wire_bytes"] < len(BODY)
+
+        # Same board: the server answers 304 and nothing is consumed
+        consumed = []
+        assert client.fetch(consumed.append) == (False, None)
+        assert stand_in.requests[-1]["If-None-Match"] == client.etag and not consumed
+        assert client.last_metrics["status"] == 304
+
+        stand_in.body = BODY.replace(b"First1", b"Frist1")
+        changed, body = client.fetch(read_all)
+        assert changed and body == stand_in.body
+
+def test_unchanged_body_without_validators():
+    with serve_payload(BODY, etag=False, compress=False) as stand_in:
+        client, _ = fetcher(stand_in.url)
+        assert client.fetch(read_all)[0]
+        assert client.fetch(read_all) == (False, None)
+        assert "If-None-Match" not in stand_in.requests[-1]
+        assert client.last_metrics["encoding"] is None
+        client.forget()
+        assert client.fetch(read_all)[0]
+
+def test_retries():
+    with serve_payload(BODY) as stand_in:
+        client, waits = fetcher(stand_in.url)
+        stand_in.fail_next = 2
+        assert client.fetch(read_all)[0]
+        assert client.last_metrics["attempts"] == 3 and len(waits) == 2
+        stand_in.fail_next = 3
+        try:
+            client.fetch(read_all)
+            assert False, "fetch should fail after the retries"
+        except FetchError:
+            pass
+        assert client.last_metrics["attempts"] == 3 and client.last_metrics["error"]
+
+    # Nothing listening on the port
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    client, waits = fetcher(f"http://127.0.0.1:{port}/", retries=1)
+    try:
+        client.fetch(read_all)
+        assert False, "fetch should fail"
+    except FetchError:
+        assert len(waits) == 1
+
+def test_backoff_is_jittered_and_capped():
+    client, _ = fetcher("http://127.0.0.1:1/", backoff_base=1.0, backoff_cap=4.0)
+    waits = [client.backoff(attempt) for attempt in range(1, 10) for _ in range(20)]
+    assert all(0 <= w <= 4.0 for w in waits) and len(set(waits)) > 1
+    assert client.backoff(1, retry_after=60) == 4.0
+
+if __name__ == "__main__":
+    test_compressed_and_conditional()
+    test_unchanged_body_without_validators()
+    test_retries()
+    test_backoff_is_jittered_and_capped()
+    print("\nAll tests completed!")
@@ -0,0 +1,59 @@
+"""
+Test script to verify the streaming payload parser
+"""
+import json
+import pandas as pd
+from bench_scraper import board_csv, make_payload, serve_payload
+from payload_stream import read_tables
+from underdog_scraper import UnderdogScraper
+
+def chunked(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+def test_read_tables_matches_dataframe():
+    payload = {
+        "games": [{"id": 1, "title": "A @ B"}],
+        "players": [{"id": "p1", "first_name": "Zoë", "rank": 1234567},
+                    {"id": "p2", "last_name": "Ødegaard", "rank": None},
+                    {"id": "p3", "first_name": "Al", "rank": 2.5e-3}],
+        "meta": {"count": 3, "tags": ["a", "b"]},
+        "appearances": [],
+        "version": 7,
+    }
+    for body in (json.dumps(payload).encode("utf-8"),
+                 json.dumps(payload, indent=2, ensure_ascii=False).encode("utf-8")):
+        # Chunk sizes that split numbers, keys and multi-byte characters
+        for size in (1, 3, 7, 64, len(body)):
+            tables = read_tables(chunked(body, size), tables=("players", "appearances", "missing"))
+            pd.testing.assert_frame_equal(tables["players"], pd.DataFrame(payload["players"]))
+            assert tables["appearances"].empty and tables["missing"].empty
+
+def test_transform_and_errors():
+    body = b'{"rows": [{"a": 1, "b": {"c": 2}}, {"a": 2, "b": {"c": 3}}]}'
+    tables = read_tables(chunked(body, 5), tables=("rows",), transforms={"rows": lambda r: {"a": r["a"]}})
+    assert list(tables["rows"].columns) == ["a"] and tables["rows"]["a"].tolist() == [1, 2]
+    for broken in (b'{"rows": [{"a": 1}', b'["rows"]', b'{"rows": [{"a": 1} {"a": 2}]}'):
+        try:
+            read_tables(chunked(broken, 4), tables=("rows",))
+            assert False, f"parsed {broken!r}"
+        except ValueError:
+            pass
+
+def test_stream_data_from_local_server():
+    scraper = UnderdogScraper()
+    payload = make_payload(400)
+    body = json.dumps(payload).encode("utf-8")
+    with serve_payload(body) as stand_in:
+        scraper.fetcher.url = stand_in.url
+        streamed = scraper.stream_data()
+    loaded = scraper.combine_data(json.loads(body))
+    pd.testing.assert_frame_equal(streamed[0], loaded[0])
+    pd.testing.assert_frame_equal(streamed[1], loaded[1])
+    assert board_csv(scraper, scraper.process_data(*streamed)) == \
+        board_csv(scraper, scraper.process_data(*loaded))
+
+if __name__ == "__main__":
+    test_read_tables_matches_dataframe()
+    test_transform_and_errors()
+    test_stream_data_from_local_server()
+    print("\nAll tests completed!")
@@ -0,0 +1,41 @@
+"""
+Test script to verify the payout tables
+"""
+import numpy as np
+from payouts import batch_payouts, payout_multiplier, payout_multipliers, payout_tables_json
+
+def test_powerplay_table():
+    expected = {1: 1.5, 2: 3, 3: 6, 4: 10, 5: 20, 6: 35, 7: 65, 8: 120}
+    for n, multiplier in expected.items():
+        assert payout_multiplier("PowerPlay", n) == multiplier
+        assert payout_multiplier("PowerPlay", n, losses=1) == 0
+    assert payout_multiplier("PowerPlay", 9) == 0
+
+def test_flex_table():
+    assert payout_multiplier("Flex", 2) == 0
+    assert payout_multiplier("flex", 3, 1) == 1
+    assert payout_multiplier("Flex", 5, 2) == 0
+    assert payout_multiplier("Flex", 6, 2) == 0.25
+    assert payout_multiplier("Flex", 8, 0) == 80
+    assert payout_multiplier("Flex", 8, 3) == 0
+
+def test_vectorized_matches_scalar():
+    n = np.repeat(np.arange(-1, 10), 11)
+    losses = np.tile(np.arange(-1, 10), 11)
+    for flex, mode in [(False, "PowerPlay"), (True, "Flex")]:
+        expected = [payout_multiplier(mode, a, b) for a, b in zip(n, losses)]
+        assert np.array_equal(payout_multipliers(n, losses, flex), expected)
+    stakes = batch_payouts([10, 10], [8, 6], [0, 2], [False, True])
+    assert stakes.tolist() == [1200, 2.5]
+
+def test_tables_json():
+    tables = payout_tables_json()
+    assert tables["PowerPlay"][4][0] == 10
+    assert tables["Flex"][7][1] == 2.75
+
+if __name__ == "__main__":
+    test_powerplay_table()
+    test_flex_table()
+    test_vectorized_matches_scalar()
+    test_tables_json()
+    print("\nAll tests completed!")
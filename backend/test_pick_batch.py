@@ -0,0 +1,59 @@
+"""
+Test script to verify batch slip grading
+"""
+import numpy as np
+from pick_batch import grade_batch, history_records, slip_error, slip_results
+from rng_service import generator, seed_from
+
+BOARD = {("A", "pts", 20.5), ("B", "reb", 8.5), ("C", "ast", 5.5), ("D", "pts", 30.5)}
+
+def pick(player, stat, value, side="OVER"):
+    return {"player": player, "stat": stat, "value": str(value), "pick": side}
+
+def test_slip_validation():
+    assert slip_error({"picks": [pick("A", "pts", 20.5), pick("B", "reb", 8.5)]}, BOARD) is None
+    assert "not on the board" in slip_error({"picks": [pick("A", "pts", 21.5)]}, BOARD)
+    assert "more than once" in slip_error(
+        {"picks": [pick("A", "pts", 20.5), pick("A", "pts", 20.5, "UNDER")]}, BOARD)
+    assert "Flex" in slip_error({"picks": [pick("A", "pts", 20.5)], "mode": "Flex"}, BOARD)
+    assert slip_error({"picks": []}, BOARD) is not None
+    for bet_amount in ("nan", float("inf"), "-inf", "1e400"):
+        assert "finite" in slip_error({"picks": [pick("A", "pts", 20.5)], "bet_amount": bet_amount}, BOARD)
+    graded = grade_batch([{"picks": [pick("A", "pts", 20.5)], "bet_amount": "nan"},
+                          {"picks": [pick("B", "reb", 8.5)], "bet_amount": 5}], BOARD, seed_from(1), balance=10.0)
+    assert graded["accepted"].tolist() == [False, True] and np.isfinite(graded["stake"]).all()
+
+def test_grade_batch_and_balance():
+    slips = [
+        {"picks": [pick("A", "pts", 20.5), pick("B", "reb", 8.5)], "bet_amount": 400},
+        {"picks": [pick("A", "pts", 21.5)], "bet_amount": 10},
+        {"picks": [pick("A", "pts", 20.5), pick("B", "reb", 8.5), pick("C", "ast", 5.5)],
+         "bet_amount": 400, "mode": "Flex"},
+        {"picks": [pick("D", "pts", 30.5)], "bet_amount": 400},
+    ]
+    seed = seed_from(11)
+    graded = grade_batch(slips, BOARD, seed, balance=1000)
+    assert graded["accepted"].tolist() == [True, False, True, False]
+    assert graded["errors"][3] == "Insufficient balance"
+    draws = generator(seed).integers(2, size=4).astype(bool)
+    assert graded["win"].tolist() == (draws & graded["accepted"]).tolist()
+    expected = np.array([400 * 3, 0, 400 * 3, 0]) * graded["win"]
+    assert np.allclose(graded["payout"], expected)
+
+    records = history_records(slips, graded, seed)
+    assert [r["batch_index"] for r in records] == [0, 2]
+    results = slip_results(slips, graded)
+    assert results[1]["success"] is False and "board" in results[1]["error"]
+
+def test_results_mode_leaves_slips_open():
+    slips = [{"picks": [pick("A", "pts", 20.5)], "bet_amount": 5}]
+    graded = grade_batch(slips, BOARD, seed_from(1), settle="results", balance=100)
+    assert graded["payout"].sum() == 0 and graded["stake"].sum() == 5
+    record = history_records(slips, graded, seed_from(1), settle="results")[0]
+    assert record["is_completed"] is False and record["result"] == "pending"
+
+if __name__ == "__main__":
+    test_slip_validation()
+    test_grade_batch_and_balance()
+    test_results_mode_leaves_slips_open()
+    print("\nAll tests completed!")
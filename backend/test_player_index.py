@@ -0,0 +1,40 @@
+"""
+Test script to verify the player name index
+"""
+import pandas as pd
+from pick_player_props import find_player_props
+from player_index import PlayerIndex
+
+def make_board():
+    return pd.DataFrame({
+        "full_name": ["Stephen Curry", "Seth Curry", "Nikola Jokić", None, "Stephen Curry", " Dodo"],
+        "stat_name": ["points", "points", "assists", "points", "rebounds", "shots"],
+    })
+
+def test_rows_match_full_scan():
+    df = make_board()
+    index = PlayerIndex.from_frame(df)
+    for query in ["curry", "Stephen", "ph", "do", "nobody", "seth curry"]:
+        scanned = find_player_props(df, query)
+        indexed = find_player_props(df, query, index)
+        assert list(indexed.index) == list(scanned.index), query
+
+def test_accents_are_ignored():
+    index = PlayerIndex.from_frame(make_board())
+    assert index.find_names("jokic") == ["Nikola Jokić"]
+
+def test_autocomplete_ranking():
+    index = PlayerIndex.from_frame(make_board())
+    results = index.autocomplete("curry", limit=5)
+    # Word-prefix matches, player with more props first
+    assert [r["player"] for r in results] == ["Stephen Curry", "Seth Curry"]
+    assert results[0]["props"] == 2
+    assert index.autocomplete("seth curry")[0]["player"] == "Seth Curry"
+    assert index.autocomplete("s", limit=1) == [{"player": "Stephen Curry", "props": 2}]
+    assert index.autocomplete("urr", limit=5)[0]["player"] == "Stephen Curry"
+
+if __name__ == "__main__":
+    test_rows_match_full_scan()
+    test_accents_are_ignored()
+    test_autocomplete_ranking()
+    print("\nAll tests completed!")
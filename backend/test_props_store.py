@@ -0,0 +1,107 @@
+"""
+Test script to verify props snapshot loading and hot reload
+"""
+import os
+import tempfile
+import pandas as pd
+from props_columnar import columnar_path, read_columnar, write_columnar
+from props_store import PropsStore, partition_path
+
+def write_board(path, players):
+    pd.DataFrame({
+        "full_name": players,
+        "stat_name": ["points"] * len(players),
+        "stat_value": [10.5] * len(players),
+        "sport_id": ["NBA"] * len(players),
+    }).to_csv(path, index=False)
+
+def test_reload_swaps_snapshot():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "underdog_props.csv")
+        store = PropsStore(path)
+        assert store.current.df is None
+        assert not store.reload()
+
+        write_board(path, ["A Player", "B Player"])
+        assert store.reload()
+        first = store.current
+        assert first.row_count == 2
+        assert len(first.formatted_props) == 2
+
+        # Unchanged file is not reloaded
+        assert not store.reload()
+        assert store.current is first
+
+        write_board(path, ["A Player", "B Player", "C Player"])
+        assert store.reload()
+        assert store.current.row_count == 3
+        assert store.current.version != first.version
+        # The old snapshot is untouched for readers still holding it
+        assert first.row_count == 2
+        assert store.stats()["reload_count"] == 2
+
+def test_poll_waits_for_stable_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "underdog_props.csv")
+        write_board(path, ["A Player"])
+        store = PropsStore(path)
+        assert not store.poll()
+        assert store.poll()
+        assert store.current.row_count == 1
+
+def test_columnar_snapshot_preferred_over_csv():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "underdog_props.csv")
+        write_board(path, ["A Player", None])
+        df = pd.read_csv(path)
+        write_columnar(df, columnar_path(path))
+
+        loaded = read_columnar(columnar_path(path))
+        assert list(loaded.columns) == list(df.columns)
+        assert loaded["stat_value"].dtype == df["stat_value"].dtype
+        assert loaded["full_name"].iloc[0] == "A Player"
+        assert pd.isna(loaded["full_name"].iloc[1])
+
+        store = PropsStore(path)
+        assert store.reload()
+        assert store.current.source == columnar_path(path)
+        assert store.current.formatted_props[1]["player"] == "Unknown Player"
+
+def test_partitions_reload_independently():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "underdog_props.csv")
+        def write_partition(sport, players):
+            os.makedirs(os.path.dirname(partition_path(path, sport)), exist_ok=True)
+            write_columnar(pd.DataFrame({
+                "full_name": players,
+                "stat_name": ["points"] * len(players),
+                "stat_value": [10.5] * len(players),
+                "sport_id": [sport] * len(players),
+            }), partition_path(path, sport))
+
+        store = PropsStore(path)
+        assert store.reload_partitions() == [] and store.partition("NBA") is None
+        write_partition("NBA", ["A Player", "B Player"])
+        write_partition("NFL", ["C Player"])
+        assert store.reload_partitions() == ["NBA", "NFL"]
+        nfl = store.partition("nfl")
+        assert store.partition("NBA").row_count == 2 and nfl.row_count == 1
+        assert store.reload_partitions() == []
+
+        # Only the partition that changed is reloaded
+        write_partition("NBA", ["A Player", "B Player", "D Player"])
+        assert store.reload_partitions() == ["NBA"]
+        assert store.partition("nba").row_count == 3 and store.partition("NFL") is nfl
+        assert sorted(store.stats()["partitions"]) == ["nba", "nfl"]
+
+        os.remove(partition_path(path, "NFL"))
+        assert store.reload_partitions() == ["NFL"] and store.partition("NFL") is None
+        # The whole board is separate
+        assert store.current.df is None
+
+if __name__ == "__main__":
+    test_reload_swaps_snapshot()
+    test_poll_waits_for_stable_file()
+    test_columnar_snapshot_preferred_over_csv()
+    test_partitions_reload_independently()
+    print("\nAll tests completed!")
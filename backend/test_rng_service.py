@@ -0,0 +1,46 @@
+"""
+Test script to verify the seeded random streams
+"""
+import json
+import numpy as np
+from rng_service import coin_flip, generator, new_seed, seed_from, seed_sequence, spawn_seeds
+from serialization import dumps
+from simulator import simulate_slip
+
+def test_replay_from_stored_record():
+    seed = new_seed()
+    stored = json.loads(dumps({"seed": seed}))["seed"]
+    first = [coin_flip(generator(seed)) for _ in range(3)]
+    assert first == [coin_flip(generator(stored)) for _ in range(3)]
+    assert np.array_equal(generator(seed).random(100), generator(stored).random(100))
+
+def test_spawned_streams_match_numpy():
+    seed = seed_from(12345)
+    children = seed_sequence(seed).spawn(4)
+    for record, child in zip(spawn_seeds(seed, 4), children):
+        expected = np.random.Generator(np.random.PCG64(child)).random(10)
+        assert np.array_equal(generator(record).random(10), expected)
+    # Children differ from each other and from the parent
+    draws = [generator(r).random() for r in [seed] + spawn_seeds(seed, 4)]
+    assert len(set(draws)) == 5
+
+def test_seed_from_accepts_ints_hex_and_records():
+    seed = seed_from(255)
+    assert seed == seed_from("ff") == seed_from(seed)
+
+def test_sharded_simulation_replays_exactly():
+    probs = [0.55, 0.6, 0.5, 0.52, 0.58]
+    seed = seed_from(7)
+    serial = simulate_slip(probs, "Flex", trials=1_000_000, seed=seed)
+    pooled = simulate_slip(probs, "Flex", trials=1_000_000, seed=seed, workers=2)
+    assert serial["loss_probabilities"] == pooled["loss_probabilities"]
+    assert serial["seed"] == seed
+    other = simulate_slip(probs, "Flex", trials=1_000_000, seed=seed_from(8))
+    assert other["loss_probabilities"] != serial["loss_probabilities"]
+
+if __name__ == "__main__":
+    test_replay_from_stored_record()
+    test_spawned_streams_match_numpy()
+    test_seed_from_accepts_ints_hex_and_records()
+    test_sharded_simulation_replays_exactly()
+    print("\nAll tests completed!")
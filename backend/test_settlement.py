@@ -0,0 +1,130 @@
+"""
+Test script to verify slip settlement against actual results
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import user_db
+from settlement import ResultIndex, grade_slips, settle, settle_open_slips
+
+RESULTS = ResultIndex([
+    {"player": "Dodo", "stat": "period_1_2_goals", "actual": 1},
+    {"player": "Dodo", "stat": "period_1_2_shots_attempted", "actual": 0},
+    {"player": "Dawy", "stat": "kills_on_maps_1_2", "actual": 33.5},
+    {"player": "Davinchi", "stat": "period_1_2_goals", "actual": 2},
+])
+
+def slip(picks, mode="PowerPlay", bet=10.0):
+    return {"picks": picks, "bet_amount": bet, "mode": mode, "result": "pending",
+            "payout": None, "is_completed": False}
+
+def leg(player, stat, line, pick):
+    return {"player": player, "stat": stat, "value": str(line), "pick": pick}
+
+def test_grading():
+    slips = [
+        # Both hit: 2-pick PowerPlay pays 3x
+        slip([leg("Dodo", "period_1_2_goals", 0.5, "OVER"),
+              leg("Davinchi", "period_1_2_goals", 0.5, "OVER")]),
+        # One miss out of three on Flex pays 1x
+        slip([leg("dodo", "period_1_2_goals", 0.5, "over"),
+              leg("Dodo", "period_1_2_shots_attempted", 0.5, "over"),
+              leg("Davinchi", "period_1_2_goals", 0.5, "over")], mode="Flex"),
+        # Push drops the leg, leaving a 2-pick PowerPlay win
+        slip([leg("Dawy", "kills_on_maps_1_2", 33.5, "over"),
+              leg("Dodo", "period_1_2_shots_attempted", 0.5, "under"),
+              leg("Dodo", "period_1_2_goals", 0.5, "over")]),
+        # No result yet for one leg
+        slip([leg("Dodo", "period_1_2_goals", 0.5, "over"), leg("Nobody", "pts", 10.5, "over")]),
+    ]
+    grades = grade_slips(slips, RESULTS)
+    assert grades["settled"].tolist() == [True, True, True, False]
+    assert grades["losses"][:3].tolist() == [0, 1, 0]
+    assert grades["payout"][:3].tolist() == [30.0, 10.0, 30.0]
+
+def test_settle_in_one_transaction():
+    path = tempfile.mktemp(suffix=".json")
+    original = user_db.DB_FILE
+    user_db.DB_FILE = path
+    try:
+        user_db.save_db({"users": {"a": {"balance": 990.0, "picks_history": [
+            slip([leg("Dodo", "period_1_2_goals", 0.5, "over"),
+                  leg("Davinchi", "period_1_2_goals", 2.5, "over")]),
+            {"picks": [], "bet_amount": 5, "mode": "PowerPlay", "result": "win", "payout": 10,
+             "is_completed": True},
+        ]}, "b": {"balance": 500.0, "picks_history": [
+            slip([leg("Dodo", "period_1_2_goals", 0.5, "over"),
+                  leg("Davinchi", "period_1_2_goals", 0.5, "over")], bet=20.0),
+        ]}}})
+        summary = settle(RESULTS)
+        assert summary["settled"] == 2 and summary["paid_out"] == 60.0
+        db = user_db.load_db()
+        assert db["users"]["a"]["balance"] == 990.0
+        assert db["users"]["b"]["balance"] == 560.0
+        record = db["users"]["a"]["picks_history"][0]
+        assert record["is_completed"] and record["result"] == "loss"
+        assert [p["result"] for p in record["picks"]] == ["hit", "miss"]
+        # Nothing left open, so a second run changes nothing
+        assert settle_open_slips(db, RESULTS)["open_slips"] == 0
+    finally:
+        user_db.DB_FILE = original
+        if os.path.exists(path):
+            os.remove(path)
+
+def test_settlement_and_api_writes_do_not_clobber():
+    # settlement.py runs in its own process; a pick saved by the API while it
+    # holds the database must land after it, not be overwritten by it
+    path = tempfile.mktemp(suffix=".json")
+    original = user_db.DB_FILE
+    user_db.DB_FILE = path
+    try:
+        user_db.save_db({"users": {"a": {"balance": 990.0, "picks_history": []}}})
+        settler = subprocess.Popen([sys.executable, "-c", (
+            "import sys, time, user_db\n"
+            "user_db.DB_FILE = sys.argv[1]\n"
+            "with user_db.transaction() as db_data:\n"
+            "    print('locked', flush=True)\n"
+            "    time.sleep(0.5)\n"
+            "    db_data['users']['a']['balance'] += 30.0\n"
+        ), path], stdout=subprocess.PIPE, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        assert settler.stdout.readline().strip() == "locked"
+        assert user_db.add_pick_to_history("a", slip([leg("Dodo", "period_1_2_goals", 0.5, "over")]))
+        assert settler.wait() == 0
+        user = user_db.load_db()["users"]["a"]
+        assert user["balance"] == 1020.0 and len(user["picks_history"]) == 1
+    finally:
+        user_db.DB_FILE = original
+        for leftover in (path, path + ".lock"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+def test_api_does_not_settle():
+    # Settlement credits balances, so it is only run as settlement.py, never over HTTP
+    import api
+    path = tempfile.mktemp(suffix=".json")
+    original = user_db.DB_FILE
+    user_db.DB_FILE = path
+    try:
+        user_db.save_db({"users": {"a": {"balance": 990.0, "picks_history": [
+            slip([leg("Dodo", "period_1_2_goals", 0.5, "over"),
+                  leg("Davinchi", "period_1_2_goals", 0.5, "over")]),
+        ]}}})
+        response = api.app.test_client().post("/api/picks/settle", json={"results": [
+            {"player": "Dodo", "stat": "period_1_2_goals", "actual": 1},
+            {"player": "Davinchi", "stat": "period_1_2_goals", "actual": 2},
+        ]})
+        assert response.status_code in (404, 405)
+        user = user_db.load_db()["users"]["a"]
+        assert user["balance"] == 990.0 and not user["picks_history"][0]["is_completed"]
+    finally:
+        user_db.DB_FILE = original
+        if os.path.exists(path):
+            os.remove(path)
+
+if __name__ == "__main__":
+    test_grading()
+    test_settle_in_one_transaction()
+    test_settlement_and_api_writes_do_not_clobber()
+    test_api_does_not_settle()
+    print("\nAll tests completed!")
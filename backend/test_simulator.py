@@ -0,0 +1,44 @@
+"""
+Test script to verify the slip simulators
+"""
+import itertools
+import numpy as np
+from payouts import payout_multiplier
+from simulator import evaluate_slips, exact_slip, loss_distributions, simulate_slip
+
+def brute_force_loss_distribution(probs):
+    dist = np.zeros(len(probs) + 1)
+    for outcome in itertools.product([True, False], repeat=len(probs)):
+        weight = np.prod([p if hit else 1 - p for p, hit in zip(probs, outcome)])
+        dist[outcome.count(False)] += weight
+    return dist
+
+def test_exact_matches_enumeration():
+    probs = [0.55, 0.6, 0.48, 0.7, 0.51]
+    assert np.allclose(loss_distributions(probs)[0], brute_force_loss_distribution(probs))
+
+def test_exact_matches_monte_carlo():
+    probs = [0.55, 0.6, 0.5, 0.52, 0.58, 0.57, 0.53, 0.56]
+    for mode in ("PowerPlay", "Flex"):
+        exact = exact_slip(probs, mode, stake=10)
+        simulated = simulate_slip(probs, mode, trials=1_000_000, stake=10,
+                                  rng=np.random.default_rng(7))
+        # Standard error of the mean is std / sqrt(trials)
+        tolerance = 5 * exact["std"] / np.sqrt(1_000_000)
+        assert abs(exact["expected_payout"] - simulated["expected_payout"]) < tolerance
+        assert np.allclose(exact["loss_probabilities"], simulated["loss_probabilities"], atol=0.005)
+        assert np.isclose(exact["variance"], simulated["variance"], rtol=0.05)
+
+def test_batch_evaluation_with_padding():
+    slips = [[0.6, 0.6, 0.6, 1.0], [0.5, 0.55, 0.6, 0.65]]
+    expected, variance, _ = evaluate_slips(slips, n_legs=[3, 4], flex=[True, False], stakes=[10, 5])
+    assert np.isclose(expected[0], exact_slip([0.6] * 3, "Flex", 10)["expected_payout"])
+    perfect = 0.5 * 0.55 * 0.6 * 0.65
+    assert np.isclose(expected[1], 5 * payout_multiplier("PowerPlay", 4) * perfect)
+    assert (variance >= 0).all()
+
+if __name__ == "__main__":
+    test_exact_matches_enumeration()
+    test_exact_matches_monte_carlo()
+    test_batch_evaluation_with_padding()
+    print("\nAll tests completed!")
@@ -0,0 +1,82 @@
+"""
+Test script to verify the optimal slip builder
+"""
+import itertools
+import numpy as np
+import pandas as pd
+from pick_player_props import board_keys
+from simulator import evaluate_slips
+from slip_builder import optimize_slips, prepare_candidates, split_board_legs
+
+def make_legs(n_props=12, seed=3):
+    rng = np.random.default_rng(seed)
+    legs = []
+    for i in range(n_props):
+        p = rng.uniform(0.4, 0.62)
+        legs.append({"player": f"Player {i % 5}", "stat": f"stat{i}", "line": 10.5 + i,
+                     "pick": "over", "probability": p})
+        legs.append({"player": f"Player {i % 5}", "stat": f"stat{i}", "line": 10.5 + i,
+                     "pick": "under", "probability": 1 - p - 0.04})
+    return legs
+
+def brute_force_best(legs, n_legs, flex):
+    candidates = prepare_candidates(legs)
+    probs = candidates["probability"].to_numpy()
+    keys = candidates["prop_key"].to_numpy()
+    combos = [c for c in itertools.combinations(range(len(probs)), n_legs)
+              if len(set(keys[list(c)])) == n_legs]
+    expected, variance, _ = evaluate_slips(probs[np.array(combos)], n_legs, flex)
+    return expected, variance
+
+def test_matches_brute_force():
+    legs = make_legs()
+    for mode, flex in (("PowerPlay", False), ("Flex", True)):
+        for n_legs in (2, 3, 5):
+            if flex and n_legs < 3:
+                continue
+            result = optimize_slips(legs, [mode], n_legs, n_legs, top_k=3, workers=1)
+            expected, _ = brute_force_best(legs, n_legs, flex)
+            best = np.sort(expected)[::-1][:3]
+            found = [slip["expected_payout"] for slip in result["slips"]]
+            assert np.allclose(found, best), (mode, n_legs, found, best)
+
+def test_slips_follow_the_rules():
+    result = optimize_slips(make_legs(), ["PowerPlay", "Flex"], top_k=10, workers=1)
+    assert len(result["slips"]) == 10
+    for slip in result["slips"]:
+        props = [(leg["player"], leg["stat"], leg["line"]) for leg in slip["legs"]]
+        assert 2 <= len(props) <= 8
+        # No duplicate props and never both sides of one
+        assert len(set(props)) == len(props)
+    evs = [slip["expected_payout"] for slip in result["slips"]]
+    assert evs == sorted(evs, reverse=True)
+
+def test_variance_cap():
+    legs = make_legs()
+    cap = 2.0
+    result = optimize_slips(legs, ["Flex"], 3, 3, top_k=3, max_variance=cap, workers=1)
+    expected, variance = brute_force_best(legs, 3, True)
+    best = np.sort(expected[variance <= cap])[::-1][:3]
+    assert all(slip["variance"] <= cap for slip in result["slips"])
+    assert np.allclose([slip["expected_payout"] for slip in result["slips"]], best)
+
+def test_process_pool_matches_inline():
+    legs = make_legs(40, seed=5)
+    inline = optimize_slips(legs, ["PowerPlay", "Flex"], top_k=5, workers=1)
+    pooled = optimize_slips(legs, ["PowerPlay", "Flex"], top_k=5, workers=2)
+    assert inline["slips"] == pooled["slips"]
+
+def test_split_board_legs():
+    board = pd.DataFrame({"player": ["A", "B"], "stat": ["pts", "reb"],
+                          "value": [20.5, 8.0], "sport": ["NBA", "NBA"]})
+    legs = [{"player": "A", "stat": "pts", "line": "20.5"}, {"player": "B", "stat": "reb", "line": 9}]
+    known, unknown = split_board_legs(board_keys(board), legs)
+    assert known == legs[:1] and unknown == legs[1:]
+
+if __name__ == "__main__":
+    test_matches_brute_force()
+    test_slips_follow_the_rules()
+    test_variance_cap()
+    test_process_pool_matches_inline()
+    test_split_board_legs()
+    print("\nAll tests completed!")
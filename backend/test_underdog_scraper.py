@@ -0,0 +1,176 @@
+"""
+Test script to verify the scraper's payload processing
+"""
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from bench_scraper import SUNDAY_WEIGHTS, board_csv, make_payload, process_data_original, serve_payload
+from pick_player_props import compact_props
+from props_columnar import columnar_path, read_columnar, write_columnar
+from props_store import PropsStore, partition_name, partition_path, partitions_path, signature_version, source_signature
+from underdog_scraper import ScrapeScheduler, UnderdogScraper, flatten_records, shard_pool
+
+def test_process_data_matches_original():
+    scraper = UnderdogScraper()
+    payload = make_payload(300)
+    lines = payload["over_under_lines"]
+    lines[3]["options"] = []
+    lines[5]["options"][0]["boost"] = {"multiplier": 1.5}
+    lines[8]["options"][-1].pop("selection_subheader")
+    frames = scraper.combine_data(payload)
+    original = process_data_original(scraper, *frames)
+    processed = scraper.process_data(*frames)
+    assert list(processed.columns) == list(original.columns)
+    assert board_csv(scraper, processed) == board_csv(scraper, original)
+    assert set(processed["choice"].dropna()) == {"over", "under"}
+
+def test_flatten_records():
+    flat = flatten_records([{"a": 1, "b": "x"}, {"a": 2, "b": "y"}])
+    assert list(flat.columns) == ["a", "b"] and flat["a"].tolist() == [1, 2]
+    nested = flatten_records([{"a": 1, "b": {"c": 2}}, {"a": 3, "b": {"c": 4}}])
+    assert list(nested.columns) == ["a", "b.c"]
+
+def test_columnar_round_trips_scraped_board():
+    scraper = UnderdogScraper()
+    board = scraper.filter_data(scraper.process_data(*scraper.combine_data(make_payload(60))))
+    # Lines and options both have an id, and the payload sends numbers as text
+    assert list(board.columns).count("id") == 2
+    assert not pd.api.types.is_numeric_dtype(board["stat_value"])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "underdog_props.csv")
+        board.to_csv(path, index=False)
+        write_columnar(board, columnar_path(path))
+        loaded = read_columnar(columnar_path(path))
+        from_csv = pd.read_csv(path)
+    assert list(loaded.columns) == list(board.columns)
+    for i, column in enumerate(board.columns):
+        if column == "id":
+            assert loaded.iloc[:, i].astype(object).equals(board.iloc[:, i].astype(object))
+    # Numbers come back as numbers, as they do from the CSV
+    for column in ("stat_value", "payout_multiplier", "non_discounted_stat_value"):
+        assert loaded[column].dtype == from_csv[column].dtype == np.float64, column
+        assert np.array_equal(loaded[column], from_csv[column], equal_nan=True)
+    assert loaded["full_name"].astype(object).equals(board["full_name"].astype(object))
+
+    compacted, report = compact_props(board)
+    assert list(compacted.columns) == list(board.columns) and len(report) == len(board.columns)
+    assert pd.api.types.is_float_dtype(compacted["stat_value"])
+
+def test_scrape_publishes_to_store():
+    payload = make_payload(50)
+    with tempfile.TemporaryDirectory() as tmp, serve_payload(json.dumps(payload).encode()) as stand_in:
+        path = os.path.join(tmp, "underdog_props.csv")
+        store = PropsStore(path, compact=True)
+        scraper = UnderdogScraper(path, store=store)
+        scraper.fetcher.url = stand_in.url
+        assert scraper.scrape()
+        published = store.current
+        assert store.reload_count == 1
+        assert published.version == signature_version(source_signature(path))
+        assert published.row_count == len(scraper.underdog_props)
+        # The pushed board holds what a store loading the files would
+        loaded = PropsStore(path, compact=True)
+        assert loaded.reload() and loaded.current.source == columnar_path(path)
+        assert list(published.df.columns) == list(loaded.current.df.columns)
+        assert published.df.astype(object).equals(loaded.current.df.astype(object))
+        assert published.formatted_props == loaded.current.formatted_props
+        # ... so the watcher leaves the files alone
+        assert not store.poll() and not store.poll() and not store.reload()
+        assert store.current is published
+
+        # 304: nothing processed or published
+        assert not scraper.scrape()
+        # A new body that processes to the same board is not published either
+        payload["games"] = [{"id": 1}]
+        stand_in.body = json.dumps(payload).encode()
+        assert not scraper.scrape()
+        assert store.current is published and store.reload_count == 1
+
+        payload["over_under_lines"][0]["options"][0]["payout_multiplier"] = "2.5"
+        stand_in.body = json.dumps(payload).encode()
+        assert scraper.scrape()
+        assert store.reload_count == 2 and store.current is not published
+
+def test_scheduler():
+    payload = make_payload(20)
+    with tempfile.TemporaryDirectory() as tmp, serve_payload(json.dumps(payload).encode()) as stand_in:
+        path = os.path.join(tmp, "underdog_props.csv")
+        store = PropsStore(path)
+        scraper = UnderdogScraper(path, store=store)
+        scraper.fetcher.url = stand_in.url
+        scraper.fetcher.retries = 0
+        scheduler = ScrapeScheduler(scraper, interval=0.05)
+        scheduler.start()
+        deadline = time.time() + 10
+        while scheduler.scrape_count < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        # A failing scrape is counted and the loop carries on
+        stand_in.fail_next = 1
+        count = scheduler.scrape_count
+        while scheduler.scrape_count < count + 3 and time.time() < deadline:
+            time.sleep(0.01)
+        scheduler.stop()
+        stats = scheduler.stats()
+        assert not stats["running"]
+        assert stats["changed_count"] == 1 and store.reload_count == 1
+        assert stats["error_count"] == 1 and stats["last_error"] is None
+        assert stats["scrape_count"] >= 6
+
+def test_process_by_sport():
+    payload = make_payload(400, sport_weights=SUNDAY_WEIGHTS)
+    lines = payload["over_under_lines"]
+    lines[3]["options"] = []
+    lines[5]["options"][0]["boost"] = 1.5
+    # A sport without lines and players without a sport
+    payload["players"].append(dict(payload["players"][0], id="no-lines", sport_id="CRICKET"))
+    payload["players"].append(dict(payload["players"][1], id="no-sport", sport_id=None))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "underdog_props.csv")
+        store = PropsStore(path)
+        scraper = UnderdogScraper(path, store=store)
+        frames = scraper.combine_data(payload)
+        one_pass = scraper.filter_data(scraper.process_data(*frames))
+        for workers in (1, 2):
+            scraper.pool = shard_pool({"shard_workers": workers})
+            assert (scraper.pool is None) == (workers == 1)
+            try:
+                scraper.remove_partitions()
+                board = scraper.process_by_sport(*frames)
+            finally:
+                if scraper.pool is not None:
+                    scraper.pool.shutdown()
+            assert list(board.columns) == list(one_pass.columns)
+            assert board.to_csv(index=False) == one_pass.to_csv(index=False)
+        scraper.pool = None
+
+        sports = set(one_pass["sport_id"].dropna()) | {None}
+        assert sorted(os.listdir(partitions_path(path))) == sorted(partition_name(s) + ".cols" for s in sports)
+        assert store.partition("cricket").row_count == 1
+        assert store.partition("NFL").row_count == (one_pass["sport_id"] == "NFL").sum()
+        assert set(scraper.partition_seconds) == sports
+
+        # Only the sport whose board changed is saved again, and a sport
+        # that left the board loses its partition
+        versions = {name: snapshot.version for name, snapshot in store.partitions.items()}
+        moved = one_pass.loc[one_pass["over_under_line_id"] == lines[0]["id"], "sport_id"].iloc[0]
+        lines[0]["options"][0]["payout_multiplier"] = "3.0"
+        payload["players"] = [player for player in payload["players"] if player["id"] != "no-lines"]
+        scraper.process_by_sport(*scraper.combine_data(payload))
+        changed = {name for name, snapshot in store.partitions.items() if snapshot.version != versions[name]}
+        assert changed == {moved.lower()}
+        assert store.partition("CRICKET") is None and not os.path.exists(partition_path(path, "CRICKET"))
+
+        scraper.remove_partitions()
+        assert not os.path.exists(partitions_path(path)) and not store.partitions
+
+if __name__ == "__main__":
+    test_process_data_matches_original()
+    test_flatten_records()
+    test_columnar_round_trips_scraped_board()
+    test_scrape_publishes_to_store()
+    test_scheduler()
+    test_process_by_sport()
+    print("\nAll tests completed!")
@@ -1,14 +1,210 @@
-import requests
 import pandas as pd
+import argparse
+import filecmp
 import json
 import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain
+import numpy as np
+from pandas.api.types import union_categoricals
+from props_columnar import columnar_path, read_columnar, write_columnar
+from pick_player_props import compact_props
+from line_history import LineHistory, history_path
+from payload_fetch import PayloadFetcher
+from payload_stream import read_tables
+from props_store import file_signature, partition_name, partition_path, partitions_path, source_signature
+
+DEFAULT_SCRAPE_INTERVAL = 300
+# Payload position of each board row's player, carried through per-sport processing
+SHARD_ROW = "_player_row"
+
+def flatten_records(records):
+    """Frame of a list of dicts, as pd.json_normalize builds it.
+
+    When every dict has the same flat keys (the usual options list) the
+    frame is built column by column; json_normalize would first copy every
+    dict.
+    """
+    keys = tuple(records[0]) if records else ()
+    if not keys or any(tuple(record) != keys for record in records):
+        return pd.json_normalize(records)
+    frame = pd.DataFrame({key: [record[key] for record in records] for key in keys})
+    for column in frame.columns:
+        if frame[column].dtype == object and any(isinstance(v, dict) for v in frame[column].tolist()):
+            return pd.json_normalize(records)
+    return frame
+
+def slim_line(line):
+    """Keep only the appearance_stat fields process_data reads from over_under.
+
+    The rest of over_under is dropped by filter_data anyway, and it is most
+    of the memory a line takes.
+    """
+    appearance_stat = line["over_under"]["appearance_stat"]
+    line["over_under"] = {"appearance_stat": {"appearance_id": appearance_stat["appearance_id"],
+                                              "stat": appearance_stat["stat"]}}
+    return line
+
+def csv_column_names(columns):
+    """Column names as read_csv gives them back: a repeated name becomes
+    name.1, name.2, ... (lines and their options both have an id)."""
+    counts = {}
+    names = list(columns)
+    for i, name in enumerate(names):
+        count = counts.get(name, 0)
+        renamed = name
+        while count:
+            counts[name] = count + 1
+            renamed = f"{name}.{count}"
+            # Skip suffixes the header already uses
+            count = count + 1 if renamed in columns else counts.get(renamed, 0)
+        names[i] = renamed
+        counts[renamed] = count + 1
+    return names
+
+def _lookup(ids, codes, wanted):
+    """codes of the first of ids equal to each wanted id, -1 where there is none."""
+    by_id = pd.Series(codes, index=pd.Index(ids, dtype=object))
+    by_id = by_id[~by_id.index.duplicated()]
+    return pd.Series(wanted, dtype=object).map(by_id).fillna(-1).to_numpy(np.int64)
+
+def shard_by_sport(players, appearances, over_under_lines):
+    """Split the payload tables by each player's sport_id.
+
+    An appearance goes with its player and a line with its appearance's
+    player, so processing the sports one by one gives the rows processing
+    the whole payload does (lines of unknown appearances are dropped by
+    process_data's merges either way). Players carry their payload
+    position in SHARD_ROW so the boards can be put back in payload order.
+    Returns {sport_id: (players, appearances, over_under_lines)}.
+    """
+    players = players.assign(**{SHARD_ROW: np.arange(len(players))})
+    codes, sports = pd.factorize(players["sport_id"])
+    # Players without a sport_id (code -1) share one shard
+    sports = list(sports)
+    if (codes == -1).any():
+        codes = np.where(codes == -1, len(sports), codes)
+        sports.append(None)
+    appearance_codes = _lookup(players["id"], codes, appearances["player_id"])
+    line_appearances = [over_under["appearance_stat"]["appearance_id"]
+                        for over_under in over_under_lines["over_under"].tolist()]
+    line_codes = _lookup(appearances["id"], appearance_codes, line_appearances)
+
+    return {sport: (players[codes == code], appearances[appearance_codes == code],
+                    over_under_lines[line_codes == code])
+            for code, sport in enumerate(sports)}
+
+def _concat_column(parts):
+    # Dictionary-encoded parts stay dictionary-encoded, when their
+    # dictionaries hold the same type (an empty one may not)
+    if (all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts)
+            and len({part.cat.categories.dtype for part in parts}) == 1):
+        return pd.Series(union_categoricals(parts))
+    return pd.concat(parts, ignore_index=True)
+
+def combine_shards(results):
+    """One board from per-sport (partition, payload rows, column names)
+    results, in payload order.
+
+    Each partition is a sport's board as read back from its file, under
+    csv_column_names; the board gets the column names back.
+    """
+    if not results:
+        return pd.DataFrame()
+    # The biggest board first, so its columns (usually all of them) set the order
+    results = sorted(results, key=lambda result: -len(result[0]))
+    frames = [frame for frame, _, _ in results]
+    names = {}
+    for frame, _, columns in results:
+        names.update(zip(frame.columns, columns))
+    # A column only some sports have (an option field, say) goes after the
+    # column it follows in those sports' boards
+    columns = list(frames[0].columns)
+    for frame in frames[1:]:
+        for i, column in enumerate(frame.columns):
+            if column not in columns:
+                columns.insert(columns.index(frame.columns[i - 1]) + 1 if i else 0, column)
+    board = pd.DataFrame({column: _concat_column([
+        frame[column] if column in frame.columns else pd.Series(np.nan, index=range(len(frame)))
+        for frame in frames]) for column in columns})
+    board.columns = [names[column] for column in columns]
+    rows = np.concatenate([rows for _, rows, _ in results])
+    return board.take(np.argsort(rows, kind="stable")).reset_index(drop=True)
+
+def shard_board(scraper, players, appearances, over_under_lines):
+    """(board, payload rows) of one sport's tables."""
+    board = scraper.filter_data(scraper.process_data(players, appearances, over_under_lines))
+    return board, board.pop(SHARD_ROW).to_numpy()
+
+def write_partition(csv_path, sport, board):
+    """Save one sport's board to its partition. Returns False, leaving the
+    file alone, when the partition already holds the same board."""
+    path = partition_path(csv_path, sport)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    compacted, _ = compact_props(board.set_axis(csv_column_names(board.columns), axis=1), report=False)
+    # The format is deterministic, so the same board gives the same bytes
+    new_path = path + ".new"
+    write_columnar(compacted, new_path)
+    if os.path.exists(path) and filecmp.cmp(new_path, path, shallow=False):
+        os.remove(new_path)
+        return False
+    os.replace(new_path, path)
+    return True
+
+def process_shard(scraper, sport, csv_path, tables):
+    """Process one sport's tables and save its partition next to csv_path.
+
+    Returns (sport, payload rows, column names, whether the partition
+    changed); the board itself is read back from the partition, which is
+    much cheaper than sending it back from a pool worker.
+    """
+    board, rows = shard_board(scraper, *tables)
+    return sport, rows, list(board.columns), write_partition(csv_path, sport, board)
+
+_shard_scraper = None
+
+def _process_shard(sport, csv_path, tables):
+    # Runs in a pool worker, with one scraper per worker for its processing methods
+    global _shard_scraper
+    if _shard_scraper is None:
+        _shard_scraper = UnderdogScraper()
+    return process_shard(_shard_scraper, sport, csv_path, tables)
+
+def shard_pool(config):
+    """Process pool for processing the board by sport, or None to process
+    it in one pass.
+
+    Create it once, from the scraper's own command line (under the
+    __main__ guard, which Windows needs to start workers), and shut it
+    down on exit. Without a pool of more than one worker processing by
+    sport is only slower, so that gets None too.
+    """
+    workers = config.get("shard_workers") or os.cpu_count() or 1
+    if not config.get("shard_by_sport", True) or workers < 2:
+        return None
+    return ProcessPoolExecutor(max_workers=workers)
 
 class UnderdogScraper:
-    def __init__(self):
+    def __init__(self, csv_path='underdog_props.csv', store=None, pool=None):
         self.config = None
         self.underdog_props = None
+        self.csv_path = csv_path
+        # A PropsStore in the same process (the API's) that each new board is
+        # published to directly
+        self.store = store
+        # The shard_pool the board is processed by sport in, if any. The API
+        # never passes one: forking it would copy its watcher and scheduler
+        # threads' state into every worker.
+        self.pool = pool
 
         self.load_config()
+        # Pooled session and the validators of the last board, kept between scrapes
+        self.fetcher = PayloadFetcher.from_config(self.config)
+        self.history = LineHistory(history_path(csv_path))
+        # Seconds into the last process_by_sport at which each sport was done
+        self.partition_seconds = {}
 
     def load_config(self):
         with open(
@@ -18,14 +214,21 @@ class UnderdogScraper:
             self.config = json.load(json_file)
 
     def fetch_data(self):
-        ud_pickem_response = requests.get(self.config["ud_pickem_url"], headers=self.config["headers"])
+        """The payload as a dict, or None if the board has not changed."""
+        changed, pickem_data = self.fetcher.fetch(lambda chunks: json.loads(b"".join(chunks)))
 
-        if ud_pickem_response.status_code != 200:
-            raise Exception("Request failed")
+        return pickem_data if changed else None
 
-        pickem_data = json.loads(ud_pickem_response.text)
+    def stream_data(self):
+        """players, appearances and over_under_lines frames parsed while the
+        body downloads (see payload_stream), without the payload as text or
+        as one dict. None if the board has not changed."""
+        changed, tables = self.fetcher.fetch(
+            lambda chunks: read_tables(chunks, transforms={"over_under_lines": slim_line}))
+        if not changed:
+            return None
 
-        return pickem_data
+        return tables["players"], tables["appearances"], tables["over_under_lines"]
 
     def combine_data(self, pickem_data):
         players = pd.DataFrame(pickem_data["players"])
@@ -43,26 +246,41 @@ class UnderdogScraper:
         return df
 
     def process_data(self, players, appearances, over_under_lines):
+        """One row per player appearance and line option.
+
+        Builds the same frame as exploding the options, json_normalize-ing
+        them and reading over_under row by row with apply, but in bulk: the
+        line columns are repeated once per option, all options become one
+        frame column by column, and the appearance_stat fields are read once
+        per line rather than once per option.
+        """
         players = players.rename(columns={"id": "player_id"})
         appearances = appearances.rename(columns={"id": "appearance_id"})
 
         player_appearances = players.merge(appearances, on=["player_id", "position_id", "team_id"], how="left")
 
         over_under_lines = over_under_lines.reset_index(drop=True)
-        over_under_lines_expanded = over_under_lines.explode("options")
-        
-        options_df = pd.json_normalize(over_under_lines_expanded["options"])
-        
-        over_under_lines_expanded = pd.concat([over_under_lines_expanded.drop("options", axis=1).reset_index(drop=True), 
-                                            options_df.reset_index(drop=True)], axis=1)
+        # An empty or missing options list still gives its line one row, as explode does
+        options = [o if isinstance(o, list) and o else [{}] for o in over_under_lines["options"].tolist()]
+        counts = np.fromiter(map(len, options), dtype=np.int64, count=len(options))
+        line_rows = np.repeat(np.arange(len(options)), counts)
+
+        options_df = flatten_records(list(chain.from_iterable(options)))
+        over_under_lines_expanded = pd.concat([over_under_lines.drop(columns="options").take(line_rows).reset_index(drop=True),
+                                               options_df], axis=1)
 
-        over_under_lines_expanded["appearance_id"] = over_under_lines_expanded["over_under"].apply(lambda x: x["appearance_stat"]["appearance_id"])
-        over_under_lines_expanded["stat_name"] = over_under_lines_expanded["over_under"].apply(lambda x: x["appearance_stat"]["stat"])
+        appearance_stats = [over_under["appearance_stat"] for over_under in over_under_lines["over_under"].tolist()]
+        appearance_ids = pd.Series([stat["appearance_id"] for stat in appearance_stats]).to_numpy()
+        stat_names = pd.Series([stat["stat"] for stat in appearance_stats]).to_numpy()
+        over_under_lines_expanded["appearance_id"] = appearance_ids[line_rows]
+        over_under_lines_expanded["stat_name"] = stat_names[line_rows]
 
         columns_to_remove = ['expires_at', 'live_event', 'live_event_stat']
         over_under_lines_expanded = over_under_lines_expanded.drop(columns=columns_to_remove, errors='ignore')
 
-        over_under_lines_expanded["choice"] = over_under_lines_expanded["choice"].map({"lower": "under", "higher": "over"}).fillna(over_under_lines_expanded["choice"])
+        # A board (or a sport's share of it) without lines has no options
+        if "choice" in over_under_lines_expanded.columns:
+            over_under_lines_expanded["choice"] = over_under_lines_expanded["choice"].replace({"lower": "under", "higher": "over"})
 
         underdog_props = player_appearances.merge(over_under_lines_expanded, on="appearance_id", how="left", suffixes=("", "_over_under"))
         underdog_props["full_name"] = underdog_props["first_name"] + " " + underdog_props["last_name"]
@@ -75,24 +293,239 @@ class UnderdogScraper:
         # df = df[df["sport_id"].isin(["MLB"])]
         df = df[df["status"] != "suspended"]
 
-        columns_to_remove = ['country', 'image_url', 'badges', 'lineup_status_id', 'match_id', 'match_type', 'over_under', 'rank', 'status']
+        columns_to_remove = ['country', 'image_url', 'badges', 'lineup_status_id', 'match_type', 'over_under', 'rank', 'status']
         df = df.drop(columns=columns_to_remove, errors='ignore')
         df = df.reset_index(drop=True)
 
         return df
 
     def scrape(self):
-        all_pickem_data = self.fetch_data()
-        players, appearances, over_under_lines = self.combine_data(all_pickem_data)
-        processed_props = self.process_data(players, appearances, over_under_lines)
-        self.underdog_props = self.filter_data(processed_props)
+        """Fetch, save and publish the board. Returns False when nothing
+        changed: the payload was the same as last time (304 or the same
+        body) or it processed to the same board."""
+        if self.config.get("stream_payload", True):
+            tables = self.stream_data()
+        else:
+            all_pickem_data = self.fetch_data()
+            tables = self.combine_data(all_pickem_data) if all_pickem_data is not None else None
+        if tables is None:
+            print("Board unchanged since the last scrape, skipping processing")
+            return False
+        players, appearances, over_under_lines = tables
+        try:
+            if self.pool is not None:
+                board = self.process_by_sport(players, appearances, over_under_lines)
+            else:
+                processed_props = self.process_data(players, appearances, over_under_lines)
+                board = self.filter_data(processed_props)
+                self.remove_partitions()
+            if self.underdog_props is not None and board.equals(self.underdog_props):
+                print("Payload changed but the board did not, skipping publication")
+                return False
+            self.save(board)
+        except Exception:
+            # Don't let the next scrape skip a board that was never saved
+            self.fetcher.forget()
+            raise
+        self.underdog_props = board
+        return True
+
+    def process_by_sport(self, players, appearances, over_under_lines):
+        """The filtered board, processed one sport at a time.
+
+        Sports run in the scraper's pool when it has one (see shard_pool),
+        one after another otherwise, smallest first. Each saves its sport's
+        partition, and the partition is published as soon as it is back,
+        so a small board is not held up by a big one. A sport whose board
+        did not change keeps its file, and partitions of sports that left
+        the board are removed. Returns the whole board, as process_data and
+        filter_data would build it (with text columns as categoricals).
+        """
+        start = time.perf_counter()
+        shards = shard_by_sport(players, appearances, over_under_lines)
+        sports = sorted(shards, key=lambda sport: len(shards[sport][2]))
+        self.partition_seconds = {}
+        results = []
+        def done(sport, rows, columns, changed):
+            self.partition_seconds[sport] = time.perf_counter() - start
+            if changed:
+                self.publish_partition(sport)
+            results.append((read_columnar(partition_path(self.csv_path, sport)), rows, columns))
+        if self.pool is not None:
+            futures = [self.pool.submit(_process_shard, sport, self.csv_path, shards[sport]) for sport in sports]
+            for future in as_completed(futures):
+                done(*future.result())
+        else:
+            for sport in sports:
+                done(*process_shard(self, sport, self.csv_path, shards[sport]))
+
+        names = {partition_name(sport) for sport in shards}
+        directory = partitions_path(self.csv_path)
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            if name.endswith(".cols") and name[:-len(".cols")] not in names:
+                self.remove_partition(name[:-len(".cols")])
+        return combine_shards(results)
+
+    def publish_partition(self, sport):
+        """Hand a sport's freshly saved partition to the in-process store.
+        The file is memory-mapped, not parsed."""
+        path = partition_path(self.csv_path, sport)
+        print(f"Data saved to {path}")
+        if self.store is not None:
+            signature = file_signature(path)
+            self.store.publish_partition(sport, read_columnar(path), (path,) + signature)
+
+    def remove_partition(self, sport):
+        path = partition_path(self.csv_path, sport)
+        if os.path.exists(path):
+            os.remove(path)
+        if self.store is not None:
+            self.store.publish_partition(sport, None)
+        print(f"Removed {path}")
+
+    def remove_partitions(self):
+        """Remove every partition, so the API does not serve stale ones."""
+        directory = partitions_path(self.csv_path)
+        if not os.path.isdir(directory):
+            return
+        for name in os.listdir(directory):
+            if name.endswith(".cols"):
+                self.remove_partition(name[:-len(".cols")])
+            else:
+                os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+    def save(self, board):
+        """Write the board next to csv_path, publish it to the store and
+        record its line movements."""
+        #print(board)
+
+        # Save the DataFrame as a CSV file. Write to a temp file and rename so
+        # the API never reloads a half-written board.
+        tmp_path = self.csv_path + '.tmp'
+        board.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.csv_path)
+        print(f"Data saved to {self.csv_path}")
+
+        # Typed columnar copy that the API memory-maps instead of parsing the CSV.
+        # It is stored already compacted so the API's compact load keeps the
+        # mapped arrays instead of copying them into narrower ones, and with
+        # the column names the CSV reads back with.
+        compacted, _ = compact_props(board.set_axis(csv_column_names(board.columns), axis=1), report=False)
+        write_columnar(compacted, columnar_path(self.csv_path))
+        print(f"Data saved to {columnar_path(self.csv_path)}")
 
-        #print(self.underdog_props)
+        # Hand the same frame to an in-process API; the files just written
+        # count as loaded, so its watcher does not read them back
+        if self.store is not None:
+            self.store.publish(compacted, source_signature(self.csv_path))
+
+        # Append what moved since the last scrape to the line history
+        changes = self.history.record(board)
+        print(f"Line history: {changes['changes']} changes ({changes['added']} new, "
+              f"{changes['removed']} removed)")
+
+class ScrapeScheduler:
+    """Runs scraper.scrape() every `interval` seconds on a background thread.
+
+    Intervals are measured from the start of one scrape to the start of the
+    next. A scrape that raises is logged and the next one runs on schedule.
+    """
+    def __init__(self, scraper, interval=DEFAULT_SCRAPE_INTERVAL):
+        self.scraper = scraper
+        self.interval = interval
+        self.scrape_count = 0
+        self.changed_count = 0
+        self.error_count = 0
+        self.last_error = None
+        self.last_scrape_at = None
+        self.last_scrape_seconds = None
+        self.last_changed_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, scraper):
+        return cls(scraper, scraper.config.get("scrape_interval_seconds", DEFAULT_SCRAPE_INTERVAL))
+
+    def run_once(self):
+        """One scrape. Returns True if it saved (and published) a new board."""
+        self.last_scrape_at = time.time()
+        start = time.perf_counter()
+        try:
+            changed = self.scraper.scrape()
+        except Exception as e:
+            self.error_count += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Scrape failed: {self.last_error}")
+            return False
+        finally:
+            self.scrape_count += 1
+            self.last_scrape_seconds = time.perf_counter() - start
+        self.last_error = None
+        if changed:
+            self.changed_count += 1
+            self.last_changed_at = self.last_scrape_at
+        return changed
+
+    def run_forever(self):
+        """Scrape on schedule in the calling thread until stop() or Ctrl-C."""
+        self._stop.clear()
+        try:
+            while True:
+                self.run_once()
+                if self._stop.wait(max(self.interval - self.last_scrape_seconds, 0)):
+                    return
+        except KeyboardInterrupt:
+            pass
+
+    def start(self):
+        """Start the background scrape thread (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="props-scraper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "scrape_count": self.scrape_count,
+            "changed_count": self.changed_count,
+            "error_count": self.error_count,
+            "last_error": self.last_error,
+            "last_scrape_at": self.last_scrape_at,
+            "last_scrape_seconds": (round(self.last_scrape_seconds, 4)
+                                    if self.last_scrape_seconds is not None else None),
+            "last_changed_at": self.last_changed_at,
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
 
-        # Save the DataFrame as a CSV file
-        self.underdog_props.to_csv('underdog_props.csv', index=False)
-        print("Data saved to underdog_props.csv")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the Underdog pick'em board")
+    parser.add_argument("--schedule", action="store_true",
+                        help="keep scraping every scrape_interval_seconds (config.json)")
+    parser.add_argument("--interval", type=float, help="seconds between scrapes, overrides config.json")
+    args = parser.parse_args()
 
-# Usage example:
-scraper = UnderdogScraper()
-scraper.scrape()
\ No newline at end of file
+    scraper = UnderdogScraper()
+    # One pool for every scrape of this run
+    scraper.pool = shard_pool(scraper.config)
+    try:
+        if args.schedule:
+            scheduler = ScrapeScheduler.from_config(scraper)
+            if args.interval is not None:
+                scheduler.interval = args.interval
+            print(f"Scraping every {scheduler.interval:g}s, Ctrl-C to stop")
+            scheduler.run_forever()
+        else:
+            scraper.scrape()
+    finally:
+        if scraper.pool is not None:
+            scraper.pool.shutdown()
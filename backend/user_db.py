@@ -3,12 +3,52 @@ import json
 import time
 from werkzeug.security import generate_password_hash, check_password_hash
 import threading
+from contextlib import contextmanager
+
+try:
+    import orjson
+except ImportError:  # optional, much faster on large pick histories
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # Database file path
 DB_FILE = os.path.join(os.path.dirname(__file__), "users_db.json")
 # Lock for thread safety
 db_lock = threading.Lock()
 
+@contextmanager
+def _locked():
+    """Hold db_lock and an exclusive lock on DB_FILE + ".lock".
+
+    The file lock keeps other processes (settlement.py next to the API)
+    from writing the database between our read and our write.
+    """
+    with db_lock, open(DB_FILE + ".lock", "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    # Retries for about 10 seconds before raising
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
 # Initialize database with default structure if it doesn't exist
 def init_db():
     if not os.path.exists(DB_FILE):
@@ -16,12 +56,33 @@ def init_db():
             json.dump({"users": {}}, f)
         print(f"Created new user database at {DB_FILE}")
 
+def _read_db():
+    if orjson is not None:
+        with open(DB_FILE, 'rb') as f:
+            try:
+                return orjson.loads(f.read())
+            except orjson.JSONDecodeError as e:
+                raise json.JSONDecodeError(str(e), "", 0)
+    with open(DB_FILE, 'r') as f:
+        return json.load(f)
+
+def _write_db(db_data):
+    # Write a temp file and rename it over the database so a crash never
+    # leaves it half written
+    tmp_path = DB_FILE + ".tmp"
+    if orjson is not None:
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(db_data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(tmp_path, 'w') as f:
+            json.dump(db_data, f, indent=2)
+    os.replace(tmp_path, DB_FILE)
+
 # Load database
 def load_db():
     try:
         with db_lock:
-            with open(DB_FILE, 'r') as f:
-                return json.load(f)
+            return _read_db()
     except FileNotFoundError:
         init_db()
         return {"users": {}}
@@ -32,17 +93,37 @@ def load_db():
 
 # Save database
 def save_db(db_data):
-    with db_lock:
-        with open(DB_FILE, 'w') as f:
-            json.dump(db_data, f, indent=2)
+    with _locked():
+        _write_db(db_data)
+
+@contextmanager
+def transaction():
+    """Load the database, yield it for changes and save it once.
+
+    The lock is held from load to save, so no other update, from this
+    process or another, lands in between. Nothing is saved if the block
+    raises.
+    """
+    with _locked():
+        try:
+            db_data = _read_db()
+        except FileNotFoundError:
+            db_data = {"users": {}}
+        yield db_data
+        _write_db(db_data)
+
+def find_user_key(db_data, username):
+    """Stored key for username (case-insensitive), or None."""
+    for user_key in db_data["users"]:
+        if user_key.lower() == username.lower():
+            return user_key
+    return None
 
 # User management functions
 def register_user(username, password, email=''):
     """Register a new user and return the user data"""
-    db_data = load_db()
-    
     # Check if username already exists
-    if username.lower() in [u.lower() for u in db_data["users"]]:
+    if find_user_key(load_db(), username) is not None:
         return {"success": False, "error": "Username already exists"}
     
     # Create new user
@@ -55,9 +136,11 @@ def register_user(username, password, email=''):
         "picks_history": []
     }
     
-    # Add to database
-    db_data["users"][username] = user_data
-    save_db(db_data)
+    # Add to database, checking again under the lock
+    with transaction() as db_data:
+        if find_user_key(db_data, username) is not None:
+            return {"success": False, "error": "Username already exists"}
+        db_data["users"][username] = user_data
     
     # Return sanitized user data (no password hash)
     return {
@@ -112,34 +195,24 @@ def get_user(username):
 
 def update_user_balance(username, new_balance):
     """Update a user's balance"""
-    db_data = load_db()
-    
-    # Case-insensitive username lookup
-    for user_key in db_data["users"]:
-        if user_key.lower() == username.lower():
+    if find_user_key(load_db(), username) is None:
+        return False
+    with transaction() as db_data:
+        user_key = find_user_key(db_data, username)
+        if user_key is not None:
             db_data["users"][user_key]["balance"] = new_balance
-            save_db(db_data)
-            return True
-    
-    return False
+    return user_key is not None
 
 def add_pick_to_history(username, pick_data):
     """Add a pick to user's history"""
-    db_data = load_db()
-    
-    # Case-insensitive username lookup
-    for user_key in db_data["users"]:
-        if user_key.lower() == username.lower():
-            # Initialize picks_history if it doesn't exist
-            if "picks_history" not in db_data["users"][user_key]:
-                db_data["users"][user_key]["picks_history"] = []
-            
-            # Add pick to history
-            db_data["users"][user_key]["picks_history"].append(pick_data)
-            save_db(db_data)
-            return True
-    
-    return False
+    if find_user_key(load_db(), username) is None:
+        return False
+    with transaction() as db_data:
+        user_key = find_user_key(db_data, username)
+        if user_key is not None:
+            # Initialize picks_history if it doesn't exist, and add the pick
+            db_data["users"][user_key].setdefault("picks_history", []).append(pick_data)
+    return user_key is not None
 
 def get_user_picks_history(username):
     """Get a user's pick history"""
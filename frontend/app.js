@@ -42,34 +42,49 @@ function switchUiTab(tabName) {
 }
 
 
+// Payout tables served by the backend, indexed [picks][losses]. Until they
+// load, multipliers show as unavailable and picks cannot be saved
+let payoutTables = null;
+const PAYOUT_RETRY_MS = 5000;
+
+// Fetch the PowerPlay/Flex payout tables from the backend API, retrying
+// until it answers
+async function fetchPayoutTables() {
+    try {
+        const res = await fetch('http://localhost:5000/api/payouts');
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const tables = await res.json();
+        if (!tables.PowerPlay || !tables.Flex) throw new Error('malformed payout tables');
+        payoutTables = tables;
+        updateMyPayoutInfo();
+        updateSaveButton();
+    } catch (err) {
+        console.error('Error fetching payout tables:', err);
+        setTimeout(fetchPayoutTables, PAYOUT_RETRY_MS);
+    }
+}
+
+// Look up a multiplier: null until the tables have loaded, 0 when out of range
+function lookupPayout(mode, n, losses) {
+    if (!payoutTables) return null;
+    const table = payoutTables[mode];
+    if (!table || !table[n] || table[n][losses] === undefined) return 0;
+    return table[n][losses];
+}
+
+// A multiplier for display
+function formatMultiplier(multiplier) {
+    return multiplier === null ? 'unavailable' : `${multiplier}x`;
+}
+
 // Function to calculate powerplay payout based on number of picks
 function calculatePowerPlayPayout(n) {
-    const payouts = [0, 1.5, 3, 6, 10, 20, 35, 65, 120];
-    return n > 0 && n <= 8 ? payouts[n] : 0;
+    return lookupPayout('PowerPlay', n, 0);
 }
 
 // Function to calculate flex payout based on number of picks and losses
 function calculateFlexPayout(n, losses) {
-    if (losses === 0) {
-        if (n === 8) return 80;
-        if (n === 7) return 40;
-        if (n === 6) return 25;
-        if (n === 5) return 10;
-        if (n === 4) return 6;
-        if (n === 3) return 3;
-    } else if (losses === 1) {
-        if (n === 8) return 3;
-        if (n === 7) return 2.75;
-        if (n === 6) return 2.6;
-        if (n === 5) return 2.5;
-        if (n === 4) return 1.5;
-        if (n === 3) return 1;
-    } else if (losses === 2) {
-        if (n === 8) return 1;
-        if (n === 7) return 0.5;
-        if (n === 6) return 0.25;
-    }
-    return 0;
+    return lookupPayout('Flex', n, losses);
 }
 
 // Fetch player props from the backend API
@@ -488,13 +503,13 @@ function updateMyPayoutInfo() {
     
     // Update PowerPlay payout
     const powerPlayPayout = calculatePowerPlayPayout(n);
-    powerPlayElem.textContent = `PowerPlay payout: ${powerPlayPayout}x`;
+    powerPlayElem.textContent = `PowerPlay payout: ${formatMultiplier(powerPlayPayout)}`;
     
     // Update Flex payouts if those elements exist
-    if (flexPerfectElem) flexPerfectElem.textContent = `${calculateFlexPayout(n, 0)}x`;
-    if (flexOneMissElem) flexOneMissElem.textContent = `${calculateFlexPayout(n, 1)}x`;
+    if (flexPerfectElem) flexPerfectElem.textContent = formatMultiplier(calculateFlexPayout(n, 0));
+    if (flexOneMissElem) flexOneMissElem.textContent = formatMultiplier(calculateFlexPayout(n, 1));
     if (flexTwoMissElem) {
-        flexTwoMissElem.textContent = `${calculateFlexPayout(n, 2)}x`;
+        flexTwoMissElem.textContent = formatMultiplier(calculateFlexPayout(n, 2));
         const liElement = flexTwoMissElem.parentElement;
         if (liElement) {
             liElement.style.display = n >= 5 ? 'list-item' : 'none';
@@ -514,7 +529,8 @@ function updateSaveButton() {
     const mySaveButton = document.getElementById('my-save-picks');
     
     if (mySaveButton) {
-        mySaveButton.disabled = picks.length === 0;
+        // No bets until the payout tables have loaded
+        mySaveButton.disabled = picks.length === 0 || !payoutTables;
     }
 }
 
@@ -534,6 +550,10 @@ function updateBalanceDisplay() {
 
 // Save current picks
 async function savePicksToServer() {
+    if (!payoutTables) {
+        alert('Payouts are not available yet. Please try again in a moment.');
+        return;
+    }
     const betAmount = parseFloat(document.getElementById('my-bet-amount').value);
     if (isNaN(betAmount) || betAmount <= 0) {
         alert('Please enter a valid bet amount.');
@@ -993,8 +1013,9 @@ function initApp() {
         }
     }
     
-    // Fetch props after UI setup
+    // Fetch props and payout tables after UI setup
     fetchProps();
+    fetchPayoutTables();
     
     // Initial UI updates
     updateMyPayoutInfo();